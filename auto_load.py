@@ -6,6 +6,7 @@ import inspect
 import pkgutil
 import importlib
 from pathlib import Path
+from . import registration_manifest
 
 __all__ = (
     "init",
@@ -17,13 +18,25 @@ blender_version = bpy.app.version
 
 modules = None
 ordered_classes = None
+lazy_module_names = None
 
 def init():
     global modules
     global ordered_classes
-
-    modules = get_all_submodules(Path(__file__).parent)
-    ordered_classes = get_ordered_classes_to_register(modules)
+    global lazy_module_names
+
+    # A manifest generated at packaging time avoids importing all modules and inspecting all classes
+    manifest = registration_manifest.read_manifest(Path(__file__).parent)
+    if manifest is not None:
+        modules = [importlib.import_module("." + name, __package__) for name in manifest["modules"]]
+        ordered_classes = [getattr(sys.modules[f"{__package__}.{module_name}"], class_name)
+                           for module_name, class_name in manifest["classes"]]
+        ordered_classes = [cls for cls in ordered_classes if not getattr(cls, "is_registered", False)]
+        lazy_module_names = manifest["lazy_modules"]
+    else:
+        modules = get_all_submodules(Path(__file__).parent)
+        ordered_classes = get_ordered_classes_to_register(modules)
+        lazy_module_names = []
 
 def register():
     for cls in ordered_classes:
@@ -45,6 +58,12 @@ def unregister():
         if hasattr(module, "unregister"):
             module.unregister()
 
+    # Modules imported on first use are only cleaned up if they have been imported
+    for name in lazy_module_names:
+        module = sys.modules.get(f"{__package__}.{name}")
+        if module is not None and hasattr(module, "unregister"):
+            module.unregister()
+
 
 # Import modules
 #################################################
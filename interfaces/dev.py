@@ -1,8 +1,10 @@
 import bpy
 from rna_prop_ui import PropertyPanel
+from ..utils import profiling
 
 """
-Show the default custom properties panel for shader node groups to edit metadata required by this add-on.
+Show the default custom properties panel for shader node groups to edit metadata required by this add-on,
+and the counters of the optional instrumentation in the sidebar of the 3D viewport.
 """
 
 #class NODE_PT_custom_props(PropertyPanel, bpy.types.Panel):
@@ -28,4 +30,107 @@ class NODE_TREE_PT_custom_props(PropertyPanel, bpy.types.Panel):
     
     @classmethod
     def poll(cls, context):
-        return context.space_data.edit_tree
\ No newline at end of file
+        return context.space_data.edit_tree
+
+# While instrumentation is enabled, a timer refreshes the sidebar when new calls have been recorded
+profiling_redraw_state = {"version": -1}
+
+def profiling_redraw_timer():
+    wm = bpy.context.window_manager
+    if not wm.tfx_profiling_enabled:
+        return None
+    if profiling_redraw_state["version"] != profiling.profiling_state["version"]:
+        profiling_redraw_state["version"] = profiling.profiling_state["version"]
+        for window in wm.windows:
+            for area in window.screen.areas:
+                if area.type == 'VIEW_3D':
+                    area.tag_redraw()
+    return 0.5
+
+def update_profiling(self, context):
+    profiling.set_enabled(self.tfx_profiling_enabled, self.tfx_profiling_capacity)
+    if self.tfx_profiling_enabled and not bpy.app.timers.is_registered(profiling_redraw_timer):
+        bpy.app.timers.register(profiling_redraw_timer, first_interval=0.5)
+
+class TFX_PT_panel_diagnostics(bpy.types.Panel):
+    bl_idname = 'TFX_PT_panel_diagnostics'
+    bl_label = "Diagnostics"
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "TexFX"
+    bl_order = 10
+    bl_options = {'DEFAULT_CLOSED'}
+
+    def draw(self, context):
+        wm = context.window_manager
+        layout = self.layout
+        row = layout.row()
+        row.prop(wm, "tfx_profiling_enabled", text="Record Calls")
+        row.prop(wm, "tfx_profiling_capacity", text="Buffer")
+        row = layout.row()
+        row.prop(wm, "tfx_profiling_sort", expand=True)
+        row = layout.row(align=True)
+        row.operator("tfx.reset_profiling", text="Reset", icon='X')
+        row.operator("tfx.export_profiling", text="Export", icon='EXPORT')
+
+        counters = profiling.get_counters(wm.tfx_profiling_sort)
+        layout.label(text=f"Events: {len(profiling.events)} / {profiling.events.maxlen}")
+        if len(counters) < 1:
+            layout.label(text="No calls recorded", icon='INFO')
+            return
+        col = layout.column(align=True)
+        row = col.row()
+        for text in ("Name", "Calls", "Total", "Mean", "Max"):
+            row.label(text=text)
+        for counter in counters[:wm.tfx_profiling_rows]:
+            row = col.row()
+            row.label(text=counter["name"])
+            row.label(text=str(counter["calls"]))
+            row.label(text=f"{counter['total_ms']:.1f} ms")
+            row.label(text=f"{counter['mean_ms']:.2f} ms")
+            row.label(text=f"{counter['max_ms']:.1f} ms")
+        layout.prop(wm, "tfx_profiling_rows")
+
+        header, body = layout.panel("tfx_profiling_slowest", default_closed=True)
+        header.label(text="Slowest Calls")
+        if body:
+            slowest = [(call["ms"], call["time_ms"], counter["name"]) for counter in counters for call in counter["slowest"]]
+            slowest.sort(reverse=True)
+            for ms, time_ms, name in slowest[:profiling.num_slowest * 2]:
+                row = body.row()
+                row.label(text=name)
+                row.label(text=f"{ms:.1f} ms")
+                row.label(text=f"at {time_ms / 1000:.1f} s")
+
+def register():
+    bpy.types.WindowManager.tfx_profiling_enabled = bpy.props.BoolProperty(
+        name='Record Calls',
+        description='Record the time spent in template appends, media scans and probes, driver creation, operators and panel draws',
+        default=False, update=update_profiling
+    )
+    bpy.types.WindowManager.tfx_profiling_capacity = bpy.props.IntProperty(
+        name='Buffer Size',
+        description='Number of most recent calls kept for export',
+        default=profiling.default_capacity, min=100, soft_max=1000000, update=update_profiling
+    )
+    bpy.types.WindowManager.tfx_profiling_sort = bpy.props.EnumProperty(
+        name='Sort By',
+        items=[ ('total_ns', 'Total', 'Sort by cumulative time'),
+                ('max_ns', 'Max', 'Sort by the slowest call'),
+                ('calls', 'Calls', 'Sort by the number of calls')],
+        default='total_ns'
+    )
+    bpy.types.WindowManager.tfx_profiling_rows = bpy.props.IntProperty(
+        name='Rows',
+        description='Number of counters to show',
+        default=12, min=1, soft_max=50
+    )
+
+def unregister():
+    if bpy.app.timers.is_registered(profiling_redraw_timer):
+        bpy.app.timers.unregister(profiling_redraw_timer)
+    profiling.set_enabled(False)
+    del bpy.types.WindowManager.tfx_profiling_enabled
+    del bpy.types.WindowManager.tfx_profiling_capacity
+    del bpy.types.WindowManager.tfx_profiling_sort
+    del bpy.types.WindowManager.tfx_profiling_rows
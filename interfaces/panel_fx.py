@@ -1,5 +1,5 @@
 import bpy
-from ..utils import node_utils, asset_manager, anim_utils
+from ..utils import node_utils, asset_manager, anim_utils, chain_analysis, media_registry, profiling
 
 class NewFxMenu(bpy.types.Menu):
     bl_label = "New Effect"
@@ -59,19 +59,210 @@ class NewFxCategorySubMenuBase(bpy.types.Menu):
                     op.asset_file_name = item["file"]
                 break
 
-fx_info = asset_manager.template_fx_list
-for cat in fx_info:
-    class_name = f'TFX_MT_new_effect_by_category_{cat["category"].lower().replace(" ", "_").replace("/", "_")}'
-    menu_cls = type(
-        class_name,
-        (NewFxCategorySubMenuBase,),
-        {
-            "bl_label": cat["category"],
-            "bl_idname": class_name,
-            "category_name": cat["category"],
-        }
-    )
-    bpy.utils.register_class(menu_cls)
+# One submenu class per category, registered together with the add-on instead of at import time
+category_menu_classes = []
+
+def register_category_menus():
+    for cat in asset_manager.template_fx_list:
+        class_name = f'TFX_MT_new_effect_by_category_{cat["category"].lower().replace(" ", "_").replace("/", "_")}'
+        menu_cls = type(
+            class_name,
+            (NewFxCategorySubMenuBase,),
+            {
+                "bl_label": cat["category"],
+                "bl_idname": class_name,
+                "category_name": cat["category"],
+            }
+        )
+        bpy.utils.register_class(menu_cls)
+        category_menu_classes.append(menu_cls)
+
+def unregister_category_menus():
+    for menu_cls in reversed(category_menu_classes):
+        bpy.utils.unregister_class(menu_cls)
+    category_menu_classes.clear()
+
+class TfxChainItem(bpy.types.PropertyGroup):
+    node_group: bpy.props.StringProperty()
+    depth: bpy.props.IntProperty()
+
+# Effects of the active chain are mirrored in a collection of the window manager to be displayed by a UI list.
+# Data blocks cannot be modified during drawing, so the collection is synchronized by a timer when it becomes stale
+chain_sync_state = {"pending": False}
+
+def get_chain_items_key(top_tree, chain):
+    return top_tree.name + "|" + ";".join(tree.name for tree, _ in chain)
+
+def sync_chain_items():
+    chain_sync_state["pending"] = False
+    context = bpy.context
+    if not node_utils.is_active_node_tfx():
+        return None
+    wm = context.window_manager
+    top_tree = context.object.active_material.node_tree.nodes.active.node_tree
+    chain = media_registry.get_effect_chain_nodes()
+    
+    # Keep the selection on the same effect if it still exists
+    selected = ''
+    if 0 <= wm.tfx_chain_index < len(wm.tfx_chain_items):
+        selected = wm.tfx_chain_items[wm.tfx_chain_index].node_group
+    wm.tfx_chain_items.clear()
+    new_index = 0
+    for i in range(len(chain)-1, 0, -1):
+        item = wm.tfx_chain_items.add()
+        item.name = chain[i][1]
+        item.node_group = chain[i][0].name
+        item.depth = i
+        if item.node_group == selected:
+            new_index = len(wm.tfx_chain_items) - 1
+    wm.tfx_chain_index = new_index
+    wm.tfx_chain_key = get_chain_items_key(top_tree, chain)
+    redraw_view3d(wm)
+    return None
+
+class TfxPresetItem(bpy.types.PropertyGroup):
+    path: bpy.props.StringProperty()
+    description: bpy.props.StringProperty()
+
+# Presets of the library are mirrored in the same way, and the timer keeps running while the library is being scanned
+preset_sync_state = {"pending": False}
+
+def redraw_view3d(wm):
+    for window in wm.windows:
+        for area in window.screen.areas:
+            if area.type == 'VIEW_3D':
+                area.tag_redraw()
+
+def sync_preset_items():
+    from ..utils import preset_library
+    wm = bpy.context.window_manager
+    version = preset_library.library_state["version"]
+    if wm.tfx_preset_version != version:
+        selected = ''
+        if 0 <= wm.tfx_preset_index < len(wm.tfx_preset_items):
+            selected = wm.tfx_preset_items[wm.tfx_preset_index].path
+        presets = preset_library.get_presets()
+        wm.tfx_preset_items.clear()
+        for path in sorted(presets, key=lambda path: presets[path]["name"].lower()):
+            item = wm.tfx_preset_items.add()
+            item.name = presets[path]["name"]
+            item.path = path
+            item.description = ", ".join(presets[path]["effects"])
+            if path == selected:
+                wm.tfx_preset_index = len(wm.tfx_preset_items) - 1
+        wm.tfx_preset_version = version
+        redraw_view3d(wm)
+    if preset_library.library_state["scanning"]:
+        return 0.5
+    preset_sync_state["pending"] = False
+    return None
+
+class TFX_UL_preset_library(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        from ..utils import preset_library
+        icon_value = preset_library.get_thumbnail_icon(item.path)
+        row = layout.row()
+        if icon_value:
+            row.label(text=item.name, icon_value=icon_value)
+        else:
+            row.label(text=item.name, icon='PRESET')
+        sub = row.row()
+        sub.enabled = False
+        sub.label(text=item.description)
+
+def draw_preset_library(layout, context):
+    # The library module is only imported once the section is opened
+    from ..utils import preset_library
+    wm = context.window_manager
+    preset_library.get_presets()
+    if not preset_sync_state["pending"] and (
+        wm.tfx_preset_version != preset_library.library_state["version"] or preset_library.library_state["scanning"]):
+        preset_sync_state["pending"] = True
+        bpy.app.timers.register(sync_preset_items, first_interval=0.0)
+    
+    row = layout.row()
+    row.template_list("TFX_UL_preset_library", "", wm, "tfx_preset_items", wm, "tfx_preset_index", rows=3)
+    col = row.column(align=True)
+    col.operator("tfx.save_library_preset", text='', icon='ADD')
+    col.operator("tfx.refresh_preset_library", text='', icon='FILE_REFRESH')
+    if preset_library.library_state["scanning"]:
+        layout.label(text="Indexing presets...", icon='SORTTIME')
+    elif preset_library.library_state["error"]:
+        layout.label(text=preset_library.library_state["error"], icon='ERROR')
+    if 0 <= wm.tfx_preset_index < len(wm.tfx_preset_items):
+        layout.operator("tfx.apply_library_preset", icon='IMPORT').preset = wm.tfx_preset_items[wm.tfx_preset_index].path
+
+def get_first_shared_depth(chain):
+    """
+    Effects from this depth on are used by other materials as well
+    """
+    for i in range(1, len(chain)):
+        if "tfxShareKey" in chain[i][0]:
+            return i
+    return len(chain)
+
+def get_first_cached_depth(chain):
+    """
+    Effects from this depth on are baked into the images of a cache point, so editing them has no effect
+    """
+    for i in range(1, len(chain)):
+        if "tfxCacheSource" in chain[i-1][0]:
+            return i
+    return len(chain)
+
+class TFX_UL_effects_chain(bpy.types.UIList):
+    def draw_item(self, context, layout, data, item, icon, active_data, active_propname, index):
+        tree = bpy.data.node_groups.get(item.node_group)
+        if tree is None or "TfxParam" not in tree.nodes:
+            layout.label(text=item.name, icon='ERROR')
+            return
+        shared = "tfxShareKey" in tree
+        cached = item.depth >= get_first_cached_depth(media_registry.get_effect_chain_nodes())
+        params = tree.nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
+        
+        row = layout.row(align=True)
+        row.label(text=item.name, icon='LINKED' if shared else 'SHADERFX')
+        if cached:
+            row.label(text='', icon='IMAGE_DATA')
+        sub = row.row(align=True)
+        sub.enabled = not (shared and context.scene.tfx_fork_shared_chains) and not cached
+        sub.prop(params["Bypass"], 'default_value', text='', emboss=False,
+                 icon='HIDE_OFF' if not params["Bypass"].default_value else 'HIDE_ON')
+
+def draw_effect_parameters(layout, tree):
+    params = tree.nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
+    promoted_params = []
+    if "tfxPromoted" in tree:
+        promoted_params = tree["tfxPromoted"]
+    for p in promoted_params:
+        node = tree.nodes[p[0]]
+        attr = getattr(node, p[1])
+        if isinstance(attr, bpy.types.CurveMapping):
+            layout.template_curve_mapping(node, p[1], type='COLOR' if len(attr.curves) > 1 else 'NONE')
+        elif isinstance(attr, bpy.types.ColorRamp):
+            layout.template_color_ramp(node, p[1])
+        else:
+            layout.prop(node, p[1])
+        
+    for j,p in enumerate(params):
+        if j == 0:
+            continue
+        if p.name:
+            row = layout.row()
+            row.prop(p, 'default_value', text=p.name)
+            if p.name == "Use Object Location" and p.default_value:
+                button_text = anim_utils.get_global_location_driver_id(tree)
+                row = layout.row()
+                row.alignment = 'RIGHT'
+                row.operator("tfx.set_effect_location_driver", text=button_text, icon='LINKED').node_group_name = tree.name
+            if p.name in ("In", "Out"):
+                op = row.operator("tfx.set_transition_playback_driver", text='', icon='LINKED')
+                op.transition_type = p.name
+                op.node_group_name = tree.name
+            if p.name in ("Random Seed", "Phase"):
+                op = row.operator("tfx.set_effect_temporal_driver", text='', icon='LINKED')
+                op.param_name = p.name
+                op.node_group_name = tree.name
 
 class TFX_PT_panel_fx_chain(bpy.types.Panel):
     bl_idname = 'TFX_PT_panel_fx_chain'
@@ -86,8 +277,11 @@ class TFX_PT_panel_fx_chain(bpy.types.Panel):
     def poll(cls, context):
         return node_utils.is_active_node_tfx()
     
+    @profiling.profiled_callback("draw:fx_chain")
     def draw(self, context):
-        chain = node_utils.get_effect_chain_nodes()
+        chain = media_registry.get_effect_chain_nodes()
+        top_tree = context.object.active_material.node_tree.nodes.active.node_tree
+        wm = context.window_manager
         layout = self.layout
         row = layout.row()
         row.operator("tfx.copy_effects_chain", text="Copy", icon='COPYDOWN')
@@ -95,56 +289,98 @@ class TFX_PT_panel_fx_chain(bpy.types.Panel):
         row.operator("tfx.save_effects_chain", text="Save", icon='FILE_TICK').filepath = f"{asset_manager.default_preset_dir}/preset.json"
         row.operator("tfx.load_effects_chain", text="Load", icon='FILE_FOLDER').filepath = f"{asset_manager.default_preset_dir}/preset.json"
 
-        for i in range(len(chain)-1, 0, -1):
-            tree, fx_name = chain[i]
-            params = tree.nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
-            promoted_params = []
-            if "tfxPromoted" in tree:
-                promoted_params = tree["tfxPromoted"]
-
-            header, body = layout.panel(tree.name)
-            header.label(text=fx_name, icon='SHADERFX')
-            header.prop(params["Bypass"], 'default_value', text='',
-                        icon='HIDE_OFF' if not params["Bypass"].default_value else 'HIDE_ON')
+        # Cost of the chain in the compiled shader
+        cost = chain_analysis.analyze_chain(top_tree)
+        box = layout.box()
+        row = box.row()
+        row.alert = cost["nodes"] > context.scene.tfx_node_warning_threshold
+        row.label(text=f"Nodes: {cost['nodes']}", icon='ERROR' if row.alert else 'NODETREE')
+        row.label(text=f"Samples: {cost['texture_samples']}")
+        row.label(text=f"Drivers: {cost['drivers']}")
+        if row.alert:
+            box.label(text="The chain may exceed the node limit of Cycles")
+        box.prop(context.scene, "tfx_compile_chains", text="Leave Inactive Effects Out of Shader")
 
-            op = header.operator("tfx.swap_effect", text='', icon='TRIA_UP')
-            op.depth = i
-            op = header.operator("tfx.swap_effect", text='', icon='TRIA_DOWN')
-            op.depth = i-1
-
-            header.operator("tfx.pop_effect", text='', icon='X').depth = i
+        first_shared = get_first_shared_depth(chain)
+        if first_shared < len(chain):
+            row = layout.box().row()
+            row.label(text="Shared Effects", icon='LINKED')
+            row.prop(context.scene, "tfx_fork_shared_chains", text="", icon='DUPLICATE')
+            row.operator("tfx.make_chain_single_user", text="", icon='UNLINKED')
 
+        # Effects list
+        if wm.tfx_chain_key != get_chain_items_key(top_tree, chain) and not chain_sync_state["pending"]:
+            chain_sync_state["pending"] = True
+            bpy.app.timers.register(sync_chain_items, first_interval=0.0)
+        row = layout.row()
+        row.template_list("TFX_UL_effects_chain", "", wm, "tfx_chain_items", wm, "tfx_chain_index", rows=4)
+        col = row.column(align=True)
+        col.menu("TFX_MT_new_effect", text='', icon='ADD')
+        
+        selected = None
+        if not chain_sync_state["pending"] and 0 <= wm.tfx_chain_index < len(wm.tfx_chain_items):
+            selected = wm.tfx_chain_items[wm.tfx_chain_index]
+        if selected is not None and 0 < selected.depth < len(chain):
+            i = selected.depth
+            tree, fx_name = chain[i]
+            col.operator("tfx.pop_effect", text='', icon='REMOVE').depth = i
+            col.separator()
+            col.operator("tfx.swap_effect", text='', icon='TRIA_UP').depth = i
+            col.operator("tfx.swap_effect", text='', icon='TRIA_DOWN').depth = i-1
+            
+            # Details and parameters are only drawn for the selected effect
+            locked = i >= first_shared and context.scene.tfx_fork_shared_chains
+            first_cached = get_first_cached_depth(chain)
+            header, body = layout.panel("tfx_effect_details", default_closed=True)
+            header.label(text="Details")
             if body:
-                for p in promoted_params:
-                    node = tree.nodes[p[0]]
-                    attr = getattr(node, p[1])
-                    if isinstance(attr, bpy.types.CurveMapping):
-                        body.template_curve_mapping(node, p[1], type='COLOR' if len(attr.curves) > 1 else 'NONE')
-                    elif isinstance(attr, bpy.types.ColorRamp):
-                        body.template_color_ramp(node, p[1])
-                    else:
-                        body.prop(node, p[1])
-                    
-                for j,p in enumerate(params):
-                    if j == 0:
-                        continue
-                    if p.name:
-                        row = body.row()
-                        row.prop(p, 'default_value', text=p.name)
-                        if p.name == "Use Object Location" and p.default_value:
-                            button_text = anim_utils.get_global_location_driver_id(tree)
-                            row = body.row()
-                            row.alignment = 'RIGHT'
-                            row.operator("tfx.set_effect_location_driver", text=button_text, icon='LINKED').node_group_name = tree.name
-                        if p.name in ("In", "Out"):
-                            op = row.operator("tfx.set_transition_playback_driver", text='', icon='LINKED')
-                            op.transition_type = p.name
-                            op.node_group_name = tree.name
-                        if p.name in ("Random Seed", "Phase"):
-                            op = row.operator("tfx.set_effect_temporal_driver", text='', icon='LINKED')
-                            op.param_name = p.name
-                            op.node_group_name = tree.name
-                            
-            layout.separator(factor=0.25, type="LINE")
+                row = body.row()
+                if i >= first_cached:
+                    # Effects below a cache point can only be edited once the cache is cleared
+                    row.label(text="Cached" if i == first_cached else f"Cached with {chain[first_cached][1]}", icon='IMAGE_DATA')
+                    row.operator("tfx.clear_cache_point", text='', icon='X').depth = first_cached
+                else:
+                    multiplicity = chain_analysis.get_chain_multiplicity(chain)
+                    row.label(text=f"Evaluations per Pixel: {multiplicity[i]['multiplicity']}")
+                    row.operator("tfx.set_cache_point", text='', icon='RENDER_STILL').depth = i
+                row.enabled = not locked
+            header, body = layout.panel("tfx_effect_parameters")
+            header.label(text=fx_name, icon='PROPERTIES')
+            if body:
+                body.enabled = not locked and i < first_cached
+                draw_effect_parameters(body, tree)
         
-        layout.menu("TFX_MT_new_effect", icon='ADD')
\ No newline at end of file
+        header, body = layout.panel("tfx_preset_library", default_closed=True)
+        header.label(text="Preset Library", icon='ASSET_MANAGER')
+        if body:
+            draw_preset_library(body, context)
+        
+        if len(chain) > 1:
+            if "tfxCacheSource" in chain[0][0]:
+                layout.operator("tfx.clear_cache_point", text="Unbake Effects Chain", icon='X').depth = 1
+            else:
+                layout.operator("tfx.bake_effects_chain", icon='RENDER_ANIMATION')
+
+def register():
+    register_category_menus()
+    bpy.types.Scene.tfx_node_warning_threshold = bpy.props.IntProperty(
+        name='Node Warning Threshold',
+        description='Show a warning when the expanded node count of an effects chain exceeds this value',
+        default=4096, min=1
+    )
+    bpy.types.WindowManager.tfx_chain_items = bpy.props.CollectionProperty(type=TfxChainItem)
+    bpy.types.WindowManager.tfx_chain_index = bpy.props.IntProperty(default=0)
+    bpy.types.WindowManager.tfx_chain_key = bpy.props.StringProperty(default='')
+    bpy.types.WindowManager.tfx_preset_items = bpy.props.CollectionProperty(type=TfxPresetItem)
+    bpy.types.WindowManager.tfx_preset_index = bpy.props.IntProperty(default=0)
+    bpy.types.WindowManager.tfx_preset_version = bpy.props.IntProperty(default=-1)
+
+def unregister():
+    unregister_category_menus()
+    del bpy.types.Scene.tfx_node_warning_threshold
+    del bpy.types.WindowManager.tfx_chain_items
+    del bpy.types.WindowManager.tfx_chain_index
+    del bpy.types.WindowManager.tfx_chain_key
+    del bpy.types.WindowManager.tfx_preset_items
+    del bpy.types.WindowManager.tfx_preset_index
+    del bpy.types.WindowManager.tfx_preset_version
\ No newline at end of file
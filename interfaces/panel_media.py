@@ -1,5 +1,5 @@
 import bpy
-from ..utils import node_utils
+from ..utils import node_utils, media_utils, media_registry, profiling
 
 class TFX_PT_panel_media_selection(bpy.types.Panel):
     bl_idname = 'TFX_PT_panel_media_selection'
@@ -14,14 +14,18 @@ class TFX_PT_panel_media_selection(bpy.types.Panel):
     def poll(cls, context):
         return (context.object is not None) and (context.object.active_material is not None) and (context.object.active_material.node_tree is not None)
     
+    @profiling.profiled_callback("draw:media_selection")
     def draw(self, context):
         layout = self.layout
-        tex_groups_map, active_name = node_utils.list_tfx_node_groups(context.object.active_material)
+        tex_groups_map, active_name = media_registry.list_tfx_node_groups(context.object.active_material)
         
         for name in tex_groups_map:
             layout.operator("tfx.set_node_active", text=name, icon='FILE_IMAGE', depress=(active_name==name)).image_name = name
         layout.separator(factor=0.25, type="LINE")
-        layout.operator("tfx.wrap_media", icon='ADD')
+        row = layout.row()
+        row.operator("tfx.wrap_media", icon='ADD')
+        row.operator("tfx.batch_wrap_media", text="", icon='DOCUMENTS')
+        row.operator("tfx.batch_unwrap_media", text="", icon='TRASH')
         
 class TFX_PT_panel_media_properties(bpy.types.Panel):
     bl_idname = 'TFX_PT_panel_media_properties'
@@ -37,15 +41,17 @@ class TFX_PT_panel_media_properties(bpy.types.Panel):
     def poll(cls, context):
         return node_utils.is_active_node_tfx()
     
+    @profiling.profiled_callback("draw:media_properties")
     def draw(self, context):
-        image_node, _ = node_utils.get_active_image_node()
+        image_node, _ = media_registry.get_active_image_node()
         top_node = context.object.active_material.node_tree.nodes.active
         layout = self.layout
         
         layout.operator("tfx.replace_media", icon='FILEBROWSER')
         if image_node.image is not None:
             source_type = 'Movie' if image_node.image.source == 'MOVIE' else 'Sequence' if image_node.image.source == 'SEQUENCE' else 'Single Image'
-            layout.label(text=f"{source_type}, {image_node.image.size[0]} x {image_node.image.size[1]}", icon='INFO')
+            width, height = media_utils.get_media_resolution(image_node.image)
+            layout.label(text=f"{source_type}, {width} x {height}", icon='INFO')
             row = layout.row()
             row.label(text="Interpolation:")
             row.prop(image_node, 'interpolation', text='')
@@ -1,5 +1,5 @@
 import bpy
-from ..utils import node_utils
+from ..utils import anim_utils, media_registry, profiling
 
 class TFX_PT_panel_playback_control(bpy.types.Panel):
     bl_idname = 'TFX_PT_panel_playback_control'
@@ -12,26 +12,47 @@ class TFX_PT_panel_playback_control(bpy.types.Panel):
     
     @classmethod
     def poll(cls, context):
-        image_node, _ = node_utils.get_active_image_node(check=True)
+        image_node, _ = media_registry.get_active_image_node(check=True)
         return image_node and image_node.image and image_node.image.source in ('SEQUENCE', 'MOVIE')
     
+    @profiling.profiled_callback("draw:playback_control")
     def draw(self, context):
-        image_node, media_node_tree = node_utils.get_active_image_node()
+        image_node, media_node_tree = media_registry.get_active_image_node()
         top_node = context.object.active_material.node_tree.nodes.active
         
         layout = self.layout
         if "tfxPlaybackControl" not in top_node.node_tree or top_node.node_tree["tfxPlaybackControl"] == 0:
-            layout.operator("tfx.add_playback_driver", icon='ADD')
+            row = layout.row()
+            row.operator("tfx.add_playback_driver", icon='ADD')
+            row.operator("tfx.batch_add_playback_driver", text="", icon='DOCUMENTS')
+            
+        elif top_node.node_tree.get("tfxPlaybackBaked"):
+            layout.label(text="Playback Baked to Keyframes", icon='KEYTYPE_KEYFRAME_VEC')
+            row = layout.row()
+            row.operator("tfx.unbake_playback", text="Unbake", icon='LOOP_BACK')
+            row.operator("tfx.remove_playback_driver", text="Remove", icon='X')
             
         elif top_node.node_tree["tfxPlaybackControl"] == 1:
             if "tfxPlayhead" in top_node.node_tree:
                 layout.prop(top_node.node_tree, '["tfxPlayhead"]', text="Playhead")
+            mod = anim_utils.get_playhead_cycles_modifier(top_node.node_tree, "tfxPlayhead")
+            if mod:
+                box = layout.box()
+                row = box.row()
+                row.label(text="Loop:", icon='FILE_REFRESH')
+                row.prop(mod, 'mode_after', text='')
+                box.prop(mod, 'cycles_after', text='Repeats (0: Infinite)')
             row = layout.row()
             row.operator("tfx.refresh_playback_drivers", text="Refresh", icon='FILE_REFRESH')
             row.operator("tfx.remove_playback_driver", text="Remove", icon='X')
         
         elif top_node.node_tree["tfxPlaybackControl"] == 2:
-            layout.operator("tfx.open_playback_manager_workspace", icon='SEQ_SEQUENCER')
+            row = layout.row()
+            row.operator("tfx.open_playback_manager_workspace", icon='SEQ_SEQUENCER')
+            row.operator("tfx.compact_playback_timeline", text="", icon='ALIGN_BOTTOM')
             row = layout.row()
             row.operator("tfx.refresh_playback_drivers", text="Refresh", icon='FILE_REFRESH')
-            row.operator("tfx.remove_playback_driver", text="Remove", icon='X')
\ No newline at end of file
+            row.operator("tfx.remove_playback_driver", text="Remove", icon='X')
+            
+        if top_node.node_tree.get("tfxPlaybackControl") in (1, 2) and not top_node.node_tree.get("tfxPlaybackBaked"):
+            layout.operator("tfx.bake_playback", icon='RENDER_ANIMATION')
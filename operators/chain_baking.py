@@ -0,0 +1,135 @@
+import os
+import bpy
+from ..utils import node_utils
+from .effects_chain import create_cache_root, set_cache_point
+
+class BakeEffectsChainOperator(bpy.types.Operator):
+    """Render the output of the whole effects chain to images using background Blender processes, then display the baked images instead of the chain"""
+    bl_idname = "tfx.bake_effects_chain"
+    bl_label = "Bake Effects Chain"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    workers: bpy.props.IntProperty(
+        name='Processes',
+        description='Number of background Blender processes rendering different frames at the same time',
+        default=max(1, (os.cpu_count() or 2) // 2), min=1, soft_max=64
+    )
+    samples: bpy.props.IntProperty(
+        name='Samples',
+        description='Number of Cycles samples used for baking',
+        default=16, min=1, soft_max=256
+    )
+    directory: bpy.props.StringProperty(
+        name='Directory',
+        description='Folder to save baked images',
+        default='//tfx_bake/',
+        subtype='DIR_PATH'
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "workers")
+        layout.prop(self, "samples")
+        layout.prop(self, "directory")
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        from ..utils import worker_utils
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
+        top_tree = context.object.active_material.node_tree.nodes.active.node_tree
+        if len(node_utils.get_chain_from_tree(top_tree)) < 2:
+            self.report({'INFO'}, "The media does not have any effects.")
+            return {'CANCELLED'}
+        if "tfxCacheSource" in top_tree:
+            self.report({'INFO'}, "The effects chain is already baked.")
+            return {'CANCELLED'}
+        
+        # Frames to bake
+        scene = context.scene
+        image = node_utils.get_chain_root(top_tree).nodes['TfxMedia'].image
+        if image is not None and image.source in ('MOVIE', 'SEQUENCE'):
+            self._frames = list(range(scene.frame_start, scene.frame_end + 1))
+        else:
+            self._frames = [scene.frame_current]
+        num_workers = min(self.workers, len(self._frames))
+        
+        # Workers read a copy of the current file
+        if self.directory.startswith('//') and not bpy.data.is_saved:
+            self.report({'WARNING'}, "Save the file first or choose an absolute output folder.")
+            return {'CANCELLED'}
+        directory = bpy.path.abspath(self.directory)
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            self.report({'ERROR'}, f"Failed to create the output folder: {str(e)}")
+            return {'CANCELLED'}
+        self._blend_filepath = os.path.join(bpy.app.tempdir, f"tfx_bake_{top_tree.name}.blend")
+        bpy.ops.wm.save_as_mainfile(filepath=self._blend_filepath, copy=True)
+        self._filepath_pattern = os.path.join(directory, top_tree.name + "_{frame:04d}.exr")
+        self._top_tree_name = top_tree.name
+        
+        # Split the frame range into contiguous chunks
+        self._workers = []
+        chunk_size = (len(self._frames) + num_workers - 1) // num_workers
+        for i in range(0, len(self._frames), chunk_size):
+            chunk = self._frames[i:i+chunk_size]
+            argument = {
+                "top_tree": top_tree.name,
+                "frame_start": chunk[0],
+                "frame_end": chunk[-1],
+                "filepath_pattern": self._filepath_pattern,
+                "samples": self.samples,
+                "threads": max(1, (os.cpu_count() or 1) // num_workers),
+            }
+            command = worker_utils.get_worker_command(self._blend_filepath, "utils.bake_utils", "run_bake_worker", argument)
+            self._workers.append(worker_utils.WorkerProcess(command))
+        
+        context.window_manager.progress_begin(0, len(self._frames))
+        self._timer = context.window_manager.event_timer_add(0.5, window=context.window)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            for worker in self._workers:
+                worker.terminate()
+            self.finish(context)
+            self.report({'WARNING'}, "Baking cancelled.")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+        
+        finished = [worker.poll() for worker in self._workers]
+        num_done = sum(len(worker.progress) for worker in self._workers)
+        context.window_manager.progress_update(num_done)
+        context.workspace.status_text_set(f"Baking effects chain: {num_done} / {len(self._frames)} frames (ESC to cancel)")
+        if not all(finished):
+            return {'PASS_THROUGH'}
+        
+        self.finish(context)
+        failed_workers = [worker for worker in self._workers if worker.failed]
+        if len(failed_workers) > 0:
+            for worker in failed_workers:
+                message = worker.errors[-1] if worker.errors else (worker.log_tail[-1] if worker.log_tail else "Unknown error")
+                self.report({'ERROR'}, f"A baking process failed: {message}")
+            return {'CANCELLED'}
+        
+        # Display baked images in place of the chain
+        if self._top_tree_name not in bpy.data.node_groups:
+            return {'CANCELLED'}
+        top_tree = bpy.data.node_groups[self._top_tree_name]
+        filepaths = [self._filepath_pattern.format(frame=frame) for frame in self._frames]
+        set_cache_point(top_tree, create_cache_root(node_utils.get_chain_root(top_tree), filepaths, self._frames))
+        self.report({'INFO'}, f"Baked {len(self._frames)} frames.")
+        return {'FINISHED'}
+
+    def finish(self, context):
+        context.window_manager.event_timer_remove(self._timer)
+        context.window_manager.progress_end()
+        context.workspace.status_text_set(None)
+        if os.path.exists(self._blend_filepath):
+            os.remove(self._blend_filepath)
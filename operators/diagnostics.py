@@ -0,0 +1,46 @@
+import bpy
+from bpy_extras.io_utils import ExportHelper
+from ..utils import profiling
+
+class ResetProfilingOperator(bpy.types.Operator):
+    """Clear all recorded calls and counters of the instrumentation"""
+    bl_idname = "tfx.reset_profiling"
+    bl_label = "Reset Counters"
+    bl_category = 'View'
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        profiling.reset()
+        return {'FINISHED'}
+
+class ExportProfilingOperator(bpy.types.Operator, ExportHelper):
+    """Save recorded calls as JSON or as a Chrome trace, which can be opened in chrome://tracing or Perfetto"""
+    bl_idname = "tfx.export_profiling"
+    bl_label = "Export Profiling Data"
+    bl_category = 'View'
+    bl_options = {'REGISTER'}
+
+    filter_glob: bpy.props.StringProperty(
+        default='*.json',
+        options={'HIDDEN'},
+    )
+    filename_ext = '.json'
+
+    format: bpy.props.EnumProperty(
+        name='Format',
+        items=[ ('JSON', 'Counters and Events', 'Counters, slowest calls and all events in the buffer'),
+                ('CHROME', 'Chrome Trace', 'Events in the Trace Event Format')],
+        default='CHROME'
+    )
+
+    def execute(self, context):
+        try:
+            if self.format == 'CHROME':
+                profiling.export_chrome_trace(self.filepath)
+            else:
+                profiling.export_json(self.filepath)
+            self.report({'INFO'}, f"Profiling data saved to {self.filepath}.")
+        except OSError as e:
+            self.report({'WARNING'}, f"Failed to save profiling data: {str(e)}")
+            return {'CANCELLED'}
+        return {'FINISHED'}
@@ -0,0 +1,59 @@
+import bpy
+from ..utils import driver_utils
+
+class AuditDriversOperator(bpy.types.Operator):
+    """Find scripted drivers that are evaluated by Python instead of the fast simple expression evaluator"""
+    bl_idname = "tfx.audit_drivers"
+    bl_label = "Audit Drivers"
+    bl_category = 'View'
+    # An undo step is only pushed when expressions are rewritten
+    bl_options = {'REGISTER'}
+
+    fix: bpy.props.BoolProperty(
+        name='Rewrite Expressions',
+        default=False,
+        description='Rewrite expressions into equivalent simple expressions when possible'
+    )
+
+    def execute(self, context):
+        res = driver_utils.audit_drivers(fix=self.fix)
+        for item in res:
+            status = "fixed" if item["fixed"] else item["problem"]
+            self.report({'INFO'}, f"{item['id']}: {item['data_path']} = {item['expression']} ({status})")
+        num_fixed = len([item for item in res if item["fixed"]])
+        if num_fixed > 0:
+            bpy.ops.ed.undo_push(message=self.bl_label)
+        if len(res) == 0:
+            self.report({'INFO'}, "All scripted drivers use simple expressions.")
+        else:
+            self.report({'WARNING'}, f"{len(res)} drivers use Python evaluation, {num_fixed} rewritten. See the Info editor for details.")
+        return {'FINISHED'}
+
+class BenchmarkDriversOperator(bpy.types.Operator):
+    """Measure the per-frame cost of playback drivers with simple expressions and with Python evaluation"""
+    bl_idname = "tfx.benchmark_drivers"
+    bl_label = "Benchmark Drivers"
+    bl_category = 'View'
+    bl_options = {'REGISTER'}
+
+    num_media: bpy.props.IntProperty(
+        name='Media',
+        description='Number of simulated media with playback drivers',
+        default=500, min=1, soft_max=5000
+    )
+    num_frames: bpy.props.IntProperty(
+        name='Frames',
+        description='Number of frames to evaluate',
+        default=50, min=1, soft_max=1000
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        res = driver_utils.benchmark_driver_evaluation(self.num_media, self.num_frames)
+        self.report({'INFO'}, (
+            f"Per frame with {res['num_media']} media: {res['baseline_ms']:.2f} ms without drivers, {res['simple_ms']:.2f} ms with simple expressions, "
+            f"{res['python_ms']:.2f} ms with Python evaluation"
+        ))
+        return {'FINISHED'}
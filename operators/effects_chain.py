@@ -1,7 +1,9 @@
 import bpy
 from bpy_extras.io_utils import ImportHelper, ExportHelper
 import json
-from ..utils import asset_manager, node_utils, anim_utils
+import uuid
+import hashlib
+from ..utils import asset_manager, node_utils, anim_utils, chain_compiler, profiling
 
 """
 Effects chain structure:
@@ -9,12 +11,34 @@ Effects chain structure:
 Top (depth==0) and Root (depth==-1) are not allowed to be popped/swapped.
 """
 
-def set_next_depth(current_tree, next_tree):
-    current_tree.nodes['TfxNext'].node_tree = next_tree
-    i = 1
-    while f'TfxNext.{i:03}' in current_tree.nodes:
-        current_tree.nodes[f'TfxNext.{i:03}'].node_tree = next_tree
-        i += 1
+def get_effect_group_names(node_name):
+    return f'tfx_effect_{node_name}', f'tfx_param_{node_name}'
+
+def create_effect_instance(asset_file_name, fx_group_name, param_group_name):
+    fx_node_group = asset_manager.create_node_group_instance(asset_file_name, fx_group_name)
+    param_node_group = asset_manager.create_node_group_instance(asset_file_name, param_group_name)
+    fx_node_group.nodes['TfxParam'].node_tree = param_node_group
+    return fx_node_group
+
+def insert_effects(top_tree, fx_node_groups):
+    """
+    Link new effects right below the top of the chain.
+    The first effect in the list is the closest to the media, the last one is the closest to the top
+    """
+    chain_compiler.restore_chain(top_tree)
+    inner_node_tree = top_tree.nodes['TfxNext'].node_tree
+    root_node_tree = node_utils.get_chain_root(top_tree)
+    
+    for fx_node_group in fx_node_groups:
+        node_utils.set_next_depth(fx_node_group, inner_node_tree)
+        fx_node_group.nodes['TfxRoot'].node_tree = root_node_tree
+        inner_node_tree = fx_node_group
+    node_utils.set_next_depth(top_tree, inner_node_tree)
+    
+    # The new effects are not part of the cached chain
+    if "tfxCacheSource" in top_tree and len(fx_node_groups) > 0:
+        fx_node_groups[0]["tfxCacheSource"] = top_tree["tfxCacheSource"]
+        del top_tree["tfxCacheSource"]
 
 class PushEffectOperator(bpy.types.Operator):
     """Add a new effect to the media"""
@@ -27,23 +51,13 @@ class PushEffectOperator(bpy.types.Operator):
     param_group_name: bpy.props.StringProperty(default='')
     asset_file_name: bpy.props.StringProperty(default='')
     
+    @profiling.profiled_callback("op:tfx.push_effect")
     def execute(self, context):
         if not node_utils.is_active_node_tfx():
             return {'CANCELLED'}
-        fx_node_group = asset_manager.create_node_group_instance(self.asset_file_name, self.fx_group_name)
-        param_node_group = asset_manager.create_node_group_instance(self.asset_file_name, self.param_group_name)
-        fx_node_group.nodes['TfxParam'].node_tree = param_node_group
-
+        fx_node_group = create_effect_instance(self.asset_file_name, self.fx_group_name, self.param_group_name)
         top_node = context.object.active_material.node_tree.nodes.active
-        inner_node_tree = top_node.node_tree.nodes['TfxNext'].node_tree
-        
-        set_next_depth(top_node.node_tree, fx_node_group)
-        set_next_depth(fx_node_group, inner_node_tree)
-
-        if 'TfxRoot' in inner_node_tree.nodes:
-            fx_node_group.nodes['TfxRoot'].node_tree = inner_node_tree.nodes['TfxRoot'].node_tree
-        else:
-            fx_node_group.nodes['TfxRoot'].node_tree = inner_node_tree
+        insert_effects(top_node.node_tree, [fx_node_group])
         
         return {'FINISHED'}
 
@@ -56,16 +70,20 @@ class PopEffectOperator(bpy.types.Operator):
 
     depth: bpy.props.IntProperty()
 
+    @profiling.profiled_callback("op:tfx.pop_effect")
     def execute(self, context):
         if not node_utils.is_active_node_tfx():
             return {'CANCELLED'}
         active_node = context.object.active_material.node_tree.nodes.active
+        if self.depth >= len(node_utils.get_effect_chain_nodes()) or self.depth <= 0:
+            return {'CANCELLED'}
+        chain_compiler.restore_chain(active_node.node_tree)
+        clear_chain_caches(active_node.node_tree)
+        fork_shared_chain_before_edit(context, active_node.node_tree, self.depth-1)
         
         # Other cases
         chain = node_utils.get_effect_chain_nodes()
-        if self.depth >= len(chain) or self.depth <= 0:
-            return {'CANCELLED'}
-        set_next_depth(chain[self.depth-1][0], chain[self.depth][0].nodes["TfxNext"].node_tree)
+        node_utils.set_next_depth(chain[self.depth-1][0], chain[self.depth][0].nodes["TfxNext"].node_tree)
 
         return {'FINISHED'}
     
@@ -78,31 +96,176 @@ class SwapEffectOperator(bpy.types.Operator):
 
     depth: bpy.props.IntProperty() # Swap effects at depth and depth+1
 
+    @profiling.profiled_callback("op:tfx.swap_effect")
     def execute(self, context):
         if not node_utils.is_active_node_tfx():
             return {'CANCELLED'}
         active_node = context.object.active_material.node_tree.nodes.active
+        if self.depth >= len(node_utils.get_effect_chain_nodes())-1 or self.depth <= 0:
+            return {'CANCELLED'}
+        chain_compiler.restore_chain(active_node.node_tree)
+        clear_chain_caches(active_node.node_tree)
+        fork_shared_chain_before_edit(context, active_node.node_tree, self.depth+1)
 
         chain = node_utils.get_effect_chain_nodes()
-        if self.depth >= len(chain)-1 or self.depth <= 0:
-            return {'CANCELLED'}
 
         # Step 1: depth->depth+1 ==> depth->depth+2
-        set_next_depth(chain[self.depth][0], chain[self.depth+1][0].nodes["TfxNext"].node_tree)
+        node_utils.set_next_depth(chain[self.depth][0], chain[self.depth+1][0].nodes["TfxNext"].node_tree)
 
         # Step 2: depth-1->depth ==> depth-1->depth+1
         if self.depth > 0:
-            set_next_depth(chain[self.depth-1][0], chain[self.depth+1][0])
+            node_utils.set_next_depth(chain[self.depth-1][0], chain[self.depth+1][0])
         else:
             outer_nodes = [node for node in context.object.active_material.node_tree.nodes if node.type == 'GROUP' and node.node_tree == active_node.node_tree]
             for outer_node in outer_nodes:
                 outer_node.node_tree = chain[self.depth+1][0]
 
         # Step 3: depth+1->depth+2 ==> depth+1->depth
-        set_next_depth(chain[self.depth+1][0], chain[self.depth][0])
+        node_utils.set_next_depth(chain[self.depth+1][0], chain[self.depth][0])
 
         return {'FINISHED'}
     
+"""
+Cache points:
+An effect sampling its downstream chain N times multiplies the node count of everything below it by N.
+A cache point bakes the downstream chain to images and links the effect to a media node group showing these images instead.
+The original downstream node group is kept with a fake user and its name is stored in the "tfxCacheSource" property.
+"""
+
+def create_cache_root(root_tree, filepaths, frames):
+    """
+    Create a media node group displaying baked images, with the same display settings as the original media
+    """
+    cache_root = asset_manager.create_node_group_instance(None, 'tfx_texture')
+    image = bpy.data.images.load(filepaths[0], check_existing=False)
+    image_node, src_image_node = cache_root.nodes['TfxMedia'], root_tree.nodes['TfxMedia']
+    image_node.image = image
+    image_node.interpolation = src_image_node.interpolation
+    image_node.projection = src_image_node.projection
+    image_node.extension = src_image_node.extension
+    if len(frames) > 1:
+        # Files are numbered by scene frames
+        image.source = 'SEQUENCE'
+        image_user = image_node.image_user
+        image_user.frame_start = frames[0]
+        image_user.frame_offset = frames[0] - 1
+        image_user.frame_duration = len(frames)
+        image_user.use_auto_refresh = True
+        image_user.use_cyclic = False
+    for i in range(2):
+        cache_root.nodes['TfxRatio'].inputs[i].default_value = root_tree.nodes['TfxRatio'].inputs[i].default_value
+    return cache_root
+
+def set_cache_point(tree, cache_root):
+    """
+    Link a node group of the chain to a cache instead of its downstream chain
+    """
+    if "tfxCacheSource" in tree:
+        clear_cache_point(tree)
+    source_tree = tree.nodes['TfxNext'].node_tree
+    source_tree.use_fake_user = True
+    tree["tfxCacheSource"] = source_tree.name
+    node_utils.set_next_depth(tree, cache_root)
+
+def clear_cache_point(tree):
+    cache_root = tree.nodes['TfxNext'].node_tree
+    source_name = tree["tfxCacheSource"]
+    del tree["tfxCacheSource"]
+    if source_name in bpy.data.node_groups:
+        source_tree = bpy.data.node_groups[source_name]
+        source_tree.use_fake_user = False
+        node_utils.set_next_depth(tree, source_tree)
+    if cache_root.users == 0:
+        bpy.data.node_groups.remove(cache_root)
+
+def clear_chain_caches(top_tree):
+    for tree, _ in node_utils.get_chain_from_tree(top_tree):
+        if "tfxCacheSource" in tree:
+            clear_cache_point(tree)
+
+class SetCachePointOperator(bpy.types.Operator):
+    """Bake this effect and all effects below it to images, so that effects above sample a single texture"""
+    bl_idname = "tfx.set_cache_point"
+    bl_label = "Set Cache Point"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    depth: bpy.props.IntProperty()
+    samples: bpy.props.IntProperty(
+        name='Samples',
+        description='Number of Cycles samples used for baking',
+        default=16, min=1, soft_max=256
+    )
+    directory: bpy.props.StringProperty(
+        name='Directory',
+        description='Folder to save baked images',
+        default='//tfx_cache/',
+        subtype='DIR_PATH'
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "samples")
+        layout.prop(self, "directory")
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        import os
+        from ..utils import bake_utils
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
+        chain = node_utils.get_effect_chain_nodes()
+        if self.depth >= len(chain) or self.depth <= 0:
+            return {'CANCELLED'}
+        chain_compiler.restore_chain(context.object.active_material.node_tree.nodes.active.node_tree)
+        
+        tree, source_tree = chain[self.depth-1][0], chain[self.depth][0]
+        root_tree = node_utils.get_chain_root(source_tree)
+        image = root_tree.nodes['TfxMedia'].image
+        if image is not None and image.source in ('MOVIE', 'SEQUENCE'):
+            frames = list(range(context.scene.frame_start, context.scene.frame_end + 1))
+        else:
+            frames = [context.scene.frame_current]
+        
+        if self.directory.startswith('//') and not bpy.data.is_saved:
+            self.report({'WARNING'}, "Save the file first or choose an absolute output folder.")
+            return {'CANCELLED'}
+        directory = bpy.path.abspath(self.directory)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            filepaths = bake_utils.bake_chain_frames(
+                source_tree, root_tree, frames,
+                os.path.join(directory, source_tree.name + "_{frame:04d}.exr"),
+                samples=self.samples
+            )
+        except Exception as e:
+            self.report({'ERROR'}, f"Failed to bake the effects chain: {str(e)}")
+            return {'CANCELLED'}
+        
+        set_cache_point(tree, create_cache_root(root_tree, filepaths, frames))
+        return {'FINISHED'}
+
+class ClearCachePointOperator(bpy.types.Operator):
+    """Link the effect to its original downstream chain again"""
+    bl_idname = "tfx.clear_cache_point"
+    bl_label = "Clear Cache Point"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    depth: bpy.props.IntProperty()
+
+    def execute(self, context):
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
+        chain = node_utils.get_effect_chain_nodes()
+        if self.depth >= len(chain) or self.depth <= 0 or "tfxCacheSource" not in chain[self.depth-1][0]:
+            return {'CANCELLED'}
+        chain_compiler.restore_chain(context.object.active_material.node_tree.nodes.active.node_tree)
+        clear_cache_point(chain[self.depth-1][0])
+        return {'FINISHED'}
+
 class SetEffectLocationDriverOperator(bpy.types.Operator):
     """Select an object to use its global location as a reference for the effect"""
     bl_idname = "tfx.set_effect_location_driver"
@@ -250,20 +413,9 @@ class SetTransitionPlaybackDriverOperator(bpy.types.Operator):
             )
         else:
             subject = anim_utils.get_global_playback_manager()
-            track_name, strip_name = None, None
-            if subject and subject.animation_data:
-                for track in subject.animation_data.nla_tracks:
-                    for strip in track.strips:
-                        if strip.action:
-                            fcurves = anim_utils.get_action_fcurves(strip.action)
-                            for fc in fcurves:
-                                if fc.data_path == f'["tfxPlayhead_{suffix}"]':
-                                    track_name = track.name
-                                    strip_name = strip.name
-                                    break
-                            else:
-                                continue
-                            break
+            track, strip = anim_utils.find_playhead_strip(subject, suffix)
+            track_name = track.name if track else None
+            strip_name = strip.name if strip else None
             if track_name is None:
                 self.report({'INFO'}, "The media does not have any action strips.")
                 return {'CANCELLED'}
@@ -275,116 +427,336 @@ class SetTransitionPlaybackDriverOperator(bpy.types.Operator):
 
 
 
-def generate_json_config():
-    json_output = {"effects": []}
-    chain = node_utils.get_effect_chain_nodes()
+def get_effect_config(tree, fx_name):
+    """
+    Export parameters and promoted node attributes of an effect node group as a JSON-compatible dict
+    """
+    effect_json = {"name": fx_name, "parameters": {}, "node_attributes": []}
+
+    params = tree.nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
+    for param in params:
+        if not param.name:
+            continue
+        effect_json["parameters"][param.name] = {
+            "type": param.type, 
+            "value": tuple(param.default_value) if param.type in {'VECTOR', 'RGBA'} else param.default_value
+        }
+    
+    promoted_params = [] if "tfxPromoted" not in tree else tree["tfxPromoted"]
+    for p in promoted_params:
+        node = tree.nodes[p[0]]
+        attr_value = getattr(node, p[1])
+        v = None
+        if isinstance(attr_value, str):
+            v = attr_value
+        elif isinstance(attr_value, bpy.types.ColorRamp):
+            v = {
+                "elements": [], 
+                "interpolation": attr_value.interpolation,
+                "color_mode": attr_value.color_mode,
+                "hue_interpolation": attr_value.hue_interpolation,
+            }
+            for elem in attr_value.elements:
+                v["elements"].append({
+                    "position": elem.position,
+                    "color": [elem.color[0], elem.color[1], elem.color[2], elem.color[3]],
+                })
+        elif isinstance(attr_value, bpy.types.CurveMapping):
+            v = {"curves": []}
+            for curve in attr_value.curves:
+                curve_data = {"points": []}
+                for point in curve.points:
+                    curve_data["points"].append({
+                        "location": [point.location[0], point.location[1]],
+                        "handle_type": point.handle_type,
+                    })
+                v["curves"].append(curve_data)
+        else:
+            continue
+        effect_json["node_attributes"].append({"node": p[0], "attribute": p[1], "value": v})
+    return effect_json
+
+def get_chain_config(top_tree=None):
+    """
+    List configurations of all effects in a chain, from the closest to the media to the closest to the top
+    """
+    if top_tree is None:
+        chain = node_utils.get_effect_chain_nodes()
+    else:
+        chain = node_utils.get_chain_from_tree(top_tree)
+    effects = []
     for i,tree_info in enumerate(chain):
         if i == 0:
             continue
         if "TfxParam" not in tree_info[0].nodes:
             continue
-        effect_json = {"name": tree_info[1], "parameters": {}, "node_attributes": []}
-
-        params = tree_info[0].nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
-        for param in params:
-            if not param.name:
-                continue
-            effect_json["parameters"][param.name] = {
-                "type": param.type, 
-                "value": tuple(param.default_value) if param.type in {'VECTOR', 'RGBA'} else param.default_value
-            }
-        
-        promoted_params = [] if "tfxPromoted" not in tree_info[0] else tree_info[0]["tfxPromoted"]
-        for p in promoted_params:
-            node = tree_info[0].nodes[p[0]]
-            attr_value = getattr(node, p[1])
-            v = None
-            if isinstance(attr_value, str):
-                v = attr_value
-            elif isinstance(attr_value, bpy.types.ColorRamp):
-                v = {
-                    "elements": [], 
-                    "interpolation": attr_value.interpolation,
-                    "color_mode": attr_value.color_mode,
-                    "hue_interpolation": attr_value.hue_interpolation,
-                }
-                for elem in attr_value.elements:
-                    v["elements"].append({
-                        "position": elem.position,
-                        "color": [elem.color[0], elem.color[1], elem.color[2], elem.color[3]],
-                    })
-            elif isinstance(attr_value, bpy.types.CurveMapping):
-                v = {"curves": []}
-                for curve in attr_value.curves:
-                    curve_data = {"points": []}
-                    for point in curve.points:
-                        curve_data["points"].append({
-                            "location": [point.location[0], point.location[1]],
-                            "handle_type": point.handle_type,
-                        })
-                    v["curves"].append(curve_data)
-            else:
-                continue
-            effect_json["node_attributes"].append({"node": p[0], "attribute": p[1], "value": v})
+        effects.append(get_effect_config(tree_info[0], tree_info[1]))
+    effects.reverse()
+    return effects
 
-        json_output["effects"].append(effect_json)
-
-    json_output["effects"].reverse()
+def generate_json_config():
+    json_output = {"effects": get_chain_config()}
     return json.dumps(json_output, indent=4)
 
-def apply_json_config(json_config):
-    effects = json_config.get("effects", [])
+def apply_effect_config(tree, config):
+    """
+    Set parameters and promoted node attributes of an effect node group from its JSON configuration
+    """
+    params = tree.nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
+    for param in params:
+        if not param.name:
+            continue
+        if param.name in config["parameters"] and param.type == config["parameters"][param.name]["type"]:
+            param.default_value = config["parameters"][param.name]["value"]
+
+    for attr in config.get("node_attributes", []):
+        node = tree.nodes[attr["node"]]
+        if not hasattr(node, attr["attribute"]):
+            continue
+        attr_ref = getattr(node, attr["attribute"])
+        v = attr["value"]
+        if isinstance(attr_ref, str):
+            setattr(node, attr["attribute"], v)
+        elif isinstance(attr_ref, bpy.types.ColorRamp):
+            attr_ref.interpolation = v.get("interpolation", 'LINEAR')
+            attr_ref.color_mode = v.get("color_mode", 'RGB')
+            attr_ref.hue_interpolation = v.get("hue_interpolation", 'NEAR')
+            num_elems = len(attr_ref.elements)
+            for e_idx,elem_data in enumerate(v.get("elements", [])):
+                if e_idx < num_elems:
+                    elem = attr_ref.elements[e_idx]
+                else:
+                    elem = attr_ref.elements.new(position=elem_data["position"])
+                elem.position = elem_data["position"]
+                elem.color = elem_data["color"]
+        elif isinstance(attr_ref, bpy.types.CurveMapping):
+            for curve,curve_data in zip(attr_ref.curves, v.get("curves", [])):
+                num_points = len(curve.points)
+                for p_idx,point_data in enumerate(curve_data.get("points", [])):
+                    if p_idx < num_points:
+                        point = curve.points[p_idx]
+                    else:
+                        point = curve.points.new(position=point_data["location"][0],value=point_data["location"][1])
+                    point.location = point_data["location"]
+                    point.handle_type = point_data.get("handle_type", 'AUTO')
+
+def build_effects_chain(top_tree, effects):
+    """
+    Create all effects of a configuration and insert them into a chain in a single pass.
+    Templates are read from their blend files at most once per file
+    """
+    entries = []
+    templates = {}
     for effect in effects:
         fx = asset_manager.template_fx_lookup_map.get(effect["name"], None)
         if fx is None:
             continue
-        node_name, file_name = fx["node_name"], fx["file"]
-        bpy.ops.tfx.push_effect(
-            fx_group_name=f'tfx_effect_{node_name}',
-            param_group_name=f'tfx_param_{node_name}',
-            asset_file_name=file_name
-        )
-
-    chain = node_utils.get_effect_chain_nodes()[:len(effects)+1]
-    for config,tree_info in zip(effects, chain[:0:-1]):
-        tree = tree_info[0]
-        params = tree.nodes["TfxParam"].node_tree.nodes["Group Output"].inputs
-        for param in params:
-            if not param.name:
-                continue
-            if param.name in config["parameters"] and param.type == config["parameters"][param.name]["type"]:
-                param.default_value = config["parameters"][param.name]["value"]
-        
-        for attr in config.get("node_attributes", []):
-            node = tree.nodes[attr["node"]]
-            if not hasattr(node, attr["attribute"]):
-                continue
-            attr_ref = getattr(node, attr["attribute"])
-            v = attr["value"]
-            if isinstance(attr_ref, str):
-                setattr(node, attr["attribute"], v)
-            elif isinstance(attr_ref, bpy.types.ColorRamp):
-                attr_ref.interpolation = v.get("interpolation", 'LINEAR')
-                attr_ref.color_mode = v.get("color_mode", 'RGB')
-                attr_ref.hue_interpolation = v.get("hue_interpolation", 'NEAR')
-                num_elems = len(attr_ref.elements)
-                for e_idx,elem_data in enumerate(v.get("elements", [])):
-                    if e_idx < num_elems:
-                        elem = attr_ref.elements[e_idx]
-                    else:
-                        elem = attr_ref.elements.new(position=elem_data["position"])
-                    elem.position = elem_data["position"]
-                    elem.color = elem_data["color"]
-            elif isinstance(attr_ref, bpy.types.CurveMapping):
-                for curve,curve_data in zip(attr_ref.curves, v.get("curves", [])):
-                    num_points = len(curve.points)
-                    for p_idx,point_data in enumerate(curve_data.get("points", [])):
-                        if p_idx < num_points:
-                            point = curve.points[p_idx]
-                        else:
-                            point = curve.points.new(position=point_data["location"][0],value=point_data["location"][1])
-                        point.location = point_data["location"]
-                        point.handle_type = point_data.get("handle_type", 'AUTO')
+        entries.append((effect, fx))
+        templates.setdefault(fx["file"], []).extend(get_effect_group_names(fx["node_name"]))
+    for file_name, group_names in templates.items():
+        asset_manager.load_node_group_templates(file_name, group_names)
+    
+    fx_node_groups = []
+    for effect, fx in entries:
+        fx_node_group = create_effect_instance(fx["file"], *get_effect_group_names(fx["node_name"]))
+        apply_effect_config(fx_node_group, effect)
+        fx_node_groups.append(fx_node_group)
+    insert_effects(top_tree, fx_node_groups)
+    return fx_node_groups
+
+"""
+Instanced chains:
+Since each effect is linked to the media through TfxNext, effect node groups can only be shared by materials showing the same media.
+Such materials keep their own Top node groups, which link to a shared chain marked by a key computed from the media and all effect configurations.
+Shared effects can still be edited in place, for example when copy-on-write is disabled or through parameters and drivers,
+so a key computed from the content of the chain is stored as well, and the key is checked against it whenever the chain is looked up.
+"""
+
+shared_chain_lookup = {}
+
+def normalize_config_values(value):
+    """
+    Round float values so that configurations read from float sockets and from JSON give the same key
+    """
+    if isinstance(value, float):
+        return round(value, 5)
+    if isinstance(value, (list, tuple)):
+        return [normalize_config_values(v) for v in value]
+    if isinstance(value, dict):
+        return {k: normalize_config_values(v) for k,v in value.items()}
+    return value
+
+def get_chain_share_key(root_tree, effects):
+    if root_tree.animation_data and len(root_tree.animation_data.drivers) > 0:
+        # Media with playback controllers have their own timing
+        return None
+    image_node = root_tree.nodes["TfxMedia"]
+    if image_node.image is None:
+        return None
+    image_user = image_node.image_user
+    media_signature = [
+        image_node.image.name, image_node.interpolation, image_node.projection, image_node.extension,
+        image_user.frame_start, image_user.frame_duration, image_user.frame_offset, image_user.use_cyclic
+    ]
+    data = json.dumps([media_signature, normalize_config_values(effects)], sort_keys=True)
+    return hashlib.sha1(data.encode()).hexdigest()
+
+def get_chain_content_key(head_tree):
+    """
+    Compute the key of a chain from the current configurations of its effects, or None if any of them is animated
+    """
+    effects = []
+    for tree, fx_name in node_utils.get_chain_from_tree(head_tree):
+        if "TfxParam" not in tree.nodes:
+            continue
+        for id_data in (tree, tree.nodes["TfxParam"].node_tree):
+            if id_data.animation_data and (len(id_data.animation_data.drivers) > 0 or id_data.animation_data.action):
+                return None
+        effects.append(get_effect_config(tree, fx_name))
+    effects.reverse()
+    return get_chain_share_key(node_utils.get_chain_root(head_tree), effects)
+
+def set_share_key(head_tree, share_key):
+    content_key = get_chain_content_key(head_tree)
+    if content_key is None:
+        return
+    head_tree["tfxShareKey"] = share_key
+    head_tree["tfxShareContent"] = content_key
+    shared_chain_lookup[share_key] = head_tree.name
+
+def remove_share_key(tree):
+    for key in ("tfxShareKey", "tfxShareContent"):
+        if key in tree:
+            del tree[key]
+
+def update_share_key(head_tree):
+    """
+    Recompute the key of a shared chain whose effects were edited in place, or remove it if the chain can no longer match a configuration.
+    Return the valid key or None
+    """
+    content_key = get_chain_content_key(head_tree)
+    if content_key is None:
+        remove_share_key(head_tree)
+        return None
+    if head_tree.get("tfxShareContent") != content_key:
+        set_share_key(head_tree, content_key)
+    return head_tree["tfxShareKey"]
+
+def find_shared_chain(share_key):
+    name = shared_chain_lookup.get(share_key)
+    if name in bpy.data.node_groups and bpy.data.node_groups[name].get("tfxShareKey") == share_key:
+        if update_share_key(bpy.data.node_groups[name]) == share_key:
+            return bpy.data.node_groups[name]
+    for tree in bpy.data.node_groups:
+        if tree.get("tfxShareKey") == share_key and update_share_key(tree) == share_key:
+            shared_chain_lookup[share_key] = tree.name
+            return tree
+    return None
+
+def get_first_shared_depth(chain):
+    for i,tree_info in enumerate(chain):
+        if i > 0 and "tfxShareKey" in tree_info[0]:
+            return i
+    return None
+
+def build_instanced_effects_chain(top_tree, effects):
+    """
+    Add effects to a chain, reusing the node groups of an identical chain if one exists
+    """
+    root_node_tree = node_utils.get_chain_root(top_tree)
+    share_key = get_chain_share_key(root_node_tree, get_chain_config(top_tree) + list(effects))
+    if share_key is None:
+        return build_effects_chain(top_tree, effects)
+    
+    shared_head = find_shared_chain(share_key)
+    if shared_head is None:
+        fx_node_groups = build_effects_chain(top_tree, effects)
+        if len(fx_node_groups) > 0:
+            set_share_key(fx_node_groups[-1], share_key)
+        return fx_node_groups
+    
+    # The previous chain of this material is no longer used and will be purged when saving the file
+    chain_compiler.restore_chain(top_tree)
+    node_utils.set_next_depth(top_tree, shared_head)
+    top_tree.nodes['TfxRoot'].node_tree = node_utils.get_chain_root(shared_head)
+    return []
+
+def count_chain_users(head_tree):
+    """
+    Count the node groups linked to the head of a shared chain, including compiled chains that only reach it through "tfxLogicalNext"
+    """
+    return len([tree for tree in bpy.data.node_groups if 'TfxNext' in tree.nodes and
+                (tree.nodes['TfxNext'].node_tree == head_tree or tree.get("tfxLogicalNext") == head_tree.name)])
+
+def make_chain_single_user(top_tree):
+    """
+    Copy the shared part of a chain so that edits do not affect other materials
+    """
+    chain_compiler.restore_chain(top_tree)
+    clear_chain_caches(top_tree)
+    chain = node_utils.get_chain_from_tree(top_tree)
+    first_shared = get_first_shared_depth(chain)
+    if first_shared is None:
+        return False
+    
+    # Nobody else uses the chain: simply take the ownership
+    if count_chain_users(chain[first_shared][0]) < 2:
+        remove_share_key(chain[first_shared][0])
+        return True
+    
+    new_root = node_utils.get_chain_root(top_tree).copy()
+    new_root.name = f"tfx_texture_{str(uuid.uuid4())[:8]}"
+    for tree, _ in chain[:first_shared]:
+        tree.nodes['TfxRoot'].node_tree = new_root
+    
+    prev_tree = chain[first_shared-1][0]
+    for tree, _ in chain[first_shared:]:
+        new_tree = tree.copy()
+        # Other compiled chains may still leave the shared effect out
+        for key in ("tfxShareKey", "tfxShareContent", "tfxCompiledOut"):
+            if key in new_tree:
+                del new_tree[key]
+        new_tree.use_fake_user = False
+        new_tree.nodes['TfxParam'].node_tree = tree.nodes['TfxParam'].node_tree.copy()
+        new_tree.nodes['TfxRoot'].node_tree = new_root
+        node_utils.set_next_depth(prev_tree, new_tree)
+        prev_tree = new_tree
+    node_utils.set_next_depth(prev_tree, new_root)
+    return True
+
+def fork_shared_chain_before_edit(context, top_tree, max_write_depth):
+    """
+    Copy-on-write: called by operators that modify node groups of the chain up to a certain depth
+    """
+    if not context.scene.tfx_fork_shared_chains:
+        return False
+    first_shared = get_first_shared_depth(node_utils.get_chain_from_tree(top_tree))
+    if first_shared is None or first_shared > max_write_depth:
+        return False
+    return make_chain_single_user(top_tree)
+
+@profiling.profiled("op:apply_json_config")
+def apply_json_config(json_config, top_tree=None, instanced=False):
+    if top_tree is None:
+        top_tree = bpy.context.object.active_material.node_tree.nodes.active.node_tree
+    if instanced:
+        return build_instanced_effects_chain(top_tree, json_config.get("effects", []))
+    return build_effects_chain(top_tree, json_config.get("effects", []))
+
+class MakeChainSingleUserOperator(bpy.types.Operator):
+    """Copy the effects shared with other materials, so that they can be edited independently"""
+    bl_idname = "tfx.make_chain_single_user"
+    bl_label = "Make Single-User"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
+        top_node = context.object.active_material.node_tree.nodes.active
+        if not make_chain_single_user(top_node.node_tree):
+            return {'CANCELLED'}
+        return {'FINISHED'}
 
 class CopyEffectsChain(bpy.types.Operator):
     """Copy the effects chain configuration to clipboard as JSON"""
@@ -406,14 +778,22 @@ class PasteEffectsChain(bpy.types.Operator):
     bl_category = 'View'
     bl_options = {'REGISTER', 'UNDO'}
 
+    instanced: bpy.props.BoolProperty(
+        name='Instanced',
+        default=False,
+        description='Share effect node groups with other materials that show the same media with the same effects'
+    )
+
     def execute(self, context):
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
         json_config = context.window_manager.clipboard
         try:
             config = json.loads(json_config)
         except:
             self.report({'WARNING'}, "No configurations available in the clipboard.")
             return {'CANCELLED'}
-        apply_json_config(config)
+        apply_json_config(config, instanced=self.instanced)
         return {'FINISHED'}
 
 class SaveEffectsChain(bpy.types.Operator, ExportHelper):
@@ -451,8 +831,15 @@ class LoadEffectsChain(bpy.types.Operator, ImportHelper):
         default='*.json', 
         options={'HIDDEN'},
     )
+    instanced: bpy.props.BoolProperty(
+        name='Instanced',
+        default=False,
+        description='Share effect node groups with other materials that show the same media with the same effects'
+    )
     
     def execute(self, context):
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
         try:
             with open(self.filepath, 'r') as f:
                 json_config = f.read()
@@ -460,5 +847,23 @@ class LoadEffectsChain(bpy.types.Operator, ImportHelper):
         except Exception as e:
             self.report({'WARNING'}, f"Failed to load configuration: {str(e)}")
             return {'CANCELLED'}
-        apply_json_config(config)
-        return {'FINISHED'}
\ No newline at end of file
+        apply_json_config(config, instanced=self.instanced)
+        return {'FINISHED'}
+
+def register():
+    bpy.types.Scene.tfx_fork_shared_chains = bpy.props.BoolProperty(
+        name='Copy Shared Effects on Edit',
+        default=True,
+        description='When editing an effects chain shared with other materials, make a copy of it first'
+    )
+    bpy.types.Scene.tfx_compile_chains = bpy.props.BoolProperty(
+        name='Compile Effects Chains',
+        default=False,
+        description='Leave bypassed effects and effects at identity parameters out of the shaders, so that only active effects cost render time. '
+                    'Effects with animated parameters are always kept',
+        update=lambda self, context: chain_compiler.update_scene_chains(self)
+    )
+
+def unregister():
+    del bpy.types.Scene.tfx_fork_shared_chains
+    del bpy.types.Scene.tfx_compile_chains
\ No newline at end of file
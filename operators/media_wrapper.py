@@ -1,6 +1,7 @@
 import bpy
 from bpy_extras.io_utils import ImportHelper
-from ..utils import asset_manager, node_utils, media_utils
+from ..utils import asset_manager, node_utils, media_utils, profiling
+from . import playback_control
 
 def mat_image_name_search_func(self, context, edit_text):
     """
@@ -33,11 +34,8 @@ class WrapMediaOperator(bpy.types.Operator):
         self.image_name = ''
         return context.window_manager.invoke_props_dialog(self, width=500)
     
+    @profiling.profiled_callback("op:tfx.wrap_media")
     def execute(self, context):
-        # Create a new node group for this texture
-        root_group = asset_manager.create_node_group_instance(None, 'tfx_texture')
-        top_group = asset_manager.create_node_group_instance(None, 'tfx_interface')
-        
         # Find all image texture nodes given the image name
         if not context.object.active_material or not context.object.active_material.node_tree:
             self.report({'ERROR'}, 'Active object has no material or node tree')
@@ -48,52 +46,194 @@ class WrapMediaOperator(bpy.types.Operator):
         if len(tex_nodes) < 1:
             return {'FINISHED'}
         
-        for src_node in tex_nodes:
-            # Place a new shader node
-            dst_node = node_tree.nodes.new('ShaderNodeGroup')
-            dst_node.node_tree = top_group
-            dst_node.location = src_node.location
-            #dst_node.width = src_node.width
-            dst_node.label = src_node.label
-            
-            # Rewire the node graph
-            for link in src_node.inputs['Vector'].links:
-                node_tree.links.new(link.from_socket, dst_node.inputs['UV'])
-            if len(dst_node.inputs['UV'].links) < 1:
-                # The FX node group requires a UV map to work
-                uv_node = node_tree.nodes.new('ShaderNodeUVMap')
-                uv_node.location = (dst_node.location.x - 200, dst_node.location.y)
-                node_tree.links.new(uv_node.outputs['UV'], dst_node.inputs['UV'])
-            
-            for link in src_node.outputs['Color'].links:
-                node_tree.links.new(dst_node.outputs['Color'], link.to_socket)
-            for link in src_node.outputs['Alpha'].links:
-                node_tree.links.new(dst_node.outputs['Alpha'], link.to_socket)
-            node_tree.nodes.active = dst_node
+        new_nodes = wrap_texture_nodes(node_tree, tex_nodes)
+        node_tree.nodes.active = new_nodes[-1]
+        return {'FINISHED'}
+
+def get_target_objects(context, scope):
+    return context.selected_objects if scope == 'SELECTED' else context.scene.objects
+
+def iter_target_materials(objects):
+    visited = set()
+    for obj in objects:
+        for slot in obj.material_slots:
+            material = slot.material
+            if material is None or material.node_tree is None or material.name in visited:
+                continue
+            visited.add(material.name)
+            yield material
+
+class BatchWrapMediaOperator(bpy.types.Operator):
+    """Convert all image textures of selected objects or of the whole scene to node groups under the control of this add-on"""
+    bl_idname = "tfx.batch_wrap_media"
+    bl_label = "Convert All Textures to FX Nodes"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    scope: bpy.props.EnumProperty(
+        name='Scope',
+        items=[ ('SELECTED', 'Selected Objects', ''),
+                ('SCENE', 'Whole Scene', '')],
+        default='SELECTED',
+    )
+    include_images: bpy.props.BoolProperty(
+        name='Include Still Images',
+        default=True,
+        description='Also convert textures of single images besides movies and image sequences'
+    )
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    @profiling.profiled_callback("op:tfx.batch_wrap_media")
+    def execute(self, context):
+        sources = {'MOVIE', 'SEQUENCE', 'FILE'} if self.include_images else {'MOVIE', 'SEQUENCE'}
         
-        # Set the image and related properties inside the FX node group
-        top_group.nodes['TfxNext'].node_tree = root_group
-        top_group.nodes['TfxRoot'].node_tree = root_group
-        root_group.nodes['TfxMedia'].image = tex_nodes[0].image
-        root_group.nodes['TfxMedia'].interpolation = tex_nodes[0].interpolation
-        root_group.nodes['TfxMedia'].projection = tex_nodes[0].projection
-        root_group.nodes['TfxMedia'].extension = tex_nodes[0].extension
-        if tex_nodes[0].image.source in ('MOVIE', 'SEQUENCE'):
-            src_image_user, dst_image_user = tex_nodes[0].image_user, root_group.nodes['TfxMedia'].image_user
-            dst_image_user.frame_start = src_image_user.frame_start
-            dst_image_user.frame_duration = src_image_user.frame_duration
-            dst_image_user.frame_offset = src_image_user.frame_offset
-            dst_image_user.use_auto_refresh = src_image_user.use_auto_refresh
-            dst_image_user.use_cyclic = src_image_user.use_cyclic
-        root_group.nodes['TfxRatio'].inputs[0].default_value = tex_nodes[0].image.size[0]
-        root_group.nodes['TfxRatio'].inputs[1].default_value = tex_nodes[0].image.size[1]
+        # Group texture nodes by material and image
+        targets = []
+        for material in iter_target_materials(get_target_objects(context, self.scope)):
+            tex_nodes_map = {}
+            for node in material.node_tree.nodes:
+                if node.type == 'TEX_IMAGE' and node.image and node.image.source in sources:
+                    tex_nodes_map.setdefault(node.image.name, []).append(node)
+            for tex_nodes in tex_nodes_map.values():
+                targets.append((material.node_tree, tex_nodes))
+        if len(targets) == 0:
+            self.report({'INFO'}, 'No image texture to convert.')
+            return {'CANCELLED'}
         
-        # Remove the original texture nodes
-        for src_node in tex_nodes:
-            node_tree.nodes.remove(src_node)
+        # Read the template file and media metadata once for all textures
+        asset_manager.load_node_group_templates(None, ('tfx_texture', 'tfx_interface'))
+        media_utils.prefetch_media_metadata({tex_nodes[0].image.name: tex_nodes[0].image for _, tex_nodes in targets}.values())
         
+        for node_tree, tex_nodes in targets:
+            wrap_texture_nodes(node_tree, tex_nodes)
+        self.report({'INFO'}, f'Converted {len(targets)} textures.')
+        return {'FINISHED'}
+
+class BatchUnwrapMediaOperator(bpy.types.Operator):
+    """Convert all FX node groups of selected objects or of the whole scene back to plain image textures, removing their effects"""
+    bl_idname = "tfx.batch_unwrap_media"
+    bl_label = "Revert All FX Nodes to Textures"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    scope: bpy.props.EnumProperty(
+        name='Scope',
+        items=[ ('SELECTED', 'Selected Objects', ''),
+                ('SCENE', 'Whole Scene', '')],
+        default='SELECTED',
+    )
+    
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+    
+    def execute(self, context):
+        node_groups = {}
+        num_nodes = 0
+        for material in iter_target_materials(get_target_objects(context, self.scope)):
+            node_tree = material.node_tree
+            group_nodes = [node for node in node_tree.nodes if node.type == 'GROUP' and node.node_tree and "tfxName" in node.node_tree]
+            for group_node in group_nodes:
+                for tree in node_utils.collect_chain_node_groups(group_node.node_tree):
+                    node_groups[tree.name] = tree
+                if unwrap_group_node(node_tree, group_node):
+                    num_nodes += 1
+        node_utils.purge_node_groups(node_groups.values())
+        self.report({'INFO'}, f'Reverted {num_nodes} FX nodes.')
         return {'FINISHED'}
+
+def wrap_texture_nodes(node_tree, tex_nodes):
+    """
+    Replace image texture nodes of the same image in a material by FX node groups sharing one effects chain.
+    Return the new group nodes
+    """
+    # Create a new node group for this texture
+    root_group = asset_manager.create_node_group_instance(None, 'tfx_texture')
+    top_group = asset_manager.create_node_group_instance(None, 'tfx_interface')
     
+    new_nodes = []
+    for src_node in tex_nodes:
+        # Place a new shader node
+        dst_node = node_tree.nodes.new('ShaderNodeGroup')
+        dst_node.node_tree = top_group
+        dst_node.location = src_node.location
+        #dst_node.width = src_node.width
+        dst_node.label = src_node.label
+        
+        # Rewire the node graph
+        for link in src_node.inputs['Vector'].links:
+            node_tree.links.new(link.from_socket, dst_node.inputs['UV'])
+        if len(dst_node.inputs['UV'].links) < 1:
+            # The FX node group requires a UV map to work
+            uv_node = node_tree.nodes.new('ShaderNodeUVMap')
+            uv_node.location = (dst_node.location.x - 200, dst_node.location.y)
+            node_tree.links.new(uv_node.outputs['UV'], dst_node.inputs['UV'])
+        
+        for link in src_node.outputs['Color'].links:
+            node_tree.links.new(dst_node.outputs['Color'], link.to_socket)
+        for link in src_node.outputs['Alpha'].links:
+            node_tree.links.new(dst_node.outputs['Alpha'], link.to_socket)
+        new_nodes.append(dst_node)
+    
+    # Set the image and related properties inside the FX node group
+    top_group.nodes['TfxNext'].node_tree = root_group
+    top_group.nodes['TfxRoot'].node_tree = root_group
+    root_group.nodes['TfxMedia'].image = tex_nodes[0].image
+    root_group.nodes['TfxMedia'].interpolation = tex_nodes[0].interpolation
+    root_group.nodes['TfxMedia'].projection = tex_nodes[0].projection
+    root_group.nodes['TfxMedia'].extension = tex_nodes[0].extension
+    if tex_nodes[0].image.source in ('MOVIE', 'SEQUENCE'):
+        copy_image_user(tex_nodes[0].image_user, root_group.nodes['TfxMedia'].image_user)
+    width, height = media_utils.get_media_resolution(tex_nodes[0].image)
+    root_group.nodes['TfxRatio'].inputs[0].default_value = width
+    root_group.nodes['TfxRatio'].inputs[1].default_value = height
+    
+    # Remove the original texture nodes
+    for src_node in tex_nodes:
+        node_tree.nodes.remove(src_node)
+    return new_nodes
+
+def unwrap_group_node(node_tree, group_node):
+    """
+    Replace an FX group node in a material by a plain image texture node of its media.
+    The node groups of the effects chain are left to the caller to purge
+    """
+    media_tree = node_utils.get_chain_root(group_node.node_tree)
+    if media_tree is None or "TfxMedia" not in media_tree.nodes:
+        return False
+    src_node = media_tree.nodes["TfxMedia"]
+    if group_node.node_tree.get("tfxPlaybackControl") in (1, 2):
+        playback_control.remove_playback_controller(group_node.node_tree, media_tree, src_node)
+    
+    dst_node = node_tree.nodes.new('ShaderNodeTexImage')
+    dst_node.location = group_node.location
+    dst_node.label = group_node.label
+    dst_node.image = src_node.image
+    dst_node.interpolation = src_node.interpolation
+    dst_node.projection = src_node.projection
+    dst_node.extension = src_node.extension
+    if src_node.image and src_node.image.source in ('MOVIE', 'SEQUENCE'):
+        copy_image_user(src_node.image_user, dst_node.image_user)
+    
+    if 'UV' in group_node.inputs:
+        for link in group_node.inputs['UV'].links:
+            node_tree.links.new(link.from_socket, dst_node.inputs['Vector'])
+    for name in ('Color', 'Alpha'):
+        if name in group_node.outputs:
+            for link in group_node.outputs[name].links:
+                node_tree.links.new(dst_node.outputs[name], link.to_socket)
+    if node_tree.nodes.active == group_node:
+        node_tree.nodes.active = dst_node
+    node_tree.nodes.remove(group_node)
+    return True
+
+def copy_image_user(src_image_user, dst_image_user):
+    dst_image_user.frame_start = src_image_user.frame_start
+    dst_image_user.frame_duration = src_image_user.frame_duration
+    dst_image_user.frame_offset = src_image_user.frame_offset
+    dst_image_user.use_auto_refresh = src_image_user.use_auto_refresh
+    dst_image_user.use_cyclic = src_image_user.use_cyclic
     
 class ReplaceMediaOperator(bpy.types.Operator, ImportHelper):
     """For a node group under the add-on's control, replace its media file"""
@@ -146,7 +286,8 @@ class ReplaceMediaOperator(bpy.types.Operator, ImportHelper):
                 image_user.frame_offset = 0
                 image_user.use_auto_refresh = True
                 image_user.use_cyclic = True
-            node_tree.nodes['TfxRatio'].inputs[0].default_value = target_image.size[0]
-            node_tree.nodes['TfxRatio'].inputs[1].default_value = target_image.size[1]
+            width, height = media_utils.get_media_resolution(target_image)
+            node_tree.nodes['TfxRatio'].inputs[0].default_value = width
+            node_tree.nodes['TfxRatio'].inputs[1].default_value = height
         
         return {'FINISHED'}
\ No newline at end of file
@@ -1,13 +1,10 @@
 import bpy
-from ..utils import media_utils, anim_utils, node_utils, asset_manager
+from ..utils import media_utils, anim_utils, node_utils, asset_manager, driver_utils, profiling
 
-class AddPlaybackDriverOperator(bpy.types.Operator):
-    """Set up a driver to control the playback of image sequence/movie texture"""
-    bl_idname = "tfx.add_playback_driver"
-    bl_label = "Add Playback Controller"
-    bl_category = 'View'
-    bl_options = {'REGISTER', 'UNDO'}
-    
+class PlaybackOptions:
+    """
+    Playback controller options shared by operators that add controllers to one or many media
+    """
     trim_media: bpy.props.BoolProperty(
         name='Trim Media',
         default=False,
@@ -55,22 +52,27 @@ class AddPlaybackDriverOperator(bpy.types.Operator):
         default=False,
         description='Change the direction of playback in every loop'
     )
+    loop_mode: bpy.props.EnumProperty(
+        name='Loop Mode',
+        items=[ ('KEYFRAMES', 'Keyframes', 'Insert keyframes for every loop'),
+                ('CYCLES', 'Cycles Modifier', 'Keyframe a single loop and repeat it with a Cycles modifier, which keeps the animation small for any number of loops. '
+                                              'Ping-pong uses mirrored cycles, where the one-frame pause between loops happens at the end of each backward loop instead of its start. '
+                                              'A finite ping-pong with an even number of loops is keyframed loop by loop')],
+        default='KEYFRAMES',
+        description='How loops are represented in the playhead animation'
+    )
+    playback_infinite: bpy.props.BoolProperty(
+        name='Infinite',
+        default=False,
+        description='Repeat the playback forever'
+    )
     fit_scene_fps: bpy.props.BoolProperty(
         name='Fit Scene FPS',
         default=True,
         description='When the media FPS is different from the scene FPS, adjust the playback speed accordingly'
     )
     
-    def draw(self, context):
-        layout = self.layout
-        
-        row = layout.box().row()
-        message = f'Frames: {self._frame_duration}'
-        row.label(text=message, icon='INFO')
-        if self._source == 'MOVIE':
-            message = f'FPS: {self._fps:.2f}'
-            row.label(text=message)
-            
+    def draw_playback_options(self, layout, has_movie=True):
         layout.prop(self, "trim_media")
         if self.trim_media:
             row = layout.box().row()
@@ -83,12 +85,132 @@ class AddPlaybackDriverOperator(bpy.types.Operator):
         if self.add_keyframes or self.controller == 'GLOBAL':
             box = layout.box() 
             box.prop(self, 'playback_rate')
-            box.prop(self, 'playback_loops')
+            if self.controller == 'LOCAL':
+                box.prop(self, 'loop_mode')
+            row = box.row()
+            row.prop(self, 'playback_loops')
+            if self.controller == 'LOCAL' and self.loop_mode == 'CYCLES':
+                row.prop(self, 'playback_infinite')
             row = box.row()
             row.prop(self, "playback_reversed")
             row.prop(self, "playback_pingpong")
-            if self._source == 'MOVIE':
+            if has_movie:
                 box.prop(self, "fit_scene_fps")
+
+def get_playback_datapaths(options, top_tree, media_tree):
+    """
+    Return the subject, ID type and custom property names of a new playback controller, and mark the controller type in the top node group
+    """
+    if options.controller == 'LOCAL':
+        top_tree["tfxPlaybackControl"] = int(1)
+    else:
+        top_tree["tfxPlaybackControl"] = int(2)
+    return anim_utils.get_playback_datapaths(top_tree, media_tree)
+
+def get_playback_frame_range(options, media_duration):
+    """
+    Return the first frame and the number of frames to be played from the media
+    """
+    last_frame = max(options.last_frame, options.first_frame)
+    first_frame = min(options.first_frame, media_duration) if options.trim_media else 1
+    frame_duration = min(last_frame, media_duration) - first_frame + 1 if options.trim_media else media_duration
+    return first_frame, frame_duration
+
+def add_playback_controller(context, options, top_tree, media_tree, image_node, start_frame, write_properties=True):
+    """
+    Set up the playback driver of a media and keyframe its playhead from a start frame.
+    Return the last frame of the playback
+    """
+    # Get information from media and user input
+    media_duration = media_utils.get_media_duration(image_node.image)
+    media_fps = media_utils.get_media_fps(image_node.image)
+    scene_fps = context.scene.render.fps / context.scene.render.fps_base
+    first_frame, frame_duration = get_playback_frame_range(options, media_duration)
+    
+    # Disable default control
+    image_node.image_user.frame_duration = 65535
+    image_node.image_user.frame_start = 1
+    
+    # Set up custom properties
+    suffix = media_tree.name[len("tfx_texture_"):]
+    subject, id_type, datapath_start, datapath_playhead, datapath_duration = get_playback_datapaths(options, top_tree, media_tree)
+    if write_properties:
+        subject.id_properties_ensure().update({
+            datapath_duration: frame_duration,
+            datapath_start: first_frame,
+            datapath_playhead: 0.0,
+        })
+    ui = subject.id_properties_ui(datapath_playhead)
+    ui.update(soft_min=0.0, soft_max=1.0, subtype='FACTOR')
+    
+    # Set up the driver
+    anim_utils.set_playback_offset_driver(image_node.image_user, subject, id_type, datapath_start, datapath_playhead, datapath_duration)
+    
+    # Remove existing keyframes
+    if subject.animation_data and subject.animation_data.action:
+        fcurves = anim_utils.get_action_fcurves(subject.animation_data.action)
+        fc = fcurves.find(f'["{datapath_playhead}"]')
+        if fc:
+            fcurves.remove(fc)
+
+    # Insert new keyframes
+    last_frame = start_frame
+    if options.add_keyframes or options.controller == 'GLOBAL':            
+        playback_rate = options.playback_rate if not options.controller == 'GLOBAL' else 1
+        num_loops = options.playback_loops if not options.controller == 'GLOBAL' else int(1+options.playback_pingpong)
+        playback_reversed = options.playback_reversed if not options.controller == 'GLOBAL' else False
+        
+        if options.fit_scene_fps:
+            playback_rate = playback_rate * media_fps / scene_fps
+        use_cycles = options.controller == 'LOCAL' and options.loop_mode == 'CYCLES'
+        # Once a finite number of cycles has run out, the playhead holds the last keyframe of a forward loop,
+        # which is only the end value of a ping-pong playback with an odd number of loops
+        if use_cycles and options.playback_pingpong and not options.playback_infinite and num_loops % 2 == 0:
+            use_cycles = False
+        if use_cycles:
+            keys, interpolation = anim_utils.get_playhead_cycle(start_frame, frame_duration, playback_rate, playback_reversed)
+            fc = anim_utils.set_keyframes(subject, f'["{datapath_playhead}"]', keys, interpolation=interpolation)
+            anim_utils.set_playhead_cycles(fc, num_loops, options.playback_pingpong, options.playback_infinite)
+        else:
+            keys = anim_utils.get_playhead_schedule(
+                start_frame, frame_duration, playback_rate, num_loops, playback_reversed, options.playback_pingpong
+            )
+            anim_utils.set_keyframes(subject, f'["{datapath_playhead}"]', keys, interpolation='LINEAR')
+        last_frame = keys[-1][0]
+    
+    # Convert keyframes to NLA strip
+    if options.controller == 'GLOBAL':
+        track = subject.animation_data.nla_tracks.new()
+        strip = track.strips.new("tmp", start_frame, subject.animation_data.action)
+        track.name = image_node.image.name
+        strip.name = image_node.image.name
+        strip.use_reverse = options.playback_reversed
+        strip.scale = 1.0 / options.playback_rate
+        strip.repeat = options.playback_loops / (1.0 + options.playback_pingpong)
+        subject.animation_data.action = None
+        anim_utils.register_playhead_strip(subject, suffix, track, strip)
+        last_frame = strip.frame_end
+    
+    anim_utils.refresh_drivers(media_tree)
+    return last_frame
+
+class AddPlaybackDriverOperator(PlaybackOptions, bpy.types.Operator):
+    """Set up a driver to control the playback of image sequence/movie texture"""
+    bl_idname = "tfx.add_playback_driver"
+    bl_label = "Add Playback Controller"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    def draw(self, context):
+        layout = self.layout
+        
+        row = layout.box().row()
+        message = f'Frames: {self._frame_duration}'
+        row.label(text=message, icon='INFO')
+        if self._source == 'MOVIE':
+            message = f'FPS: {self._fps:.2f}'
+            row.label(text=message)
+        self.draw_playback_options(layout, self._source == 'MOVIE')
         
     def invoke(self, context, event):
         image_node, _ = node_utils.get_active_image_node()
@@ -99,113 +221,132 @@ class AddPlaybackDriverOperator(bpy.types.Operator):
         self.last_frame = self._frame_duration
         return context.window_manager.invoke_props_dialog(self, width=300)
     
+    @profiling.profiled_callback("op:tfx.add_playback_driver")
     def execute(self, context):
         image_node, media_node_tree = node_utils.get_active_image_node()
         top_node = context.object.active_material.node_tree.nodes.active
+        add_playback_controller(context, self, top_node.node_tree, media_node_tree, image_node, context.scene.frame_current)
+        return {'FINISHED'}
+
+class BatchAddPlaybackDriverOperator(PlaybackOptions, bpy.types.Operator):
+    """Set up playback controllers with the same settings for all movies and image sequences of selected objects"""
+    bl_idname = "tfx.batch_add_playback_driver"
+    bl_label = "Add Playback Controllers to Selected"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    replace_existing: bpy.props.BoolProperty(
+        name='Replace Existing',
+        default=False,
+        description='Also set up media that already have a playback controller'
+    )
+    sequential: bpy.props.BoolProperty(
+        name='Sequential Layout',
+        default=False,
+        description='Place the clips one after another on the timeline of the global manager, in the order of object names'
+    )
+    sequence_gap: bpy.props.IntProperty(
+        name='Gap',
+        description='Number of frames between two clips',
+        default=0, min=0
+    )
+    
+    def get_media_items(self, context):
+        media_items = []
+        for top_tree, media_tree, image_node in node_utils.iter_objects_media(sorted(context.selected_objects, key=lambda obj: obj.name)):
+            if not image_node.image or image_node.image.source not in ('SEQUENCE', 'MOVIE'):
+                continue
+            if top_tree.get("tfxPlaybackControl") in (1, 2) and not self.replace_existing:
+                continue
+            media_items.append((top_tree, media_tree, image_node))
+        return media_items
+    
+    def draw(self, context):
+        layout = self.layout
+        layout.box().label(text=f'Media: {self._num_media}', icon='INFO')
+        layout.prop(self, "replace_existing")
+        self.draw_playback_options(layout)
+        if self.controller == 'GLOBAL':
+            row = layout.row()
+            row.prop(self, "sequential")
+            if self.sequential:
+                row.prop(self, "sequence_gap")
+    
+    def invoke(self, context, event):
+        self.replace_existing = False
+        self._num_media = len(self.get_media_items(context))
+        return context.window_manager.invoke_props_dialog(self, width=300)
+    
+    @profiling.profiled_callback("op:tfx.batch_add_playback_driver")
+    def execute(self, context):
+        media_items = self.get_media_items(context)
+        if len(media_items) == 0:
+            self.report({'INFO'}, "No movie or image sequence without a playback controller is found in the selected objects.")
+            return {'CANCELLED'}
         
-        # Get information from media and user input
-        media_duration = media_utils.get_media_duration(image_node.image)
-        media_fps = media_utils.get_media_fps(image_node.image)
-        scene_fps = context.scene.render.fps / context.scene.render.fps_base
-        
-        if self.last_frame < self.first_frame:
-            self.last_frame = self.first_frame
-            
-        first_frame = min(self.first_frame, media_duration) if self.trim_media else 1
-        frame_duration = min(self.last_frame, media_duration) - first_frame + 1 if self.trim_media else media_duration
+        # Read metadata of all files at once, so that each unique file is probed only once
+        media_utils.prefetch_media_metadata([image_node.image for _, _, image_node in media_items])
         
-        # Disable default control
-        image_node.image_user.frame_duration = 65535
-        image_node.image_user.frame_start = 1
+        for top_tree, media_tree, image_node in media_items:
+            if top_tree.get("tfxPlaybackControl") in (1, 2):
+                remove_playback_controller(top_tree, media_tree, image_node)
         
-        # Set up custom properties
-        suffix = media_node_tree.name[len("tfx_texture_"):]
-        if self.controller == 'LOCAL':
-            datapath_start = 'tfxFirstFrame'
-            datapath_duration = 'tfxFrameDuration'
-            datapath_playhead = 'tfxPlayhead'
-            subject = top_node.node_tree
-            id_type = 'NODETREE'
-            top_node.node_tree["tfxPlaybackControl"] = int(1)
-        else:
-            datapath_start = f'tfxFirstFrame_{suffix}'
-            datapath_duration = f'tfxFrameDuration_{suffix}'
-            datapath_playhead = f'tfxPlayhead_{suffix}'
+        # Custom properties of the global manager are written in a single update
+        write_properties = self.controller == 'LOCAL'
+        if not write_properties:
             subject = anim_utils.get_global_playback_manager()
-            id_type = 'OBJECT'
-            top_node.node_tree["tfxPlaybackControl"] = int(2)
-        subject[datapath_duration] = frame_duration
-        subject[datapath_start] = first_frame
-        subject[datapath_playhead] = 0.0
-        ui = subject.id_properties_ui(datapath_playhead)
-        ui.update(soft_min=0.0, soft_max=1.0, subtype='FACTOR')
-        
-        # Set up the driver
-        image_node.image_user.driver_remove('frame_offset')
-        fc = image_node.image_user.driver_add('frame_offset')
-        fc.driver.type = 'SCRIPTED'
-        anim_utils.add_driver_variable(fc.driver, subject, datapath_start, 's', id_type=id_type)
-        anim_utils.add_driver_variable(fc.driver, subject, datapath_playhead, 'p', id_type=id_type)
-        anim_utils.add_driver_variable(fc.driver, subject, datapath_duration, 'd', id_type=id_type)
-        anim_utils.add_driver_variable(fc.driver, bpy.context.scene, 'frame_current', 't', id_type='SCENE', custom_property=False)
-        fc.driver.expression = "int(min(max(floor(p*d)+s-t, s-t), s+d-t-1))"
+            props = {}
+            for top_tree, media_tree, image_node in media_items:
+                _, _, datapath_start, datapath_playhead, datapath_duration = get_playback_datapaths(self, top_tree, media_tree)
+                first_frame, frame_duration = get_playback_frame_range(self, media_utils.get_media_duration(image_node.image))
+                props.update({datapath_duration: frame_duration, datapath_start: first_frame, datapath_playhead: 0.0})
+            subject.id_properties_ensure().update(props)
         
-        # Remove existing keyframes
+        start_frame = context.scene.frame_current
+        for top_tree, media_tree, image_node in media_items:
+            last_frame = add_playback_controller(context, self, top_tree, media_tree, image_node, start_frame, write_properties)
+            if self.controller == 'GLOBAL' and self.sequential:
+                start_frame = int(last_frame) + 1 + self.sequence_gap
+        self.report({'INFO'}, f"Added playback controllers to {len(media_items)} media.")
+        return {'FINISHED'}
+    
+def remove_playback_controller(top_tree, media_tree, image_node):
+    media_duration = media_utils.get_media_duration(image_node.image)
+    
+    anim_utils.unbake_playback(top_tree, media_tree, image_node)
+    image_node.image_user.driver_remove('frame_offset')
+    image_node.image_user.frame_duration = media_duration
+    image_node.image_user.frame_start = 1
+    image_node.image_user.frame_offset = 0
+    
+    if top_tree["tfxPlaybackControl"] == 1:
+        subject = top_tree
         if subject.animation_data and subject.animation_data.action:
             fcurves = anim_utils.get_action_fcurves(subject.animation_data.action)
-            fc = fcurves.find(f'["{datapath_playhead}"]')
+            fc = fcurves.find('["tfxPlayhead"]')
             if fc:
                 fcurves.remove(fc)
-
-        # Insert new keyframes   
-        if self.add_keyframes or self.controller == 'GLOBAL':            
-            frame_current = bpy.context.scene.frame_current
-            next_keyframe = frame_current
-            pingpong = False
-            
-            playback_rate = self.playback_rate if not self.controller == 'GLOBAL' else 1
-            num_loops = self.playback_loops if not self.controller == 'GLOBAL' else int(1+self.playback_pingpong)
-            playback_reversed = self.playback_reversed if not self.controller == 'GLOBAL' else False
-            
-            if self.fit_scene_fps:
-                playback_rate = playback_rate * media_fps / scene_fps
-            for _ in range(num_loops):
-                # Set start frame
-                subject[datapath_playhead] = float(playback_reversed ^ pingpong)
-                subject.keyframe_insert(f'["{datapath_playhead}"]')
-                # Set end frame
-                next_keyframe += max(1, round( (frame_duration-1.0) / playback_rate) )
-                bpy.context.scene.frame_set(next_keyframe)
-                subject[datapath_playhead] = 1.0 - float(playback_reversed ^ pingpong)
-                subject.keyframe_insert(f'["{datapath_playhead}"]')
-                next_keyframe += 1
-                bpy.context.scene.frame_set(next_keyframe)
-                
-                if self.playback_pingpong:
-                    pingpong = not pingpong
-                    
-            fcurves = anim_utils.get_action_fcurves(subject.animation_data.action)
-            for fcurve in fcurves:
-                if fcurve.data_path == f'["{datapath_playhead}"]':
-                    for point in fcurve.keyframe_points:
-                        point.interpolation = 'LINEAR'
-            bpy.context.scene.frame_set(frame_current)
-        
-        # Convert keyframes to NLA strip
-        if self.controller == 'GLOBAL':
-            track = subject.animation_data.nla_tracks.new()
-            strip = track.strips.new("tmp", context.scene.frame_current, subject.animation_data.action)
-            track.name = image_node.image.name
-            strip.name = image_node.image.name
-            strip.use_reverse = self.playback_reversed
-            strip.scale = 1.0 / self.playback_rate
-            strip.repeat = self.playback_loops / (1.0 + self.playback_pingpong)
-            subject.animation_data.action = None
-        
-        bpy.ops.tfx.refresh_playback_drivers()
-        return {'FINISHED'}
-    
+        for key in ["tfxFirstFrame", "tfxFrameDuration", "tfxPlayhead", "tfxPlaybackControl"]:
+            if key in subject:
+                del subject[key]
     
+    elif top_tree["tfxPlaybackControl"] == 2:
+        subject = anim_utils.get_global_playback_manager()
+        suffix = media_tree.name[len("tfx_texture_"):]
+        for key in [f"tfxFirstFrame_{suffix}", f"tfxFrameDuration_{suffix}", f"tfxPlayhead_{suffix}"]:
+            if key in subject:
+                del subject[key]
+        
+        track, strip = anim_utils.find_playhead_strip(subject, suffix)
+        if strip:
+            track.strips.remove(strip)
+            if len(track.strips) == 0:
+                subject.animation_data.nla_tracks.remove(track)
+        anim_utils.unregister_playhead_strip(subject, suffix)
+        anim_utils.remove_playhead_rest_key(subject, suffix)
+            
+        del top_tree["tfxPlaybackControl"]
+
 class RemovePlaybackDriverOperator(bpy.types.Operator):
     """Set up a driver to control the playback of image sequence/movie texture"""
     bl_idname = "tfx.remove_playback_driver"
@@ -219,51 +360,93 @@ class RemovePlaybackDriverOperator(bpy.types.Operator):
     def execute(self, context):
         image_node, media_node_tree = node_utils.get_active_image_node()
         top_node = context.object.active_material.node_tree.nodes.active
-        media_duration = media_utils.get_media_duration(image_node.image)
-        
-        image_node.image_user.driver_remove('frame_offset')
-        image_node.image_user.frame_duration = media_duration
-        image_node.image_user.frame_start = 1
-        image_node.image_user.frame_offset = 0
-        
-        if top_node.node_tree["tfxPlaybackControl"] == 1:
-            subject = top_node.node_tree
-            if subject.animation_data and subject.animation_data.action:
-                fcurves = anim_utils.get_action_fcurves(subject.animation_data.action)
-                fc = fcurves.find('["tfxPlayhead"]')
-                if fc:
-                    fcurves.remove(fc)
-            for key in ["tfxFirstFrame", "tfxFrameDuration", "tfxPlayhead", "tfxPlaybackControl"]:
-                if key in subject:
-                    del subject[key]
-        
-        elif top_node.node_tree["tfxPlaybackControl"] == 2:
-            subject = anim_utils.get_global_playback_manager()
-            suffix = media_node_tree.name[len("tfx_texture_"):]
-            for key in [f"tfxFirstFrame_{suffix}", f"tfxFrameDuration_{suffix}", f"tfxPlayhead_{suffix}"]:
-                if key in subject:
-                    del subject[key]
-            
-            if subject.animation_data:
-                tracks_to_remove = []
-                for track in subject.animation_data.nla_tracks:
-                    for strip in track.strips:
-                        if strip.action:
-                            fcurves = anim_utils.get_action_fcurves(strip.action)
-                            for fc in fcurves:
-                                if fc.data_path == f'["tfxPlayhead_{suffix}"]':
-                                    tracks_to_remove.append(track)
-                                    break
-                            else:
-                                continue
-                            break
-                for track in tracks_to_remove:
-                    subject.animation_data.nla_tracks.remove(track)
-                
-            del top_node.node_tree["tfxPlaybackControl"]
-                
+        remove_playback_controller(top_node.node_tree, media_node_tree, image_node)
         return {'FINISHED'}
     
+class BakePlaybackOperator(bpy.types.Operator):
+    """Replace playback drivers by frame offset keyframes, so that rendering does not need to evaluate drivers or the global manager"""
+    bl_idname = "tfx.bake_playback"
+    bl_label = "Bake Playback"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope: bpy.props.EnumProperty(
+        name='Scope',
+        items=[ ('ACTIVE', 'Active Media', 'Only bake the playback of the active media'),
+                ('SCENE', 'All Media in Scene', 'Bake the playback of all media used by the scene')],
+        default='SCENE',
+    )
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        if self.scope == 'ACTIVE':
+            if not node_utils.is_active_node_tfx():
+                return {'CANCELLED'}
+            image_node, media_node_tree = node_utils.get_active_image_node()
+            media_items = [(context.object.active_material.node_tree.nodes.active.node_tree, media_node_tree, image_node)]
+        else:
+            media_items = list(node_utils.iter_scene_media(context.scene))
+        num_baked = anim_utils.bake_playback(context.scene, media_items)
+        self.report({'INFO'}, f"Baked the playback of {num_baked} media in frames {context.scene.frame_start}-{context.scene.frame_end}.")
+        return {'FINISHED'}
+
+class UnbakePlaybackOperator(bpy.types.Operator):
+    """Remove baked frame offset keyframes and restore the playback drivers"""
+    bl_idname = "tfx.unbake_playback"
+    bl_label = "Unbake Playback"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    scope: bpy.props.EnumProperty(
+        name='Scope',
+        items=[ ('ACTIVE', 'Active Media', 'Only restore the playback of the active media'),
+                ('SCENE', 'All Media in Scene', 'Restore the playback of all media used by the scene')],
+        default='ACTIVE',
+    )
+
+    def execute(self, context):
+        if self.scope == 'ACTIVE':
+            if not node_utils.is_active_node_tfx():
+                return {'CANCELLED'}
+            image_node, media_node_tree = node_utils.get_active_image_node()
+            media_items = [(context.object.active_material.node_tree.nodes.active.node_tree, media_node_tree, image_node)]
+        else:
+            media_items = list(node_utils.iter_scene_media(context.scene))
+        for top_tree, media_tree, image_node in media_items:
+            anim_utils.unbake_playback(top_tree, media_tree, image_node)
+        return {'FINISHED'}
+
+class CompactTimelineOperator(bpy.types.Operator):
+    """Pack the action strips of the global playback manager into as few NLA tracks as possible"""
+    bl_idname = "tfx.compact_playback_timeline"
+    bl_label = "Compact Timeline"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    measure: bpy.props.BoolProperty(
+        name='Measure Evaluation Time',
+        default=True,
+        description='Compare the time to evaluate frames of the scene before and after compaction'
+    )
+
+    def execute(self, context):
+        scene = context.scene
+        subject = anim_utils.get_global_playback_manager()
+        step = max(1, (scene.frame_end - scene.frame_start + 1) // 50)
+        frames = list(range(scene.frame_start, scene.frame_end + 1, step))
+
+        time_before = driver_utils.measure_frame_evaluation(scene, frames) if self.measure else None
+        num_tracks_before, num_tracks_after = anim_utils.compact_playback_timeline(subject, scene)
+        time_after = driver_utils.measure_frame_evaluation(scene, frames) if self.measure else None
+
+        message = f"NLA tracks: {num_tracks_before} -> {num_tracks_after}."
+        if self.measure:
+            message += f" Frame evaluation: {time_before:.2f} ms -> {time_after:.2f} ms."
+        self.report({'INFO'}, message)
+        return {'FINISHED'}
+
 class OpenGlobalManagerWorkspaceOperator(bpy.types.Operator):
     """Switch to a workspace to adjust animations of the global playback manager"""
     bl_idname = "tfx.open_playback_manager_workspace"
@@ -289,8 +472,5 @@ class RefreshDriversOperator(bpy.types.Operator):
     
     def execute(self, context):
         image_node, media_node_tree = node_utils.get_active_image_node()
-        if media_node_tree.animation_data:
-            for fc in media_node_tree.animation_data.drivers:
-                tmp = fc.driver.expression
-                fc.driver.expression = tmp
+        anim_utils.refresh_drivers(media_node_tree)
         return {'FINISHED'}
\ No newline at end of file
@@ -0,0 +1,69 @@
+import bpy
+from ..utils import node_utils
+from . import effects_chain
+
+class RefreshPresetLibraryOperator(bpy.types.Operator):
+    """Look for new, modified or deleted presets in the library directory"""
+    bl_idname = "tfx.refresh_preset_library"
+    bl_label = "Refresh Preset Library"
+    bl_category = 'View'
+    bl_options = {'REGISTER'}
+
+    def execute(self, context):
+        from ..utils import preset_library
+        preset_library.refresh_library()
+        return {'FINISHED'}
+
+class ApplyLibraryPresetOperator(bpy.types.Operator):
+    """Add the effects of a preset from the library to the active media"""
+    bl_idname = "tfx.apply_library_preset"
+    bl_label = "Apply Preset"
+    bl_category = 'View'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    preset: bpy.props.StringProperty()
+    instanced: bpy.props.BoolProperty(
+        name='Instanced',
+        default=False,
+        description='Share effect node groups with other materials that show the same media with the same effects'
+    )
+
+    def execute(self, context):
+        from ..utils import preset_library
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
+        try:
+            config = preset_library.load_preset(self.preset)
+        except Exception as e:
+            self.report({'WARNING'}, f"Failed to load preset: {str(e)}")
+            return {'CANCELLED'}
+        effects_chain.apply_json_config(config, instanced=self.instanced)
+        return {'FINISHED'}
+
+class SaveLibraryPresetOperator(bpy.types.Operator):
+    """Save the effects chain of the active media as a preset in the library"""
+    bl_idname = "tfx.save_library_preset"
+    bl_label = "Save to Library"
+    bl_category = 'View'
+    bl_options = {'REGISTER'}
+
+    preset_name: bpy.props.StringProperty(name='Name', default='New Preset')
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        from ..utils import preset_library
+        if not node_utils.is_active_node_tfx():
+            return {'CANCELLED'}
+        config = {"effects": effects_chain.get_chain_config()}
+        try:
+            filename = preset_library.save_preset(self.preset_name, config)
+        except FileExistsError:
+            self.report({'WARNING'}, f"A preset named \"{self.preset_name}\" already exists in the library.")
+            return {'CANCELLED'}
+        except Exception as e:
+            self.report({'WARNING'}, f"Failed to save preset: {str(e)}")
+            return {'CANCELLED'}
+        self.report({'INFO'}, f"Preset saved as {filename}.")
+        return {'FINISHED'}
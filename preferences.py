@@ -0,0 +1,15 @@
+import bpy
+
+class TfxAddonPreferences(bpy.types.AddonPreferences):
+    bl_idname = __package__
+
+    preset_library_dir: bpy.props.StringProperty(
+        name='Preset Library',
+        description='Directory of effects chain presets, which can be shared on a network drive. The presets shipped with the add-on are used if empty',
+        default='',
+        subtype='DIR_PATH'
+    )
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "preset_library_dir")
@@ -0,0 +1,183 @@
+import os
+import ast
+import json
+import hashlib
+
+"""
+Precomputed registration order of the add-on, so that enabling it neither imports every submodule
+nor inspects every class. The manifest is generated from the source code without Blender when the add-on is packaged
+(see scripts/pack_addon_zip.py), and is only used if the hash of the source files matches the one recorded in it.
+Otherwise, auto_load discovers modules and classes at runtime.
+This module does not depend on bpy, so that it can be used by the packaging script.
+"""
+
+manifest_filename = "registration_manifest.json"
+manifest_version = 1
+ignored_dirs = ("scripts", "__pycache__")
+
+# Same as auto_load.get_register_base_types
+register_base_types = {
+    "Panel", "Operator", "PropertyGroup",
+    "AddonPreferences", "Header", "Menu",
+    "Node", "NodeSocket", "NodeTree",
+    "UIList", "RenderEngine",
+    "Gizmo", "GizmoGroup",
+}
+
+def iter_source_files(root, relpath=''):
+    """
+    Yield relative paths of all Python files of the add-on in a stable order
+    """
+    directory = os.path.join(root, relpath)
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        entry_relpath = f"{relpath}/{name}" if relpath else name
+        if os.path.isdir(path):
+            if not name.startswith('.') and name not in ignored_dirs:
+                yield from iter_source_files(root, entry_relpath)
+        elif name.endswith('.py'):
+            yield entry_relpath
+
+def filter_source_files(relpaths):
+    """
+    Keep the Python files of a list of relative paths that iter_source_files would yield, in the same order.
+    Used when packaging, where only the files written to the zip are installed
+    """
+    res = []
+    for relpath in relpaths:
+        parts = str(relpath).replace(os.sep, '/').split('/')
+        if parts[-1].endswith('.py') and not any(part.startswith('.') or part in ignored_dirs for part in parts[:-1]):
+            res.append('/'.join(parts))
+    return sorted(res, key=lambda relpath: relpath.split('/'))
+
+def get_source_files(root, relpaths=None):
+    return list(iter_source_files(root)) if relpaths is None else filter_source_files(relpaths)
+
+def get_source_hash(root, relpaths=None):
+    sha = hashlib.sha1()
+    for relpath in get_source_files(root, relpaths):
+        sha.update(relpath.encode() + b'\0')
+        with open(os.path.join(root, relpath), 'rb') as f:
+            sha.update(f.read())
+    return sha.hexdigest()
+
+def get_bpy_type_name(node):
+    """
+    Return X if an AST node is the expression bpy.types.X
+    """
+    if (isinstance(node, ast.Attribute) and isinstance(node.value, ast.Attribute) and node.value.attr == "types"
+            and isinstance(node.value.value, ast.Name) and node.value.value.id == "bpy"):
+        return node.attr
+    return None
+
+def parse_class(node):
+    base_types = [get_bpy_type_name(base) for base in node.bases]
+    info = {"name": node.name, "register": any(name in register_base_types for name in base_types),
+            "is_panel": "Panel" in base_types, "deps": [], "parent_id": None, "idname": None}
+    for item in node.body:
+        # Pointer and collection properties depend on the class of their items
+        if isinstance(item, ast.AnnAssign) and isinstance(item.value, ast.Call):
+            for keyword in item.value.keywords:
+                if keyword.arg == "type" and isinstance(keyword.value, ast.Name):
+                    info["deps"].append(keyword.value.id)
+        elif isinstance(item, ast.Assign) and isinstance(item.value, ast.Constant) and isinstance(item.value.value, str):
+            for target in item.targets:
+                if isinstance(target, ast.Name) and target.id == "bl_parent_id":
+                    info["parent_id"] = item.value.value
+                elif isinstance(target, ast.Name) and target.id == "bl_idname":
+                    info["idname"] = item.value.value
+    return info
+
+def parse_module(filepath):
+    """
+    Return the classes defined at the top level of a module, and the names of its module-level functions
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filepath)
+    classes = [parse_class(node) for node in tree.body if isinstance(node, ast.ClassDef)]
+    functions = {node.name for node in tree.body if isinstance(node, ast.FunctionDef)}
+    return classes, functions
+
+def build_manifest(root, relpaths=None):
+    """
+    Find the classes to register and their order in the same way as auto_load, by reading the source code.
+    If given, only the listed files are considered, otherwise all source files under the root
+    """
+    modules = []
+    lazy_modules = []
+    classes = []
+    source_files = get_source_files(root, relpaths)
+    for relpath in source_files:
+        if os.path.basename(relpath) == "__init__.py":
+            continue
+        module_name = relpath[:-3].replace('/', '.')
+        module_classes, functions = parse_module(os.path.join(root, relpath))
+        module_classes = [dict(cls, module=module_name) for cls in module_classes if cls["register"]]
+        classes += module_classes
+        if module_classes or "register" in functions:
+            modules.append(module_name)
+        elif "unregister" in functions:
+            # Modules that are imported on first use may still need to release resources when the add-on is disabled
+            lazy_modules.append(module_name)
+
+    by_name = {}
+    for cls in classes:
+        by_name.setdefault(cls["name"], []).append(cls)
+    by_idname = {cls["idname"]: cls for cls in classes if cls["idname"]}
+    def find_class(name, module_name):
+        candidates = by_name.get(name, [])
+        same_module = [cls for cls in candidates if cls["module"] == module_name]
+        if same_module:
+            return same_module[0]
+        return candidates[0] if len(candidates) == 1 else None
+
+    # Same toposort as auto_load, visiting classes in the order of their definitions to make the result stable
+    deps_dict = {}
+    for cls in classes:
+        key = (cls["module"], cls["name"])
+        deps = set()
+        for name in cls["deps"]:
+            dependency = find_class(name, cls["module"])
+            if dependency is not None:
+                deps.add((dependency["module"], dependency["name"]))
+        if cls["is_panel"] and cls["parent_id"] in by_idname:
+            parent = by_idname[cls["parent_id"]]
+            deps.add((parent["module"], parent["name"]))
+        deps_dict[key] = deps
+    ordered_classes = []
+    sorted_keys = set()
+    while len(deps_dict) > 0:
+        unsorted = {}
+        for key, deps in deps_dict.items():
+            if len(deps) == 0:
+                ordered_classes.append(key)
+                sorted_keys.add(key)
+            else:
+                unsorted[key] = deps
+        if len(unsorted) == len(deps_dict):
+            raise ValueError(f"Circular dependencies between classes: {sorted(unsorted)}")
+        deps_dict = {key: deps - sorted_keys for key, deps in unsorted.items()}
+
+    return {
+        "version": manifest_version,
+        "hash": get_source_hash(root, source_files),
+        "modules": modules,
+        "lazy_modules": lazy_modules,
+        "classes": [list(key) for key in ordered_classes],
+    }
+
+def get_manifest_json(root, relpaths=None):
+    return json.dumps(build_manifest(root, relpaths), indent=1)
+
+def read_manifest(root):
+    """
+    Return the manifest if it exists and matches the current source files, otherwise None
+    """
+    try:
+        with open(os.path.join(root, manifest_filename), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != manifest_version or manifest.get("hash") != get_source_hash(root):
+        return None
+    return manifest
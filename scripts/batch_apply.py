@@ -0,0 +1,123 @@
+"""
+Apply an effects chain preset and playback settings to many blend files in parallel background Blender processes.
+
+    python scripts/batch_apply.py shots.txt --preset preset.json --material "Screen*" --save --workers 4 --report report.json
+
+The manifest is a text file with one blend file per line, or a JSON list of paths.
+Each file is processed by its own Blender process, so a crash or error only affects that file.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ADDON_ROOT = Path(__file__).resolve().parents[1]
+
+# Same prefixes as utils/worker_utils.py, which cannot be imported outside Blender
+RESULT_PREFIX = "TFX_RESULT "
+ERROR_PREFIX = "TFX_ERROR "
+
+def read_manifest(path):
+    text = Path(path).read_text(encoding="utf-8")
+    if path.endswith(".json"):
+        data = json.loads(text)
+        files = data["files"] if isinstance(data, dict) else data
+    else:
+        files = [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith("#")]
+    base_dir = Path(path).resolve().parent
+    return [str((base_dir / f).resolve()) for f in files]
+
+def get_command(blender, blend_filepath, argument):
+    expression = (
+        f"import sys, importlib; sys.path.insert(0, {str(ADDON_ROOT.parent)!r}); "
+        f"m = importlib.import_module({ADDON_ROOT.name + '.utils.headless'!r}); "
+        f"m.process_file({json.dumps(argument)!r})"
+    )
+    return [
+        blender, "-b", blend_filepath,
+        "--factory-startup", "-noaudio",
+        "--python-exit-code", "1",
+        "--python-expr", expression,
+    ]
+
+def run_file(blender, blend_filepath, argument, timeout):
+    start_time = time.perf_counter()
+    res = {"file": blend_filepath, "status": "ok", "result": None, "errors": [], "log_tail": []}
+    try:
+        proc = subprocess.run(
+            get_command(blender, blend_filepath, argument),
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            text=True, errors="replace", timeout=timeout
+        )
+        lines = proc.stdout.splitlines()
+        for line in lines:
+            if line.startswith(RESULT_PREFIX):
+                res["result"] = json.loads(line[len(RESULT_PREFIX):])
+            elif line.startswith(ERROR_PREFIX):
+                res["errors"].append(line[len(ERROR_PREFIX):])
+        res["returncode"] = proc.returncode
+        if proc.returncode != 0 or res["errors"] or res["result"] is None:
+            res["status"] = "failed"
+            res["log_tail"] = lines[-20:]
+    except subprocess.TimeoutExpired:
+        res["status"] = "timeout"
+    except OSError as e:
+        res["status"] = "failed"
+        res["errors"].append(str(e))
+    res["seconds"] = time.perf_counter() - start_time
+    return res
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("manifest", help="Text file with one blend file per line, or a JSON list")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"), help="Path to the Blender executable")
+    parser.add_argument("--preset", help="Effects chain configuration saved by the add-on")
+    parser.add_argument("--material", action="append", default=[], help="Glob pattern of material names, can be repeated")
+    parser.add_argument("--media", action="append", default=[], help="Glob pattern of image names, can be repeated")
+    parser.add_argument("--playback", help="Playback controller options as JSON")
+    parser.add_argument("--start-frame", type=int, default=None)
+    parser.add_argument("--instanced", action="store_true")
+    parser.add_argument("--save", action="store_true", help="Save each file in place")
+    parser.add_argument("--output-dir", help="Save copies of the files to this directory instead")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--timeout", type=float, default=None, help="Time limit in seconds for each file")
+    parser.add_argument("--report", help="Write per-file results to this JSON file")
+    args = parser.parse_args(argv)
+
+    files = read_manifest(args.manifest)
+    preset = str(Path(args.preset).resolve()) if args.preset else None
+    common = {
+        "preset": preset, "materials": args.material, "media": args.media,
+        "playback": json.loads(args.playback) if args.playback else None,
+        "start_frame": args.start_frame, "instanced": args.instanced, "save": args.save,
+    }
+
+    results = []
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = []
+        for f in files:
+            argument = dict(common)
+            if args.output_dir:
+                argument["output"] = str(Path(args.output_dir).resolve() / Path(f).name)
+            futures.append(pool.submit(run_file, args.blender, f, argument, args.timeout))
+        for future in as_completed(futures):
+            res = future.result()
+            results.append(res)
+            print(f"[{len(results)}/{len(files)}] {res['status']:7} {res['seconds']:7.1f}s {res['file']}", flush=True)
+            for error in res["errors"]:
+                print(f"    {error}", flush=True)
+
+    num_failed = len([res for res in results if res["status"] != "ok"])
+    print(f"{len(results) - num_failed} succeeded, {num_failed} failed in {time.perf_counter() - start_time:.1f}s")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"files": sorted(results, key=lambda res: res["file"])}, f, indent=4)
+    return 1 if num_failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
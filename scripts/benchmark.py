@@ -0,0 +1,403 @@
+"""
+Measure how the operators and panels of the add-on scale with the size of a scene.
+
+    blender -b --factory-startup --python scripts/benchmark.py -- --scale 10x4x2 --scale 50x4x2 --output results.json
+    blender -b --factory-startup --python scripts/benchmark.py -- --output new.json --compare old.json
+    python scripts/benchmark.py --compare old.json new.json
+
+A scale NxMxK generates N plane objects, each with a material of K image sequence textures
+(resources/textures/examples/test_pattern_*.png), and M effects are pushed on every wrapped texture.
+Each operation is timed per call. Python allocations are tracked with tracemalloc and the peak resident set size
+of the process is read after each operation. Results are written as JSON together with version information,
+and can be compared with the results of another version to find regressions.
+"""
+import sys
+import json
+import time
+import types
+import platform
+import argparse
+import datetime
+import statistics
+import importlib
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+ADDON_ROOT = Path(__file__).resolve().parents[1]
+SEQUENCE_FILEPATH = ADDON_ROOT / "resources" / "textures" / "examples" / "test_pattern_0001.png"
+OBJECT_PREFIX = "TfxBench"
+
+# Scene generation
+
+def parse_scale(text):
+    try:
+        num_objects, num_effects, num_media = (int(x) for x in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Scale should be given as NxMxK, got '{text}'")
+    return {"objects": num_objects, "effects": num_effects, "media": num_media}
+
+def get_scale_key(scale):
+    return f'{scale["objects"]}x{scale["effects"]}x{scale["media"]}'
+
+def clear_scene():
+    """
+    Remove all data created by a previous run, including node groups of effects chains and the playback manager
+    """
+    for obj in list(bpy.data.objects):
+        if obj.name.startswith(OBJECT_PREFIX) or obj.name == "TfxPlaybackManager":
+            bpy.data.objects.remove(obj)
+    for collection in (bpy.data.meshes, bpy.data.materials, bpy.data.images, bpy.data.actions):
+        for item in list(collection):
+            if item.name.startswith(OBJECT_PREFIX) or item.users == 0:
+                collection.remove(item)
+    for node_group in list(bpy.data.node_groups):
+        if node_group.name.startswith("tfx_"):
+            bpy.data.node_groups.remove(node_group)
+    bpy.data.orphans_purge(do_recursive=True)
+
+def generate_scene(scale):
+    """
+    Create planes with K image sequence textures in their materials. Return a list of (object, [image names])
+    """
+    scene = bpy.context.scene
+    res = []
+    for i in range(scale["objects"]):
+        mesh = bpy.data.meshes.new(f"{OBJECT_PREFIX}_{i}")
+        mesh.from_pydata([(-1, -1, 0), (1, -1, 0), (1, 1, 0), (-1, 1, 0)], [], [(0, 1, 2, 3)])
+        mesh.uv_layers.new()
+        obj = bpy.data.objects.new(f"{OBJECT_PREFIX}_{i}", mesh)
+        obj.location = (2.5 * i, 0, 0)
+        scene.collection.objects.link(obj)
+
+        material = bpy.data.materials.new(f"{OBJECT_PREFIX}_{i}")
+        material.use_nodes = True
+        obj.data.materials.append(material)
+        node_tree = material.node_tree
+        shader_node = next(node for node in node_tree.nodes if node.type == 'BSDF_PRINCIPLED')
+        image_names = []
+        for k in range(scale["media"]):
+            image = bpy.data.images.load(str(SEQUENCE_FILEPATH), check_existing=False)
+            image.name = f"{OBJECT_PREFIX}_{i}_{k}"
+            image.source = 'SEQUENCE'
+            tex_node = node_tree.nodes.new("ShaderNodeTexImage")
+            tex_node.image = image
+            tex_node.location = (-600, -300 * k)
+            if k == 0:
+                node_tree.links.new(tex_node.outputs["Color"], shader_node.inputs["Base Color"])
+            image_names.append(image.name)
+        res.append((obj, image_names))
+    return res
+
+def import_addon_module(name):
+    return importlib.import_module(f"{ADDON_ROOT.name}.{name}")
+
+def get_effect_templates():
+    asset_manager = import_addon_module("utils.asset_manager")
+    return [item for cat in asset_manager.template_fx_list for item in cat["effects"]]
+
+# Measurement
+
+def get_max_rss_kb():
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes on Linux
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+class Recorder:
+    """
+    Collect timings and memory usage of the operations of one run
+    """
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.operations = {}
+
+    def measure(self, name, calls):
+        """
+        Call each function of an iterable, timing every call. A function may return a set of operator results
+        """
+        durations = []
+        cancelled = 0
+        if self.trace_memory:
+            traced_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        for func in calls:
+            start_time = time.perf_counter()
+            ret = func()
+            durations.append((time.perf_counter() - start_time) * 1000.0)
+            if isinstance(ret, set) and 'CANCELLED' in ret:
+                cancelled += 1
+        self.add(name, durations, cancelled, tracemalloc.get_traced_memory()[1] - traced_start if self.trace_memory else None)
+
+    def add(self, name, durations, cancelled=0, traced_peak=None):
+        stats = {"calls": len(durations), "cancelled": cancelled}
+        if durations:
+            stats.update({
+                "total_ms": sum(durations),
+                "mean_ms": statistics.fmean(durations),
+                "median_ms": statistics.median(durations),
+                "min_ms": min(durations),
+                "max_ms": max(durations),
+            })
+        stats["traced_peak_kb"] = traced_peak // 1024 if traced_peak is not None else None
+        stats["max_rss_kb"] = get_max_rss_kb()
+        self.operations[name] = stats
+        if durations:
+            print(f"  {name:32} {len(durations):6} calls {stats['median_ms']:10.3f} ms median {stats['total_ms']:12.1f} ms total", flush=True)
+        else:
+            print(f"  {name:32} skipped", flush=True)
+
+class NullLayout:
+    """
+    Stand-in for UILayout that accepts every call, so that panel draw functions can run without a window.
+    Only the number of layout calls is recorded
+    """
+    def __init__(self, counter):
+        object.__setattr__(self, "_counter", counter)
+
+    def __getattr__(self, name):
+        return self._call
+
+    def __setattr__(self, name, value):
+        pass
+
+    def _call(self, *args, **kwargs):
+        self._counter[0] += 1
+        return self
+
+    def panel(self, *args, **kwargs):
+        self._counter[0] += 1
+        return self, self
+
+    panel_prop = panel
+
+def get_addon_panels(addon):
+    return [cls for cls in addon.auto_load.ordered_classes
+            if issubclass(cls, bpy.types.Panel) and getattr(cls, "bl_category", '') == "TexFX"]
+
+def draw_panels(panels, panel_fx, layout_calls):
+    """
+    Draw all panels of the add-on whose poll succeeds, the same way as a redraw of the sidebar.
+    UI lists are synchronized directly since timers do not run in background mode
+    """
+    context = bpy.context
+    for cls in panels:
+        if hasattr(cls, "poll") and not cls.poll(context):
+            continue
+        cls.draw(types.SimpleNamespace(layout=NullLayout(layout_calls)), context)
+    if panel_fx.chain_sync_state["pending"]:
+        panel_fx.sync_chain_items()
+
+# Benchmark
+
+def set_active_node(obj, group_node):
+    bpy.context.view_layer.objects.active = obj
+    obj.active_material.node_tree.nodes.active = group_node
+
+def get_wrapped_nodes(items):
+    res = []
+    for obj, _ in items:
+        for node in obj.active_material.node_tree.nodes:
+            if node.type == 'GROUP' and node.node_tree is not None and "tfxName" in node.node_tree:
+                res.append((obj, node))
+    return res
+
+def in_context(obj, func, group_node=None):
+    """
+    Wrap a function to run with an object as the active one, and optionally a group node as the active node
+    """
+    def call():
+        if group_node is not None:
+            set_active_node(obj, group_node)
+        else:
+            bpy.context.view_layer.objects.active = obj
+        with bpy.context.temp_override(object=obj, active_object=obj):
+            return func()
+    return call
+
+def run_scale(addon, scale, args):
+    effects_chain = import_addon_module("operators.effects_chain")
+    media_registry = import_addon_module("utils.media_registry")
+    panel_fx = import_addon_module("interfaces.panel_fx")
+
+    print(f"Scale {get_scale_key(scale)}: {scale['objects']} objects, {scale['effects']} effects, {scale['media']} media", flush=True)
+    clear_scene()
+    media_registry.invalidate()
+    recorder = Recorder(args.trace_memory)
+    scene = bpy.context.scene
+    scene.frame_set(1)
+
+    items = []
+    recorder.measure("generate_scene", [lambda: items.extend(generate_scene(scale))])
+
+    recorder.measure("wrap_media", [
+        in_context(obj, lambda name=name: bpy.ops.tfx.wrap_media(image_name=name))
+        for obj, image_names in items for name in image_names
+    ])
+    nodes = get_wrapped_nodes(items)
+
+    templates = get_effect_templates()
+    recorder.measure("push_effect", [
+        in_context(obj, lambda item=templates[j % len(templates)]: bpy.ops.tfx.push_effect(
+            fx_group_name=f'tfx_effect_{item["node_name"]}',
+            param_group_name=f'tfx_param_{item["node_name"]}',
+            asset_file_name=item["file"]), node)
+        for obj, node in nodes for j in range(scale["effects"])
+    ])
+
+    # The first draw of each media fills the caches of the panels, and the following ones show the cost of a plain redraw
+    panels = get_addon_panels(addon)
+    layout_calls = [0]
+    recorder.measure("draw_panels_first", [in_context(obj, lambda: draw_panels(panels, panel_fx, layout_calls), node) for obj, node in nodes])
+    recorder.measure("draw_panels_redraw", [
+        in_context(obj, lambda: draw_panels(panels, panel_fx, layout_calls), node)
+        for obj, node in nodes for _ in range(args.redraws)
+    ])
+    recorder.operations["draw_panels_redraw"]["layout_calls"] = layout_calls[0]
+
+    recorder.measure("add_playback_driver", [
+        in_context(obj, lambda: bpy.ops.tfx.add_playback_driver(controller=args.controller), node) for obj, node in nodes
+    ])
+    recorder.measure("frame_change", [lambda frame=scene.frame_start + i: scene.frame_set(frame) for i in range(args.frames)])
+    scene.frame_set(1)
+
+    config = {"effects": []}
+    if nodes:
+        config["effects"] = effects_chain.get_chain_config(nodes[0][1].node_tree)
+    if scale["effects"] >= 2:
+        recorder.measure("swap_effect", [in_context(obj, lambda: bpy.ops.tfx.swap_effect(depth=1), node) for obj, node in nodes])
+    else:
+        recorder.add("swap_effect", [])
+    if scale["effects"] >= 1:
+        recorder.measure("pop_effect", [in_context(obj, lambda: bpy.ops.tfx.pop_effect(depth=1), node) for obj, node in nodes])
+    else:
+        recorder.add("pop_effect", [])
+    recorder.measure("apply_json_config", [
+        in_context(obj, lambda tree=node.node_tree: effects_chain.apply_json_config(config, tree), node) for obj, node in nodes
+    ])
+    return {"scale": scale, "key": get_scale_key(scale), "operations": recorder.operations}
+
+def get_metadata(addon, args):
+    try:
+        commit = subprocess.run(
+            ["git", "-C", str(ADDON_ROOT), "rev-parse", "--short", "HEAD"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "addon_version": ".".join(str(x) for x in addon.bl_info["version"]),
+        "addon_commit": commit,
+        "blender_version": bpy.app.version_string,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "controller": args.controller,
+        "redraws": args.redraws,
+        "frames": args.frames,
+        "trace_memory": args.trace_memory,
+    }
+
+def run_benchmark(args):
+    sys.path.insert(0, str(ADDON_ROOT.parent))
+    addon = importlib.import_module(ADDON_ROOT.name)
+    addon.register()
+    if args.trace_memory:
+        tracemalloc.start()
+    try:
+        runs = [run_scale(addon, scale, args) for scale in args.scale]
+    finally:
+        if args.trace_memory:
+            tracemalloc.stop()
+        addon.unregister()
+    return {"meta": get_metadata(addon, args), "runs": runs}
+
+# Comparison
+
+def compare_results(old, new, threshold, min_delta_ms):
+    """
+    Print the change of median time and traced memory of each operation at each scale.
+    Return the number of operations that became slower than allowed
+    """
+    old_runs = {run["key"]: run for run in old["runs"]}
+    print(f'Comparing {old["meta"].get("addon_version")} ({old["meta"].get("addon_commit")}) '
+          f'with {new["meta"].get("addon_version")} ({new["meta"].get("addon_commit")})')
+    regressions = 0
+    for run in new["runs"]:
+        old_run = old_runs.get(run["key"])
+        if old_run is None:
+            print(f'Scale {run["key"]}: not in the old results')
+            continue
+        print(f'Scale {run["key"]}:')
+        for name, stats in run["operations"].items():
+            old_stats = old_run["operations"].get(name)
+            if not old_stats or "median_ms" not in old_stats or "median_ms" not in stats:
+                continue
+            old_ms, new_ms = old_stats["median_ms"], stats["median_ms"]
+            ratio = new_ms / old_ms if old_ms > 0 else float("inf")
+            slower = ratio > 1.0 + threshold and new_ms - old_ms > min_delta_ms
+            regressions += slower
+            memory = ''
+            if old_stats.get("traced_peak_kb") is not None and stats.get("traced_peak_kb") is not None:
+                memory = f'{old_stats["traced_peak_kb"]:8} -> {stats["traced_peak_kb"]:8} KB'
+            print(f'  {name:32} {old_ms:10.3f} -> {new_ms:10.3f} ms ({ratio:6.2f}x) {memory} {"REGRESSION" if slower else ""}')
+    print(f"{regressions} regressions")
+    return regressions
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def main(argv=None):
+    if argv is None:
+        if bpy is not None:
+            argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+        else:
+            argv = sys.argv[1:]
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", action="append", type=parse_scale, default=[],
+                        help="Number of objects x effects x media per object, can be repeated (default 10x4x2)")
+    parser.add_argument("--redraws", type=int, default=10, help="Number of panel redraws per media")
+    parser.add_argument("--frames", type=int, default=50, help="Number of frames evaluated after adding playback controllers")
+    parser.add_argument("--controller", choices=["LOCAL", "GLOBAL"], default="LOCAL", help="Playback controller type")
+    parser.add_argument("--no-tracemalloc", dest="trace_memory", action="store_false",
+                        help="Do not trace Python allocations, which slows down all operations")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="Compare new results with old ones. Outside Blender, give the old and the new result files")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative increase of the median time")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore increases below this time")
+    args = parser.parse_args(argv)
+
+    if bpy is None:
+        if not args.compare or len(args.compare) != 2:
+            parser.error("Run the benchmark with: blender -b --factory-startup --python scripts/benchmark.py -- [options], "
+                         "or compare two result files with --compare OLD NEW")
+        old, new = load_results(args.compare[0]), load_results(args.compare[1])
+        return 1 if compare_results(old, new, args.threshold, args.min_delta_ms) else 0
+
+    if not args.scale:
+        args.scale = [parse_scale("10x4x2")]
+    results = run_benchmark(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+    if args.compare:
+        return 1 if compare_results(load_results(args.compare[0]), results, args.threshold, args.min_delta_ms) else 0
+    return 0
+
+if __name__ == "__main__":
+    code = main()
+    if bpy is None or code:
+        sys.exit(code)
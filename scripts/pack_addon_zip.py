@@ -1,3 +1,4 @@
+import sys
 import zipfile
 from pathlib import Path
 from pathspec import PathSpec
@@ -23,9 +24,14 @@ spec = PathSpec.from_lines("gitwildmatch", ignore_lines)
 def should_ignore(path: Path):
     return spec.match_file(str(path))
 
+# The registration manifest is generated from the packaged source files, and lets the add-on skip class discovery when enabled
+sys.path.insert(0, str(PROJECT_ROOT.resolve()))
+import registration_manifest
+
+packaged_files = []
 with zipfile.ZipFile(OUT_ZIP, "w", zipfile.ZIP_DEFLATED) as z:
     for path in PROJECT_ROOT.rglob("*"):
-        if path == gitignore or ".git" in path.parts:
+        if path == gitignore or ".git" in path.parts or path.name == registration_manifest.manifest_filename:
             continue
 
         if should_ignore(path):
@@ -35,4 +41,9 @@ with zipfile.ZipFile(OUT_ZIP, "w", zipfile.ZIP_DEFLATED) as z:
             arcname = f"{TOP_DIR}/{path.relative_to(PROJECT_ROOT)}"
             print(arcname)
             z.write(path, arcname)
+            packaged_files.append(path.relative_to(PROJECT_ROOT).as_posix())
 
+    manifest_arcname = f"{TOP_DIR}/{registration_manifest.manifest_filename}"
+    print(manifest_arcname)
+    # Only the files written to the zip are hashed, so that ignored files of the checkout do not invalidate the manifest
+    z.writestr(manifest_arcname, registration_manifest.get_manifest_json(PROJECT_ROOT, packaged_files))
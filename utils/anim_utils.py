@@ -1,4 +1,6 @@
 import bpy
+import heapq
+from . import driver_utils, profiling
 
 def add_driver_variable(driver, subject, data_path, name, id_type='OBJECT', custom_property = True):
     var = driver.variables.new()
@@ -46,7 +48,7 @@ def set_linear_temporal_driver(tree, param_name, rate, offset):
     fc = target.driver_add('default_value')
     fc.driver.type = 'SCRIPTED'
     add_driver_variable(fc.driver, bpy.context.scene, 'frame_current', 't', id_type='SCENE', custom_property=False)
-    fc.driver.expression = f"{rate}*(t-{offset})"
+    driver_utils.set_driver_expression(fc.driver, f"{driver_utils.format_number(rate)}*(t-{driver_utils.format_number(offset)})")
 
 def set_playhead_driver(tree, length, subject, id_type, datapath_playhead, datapath_duration, out=False):
     if "TfxParam" not in tree.nodes or "Group Output" not in tree.nodes["TfxParam"].node_tree.nodes:
@@ -54,10 +56,10 @@ def set_playhead_driver(tree, length, subject, id_type, datapath_playhead, datap
     node = tree.nodes["TfxParam"].node_tree.nodes["Group Output"]
     if not out and "In" in node.inputs:
         target = node.inputs["In"]
-        expr = f"min(p*d/{length}, 1.0)"
+        expr = f"min(p*d/{driver_utils.format_number(length)}, 1.0)"
     elif out and "Out" in node.inputs:
         target = node.inputs["Out"]
-        expr = f"1.0-min((1-p)*d/{length}, 1.0)"
+        expr = f"1.0-min((1-p)*d/{driver_utils.format_number(length)}, 1.0)"
     else:
         return
     target.driver_remove('default_value')
@@ -65,7 +67,7 @@ def set_playhead_driver(tree, length, subject, id_type, datapath_playhead, datap
     fc.driver.type = 'SCRIPTED'
     add_driver_variable(fc.driver, subject, datapath_playhead, 'p', id_type=id_type)
     add_driver_variable(fc.driver, subject, datapath_duration, 'd', id_type=id_type)
-    fc.driver.expression = expr
+    driver_utils.set_driver_expression(fc.driver, expr)
 
 def set_strip_driver(tree, length, subject, track_name, strip_name, out=False):
     if "TfxParam" not in tree.nodes or "Group Output" not in tree.nodes["TfxParam"].node_tree.nodes:
@@ -74,11 +76,11 @@ def set_strip_driver(tree, length, subject, track_name, strip_name, out=False):
     if not out and "In" in node.inputs:
         target = node.inputs["In"]
         datapath = 'frame_start'
-        expr = f"max(0.0,min((t-f)/{length}, 1.0))"
+        expr = f"max(0.0,min((t-f)/{driver_utils.format_number(length)}, 1.0))"
     elif out and "Out" in node.inputs:
         target = node.inputs["Out"]
         datapath = 'frame_end'
-        expr = f"1.0-max(0.0,min((f-t)/{length}, 1.0))"
+        expr = f"1.0-max(0.0,min((f-t)/{driver_utils.format_number(length)}, 1.0))"
     else:
         return
     target.driver_remove('default_value')
@@ -94,7 +96,7 @@ def set_strip_driver(tree, length, subject, track_name, strip_name, out=False):
         'frame_current', 
         't', id_type='SCENE', custom_property=False
     )
-    fc.driver.expression = expr    
+    driver_utils.set_driver_expression(fc.driver, expr)    
  
 def get_action_fcurves(action):
     if action is None:
@@ -117,4 +119,416 @@ def get_global_playback_manager():
         scene.collection.objects.link(new_obj)
         scene[key] = new_obj
 
-        return new_obj
\ No newline at end of file
+        return new_obj
+
+def get_playback_datapaths(top_tree, media_tree):
+    """
+    Return the subject, ID type and custom property names (first frame, playhead, duration) of the playback controller of a media
+    """
+    if top_tree.get("tfxPlaybackControl") == 1:
+        return top_tree, 'NODETREE', 'tfxFirstFrame', 'tfxPlayhead', 'tfxFrameDuration'
+    suffix = media_tree.name[len("tfx_texture_"):]
+    return get_global_playback_manager(), 'OBJECT', f'tfxFirstFrame_{suffix}', f'tfxPlayhead_{suffix}', f'tfxFrameDuration_{suffix}'
+
+@profiling.profiled("driver:playback_offset")
+def set_playback_offset_driver(image_user, subject, id_type, datapath_start, datapath_playhead, datapath_duration):
+    image_user.driver_remove('frame_offset')
+    fc = image_user.driver_add('frame_offset')
+    fc.driver.type = 'SCRIPTED'
+    add_driver_variable(fc.driver, subject, datapath_start, 's', id_type=id_type)
+    add_driver_variable(fc.driver, subject, datapath_playhead, 'p', id_type=id_type)
+    add_driver_variable(fc.driver, subject, datapath_duration, 'd', id_type=id_type)
+    add_driver_variable(fc.driver, bpy.context.scene, 'frame_current', 't', id_type='SCENE', custom_property=False)
+    driver_utils.set_driver_expression(fc.driver, "int(min(max(floor(p*d)+s-t, s-t), s+d-t-1))")
+
+def refresh_drivers(id_data):
+    """
+    Reassign driver expressions to force their re-evaluation
+    """
+    if id_data.animation_data:
+        for fc in id_data.animation_data.drivers:
+            tmp = fc.driver.expression
+            fc.driver.expression = tmp
+
+def has_driver_dependency(subject, data_path):
+    """
+    Check if any driver of node groups or materials reads a property of the subject
+    """
+    for id_data in list(bpy.data.node_groups) + list(bpy.data.materials):
+        if not id_data.animation_data:
+            continue
+        for fc in id_data.animation_data.drivers:
+            for var in fc.driver.variables:
+                for target in var.targets:
+                    if target.id == subject and target.data_path == data_path:
+                        return True
+    return False
+
+def get_strip_playhead_suffix(strip):
+    """
+    Return the media suffix of the playhead animated by an NLA strip of the global manager, or None
+    """
+    if strip.action is None or strip.action.get("tfxPlaybackRest"):
+        return None
+    fcurves = get_action_fcurves(strip.action)
+    if not fcurves:
+        return None
+    for fc in fcurves:
+        if fc.data_path.startswith('["tfxPlayhead_'):
+            return fc.data_path[len('["tfxPlayhead_'):-len('"]')]
+    return None
+
+def rebuild_playhead_strip_index(subject):
+    """
+    Scan all NLA strips of the global manager and store a map from media suffix to (track name, strip name) in the object
+    """
+    index = {}
+    if subject.animation_data:
+        for track in subject.animation_data.nla_tracks:
+            for strip in track.strips:
+                suffix = get_strip_playhead_suffix(strip)
+                if suffix and suffix not in index:
+                    index[suffix] = [track.name, strip.name]
+    subject["tfxStripIndex"] = index
+
+def register_playhead_strip(subject, suffix, track, strip):
+    if "tfxStripIndex" not in subject:
+        rebuild_playhead_strip_index(subject)
+    subject["tfxStripIndex"][suffix] = [track.name, strip.name]
+
+def unregister_playhead_strip(subject, suffix):
+    if "tfxStripIndex" in subject and suffix in subject["tfxStripIndex"]:
+        del subject["tfxStripIndex"][suffix]
+
+def find_playhead_strip(subject, suffix):
+    """
+    Return the NLA track and strip of the global manager that animate the playhead of a media, or (None, None).
+    The index is only rebuilt if it is missing or if the stored entry no longer matches a strip,
+    so that media without any strip do not cause a scan of all tracks
+    """
+    def lookup():
+        if suffix not in subject["tfxStripIndex"] or not subject.animation_data:
+            return None, None, True
+        track_name, strip_name = subject["tfxStripIndex"][suffix]
+        track = subject.animation_data.nla_tracks.get(track_name)
+        strip = track.strips.get(strip_name) if track else None
+        if strip is None or get_strip_playhead_suffix(strip) != suffix:
+            return None, None, False
+        return track, strip, True
+
+    if "tfxStripIndex" not in subject:
+        rebuild_playhead_strip_index(subject)
+    track, strip, valid = lookup()
+    if not valid:
+        rebuild_playhead_strip_index(subject)
+        track, strip, _ = lookup()
+    return track, strip
+
+def remove_playhead_rest_key(subject, suffix):
+    """
+    Remove the channel of a media from the rest action created by timeline compaction
+    """
+    if not subject.animation_data:
+        return
+    for track in subject.animation_data.nla_tracks:
+        for strip in track.strips:
+            if strip.action and strip.action.get("tfxPlaybackRest"):
+                fcurves = get_action_fcurves(strip.action)
+                fc = fcurves.find(f'["tfxPlayhead_{suffix}"]')
+                if fc:
+                    fcurves.remove(fc)
+
+strip_copy_attributes = (
+    'action_frame_start', 'action_frame_end', 'scale', 'repeat', 'use_reverse', 'blend_type',
+    'use_auto_blend', 'blend_in', 'blend_out', 'influence', 'use_sync_length', 'mute'
+)
+
+def get_strip_end_action_frame(strip):
+    """
+    Return the frame of the action that an NLA strip evaluates at its last frame, considering repeats and reversal
+    """
+    length = strip.action_frame_end - strip.action_frame_start
+    fraction = strip.repeat % 1.0
+    offset = length * fraction if fraction > 1e-6 else length
+    return strip.action_frame_end - offset if strip.use_reverse else strip.action_frame_start + offset
+
+def compact_playback_timeline(subject, scene):
+    """
+    Pack the NLA strips of the global manager into as few tracks as possible by interval partitioning.
+    Since every strip animates a different playhead, a rest action keyed with the value of each playhead at the start and at the end of its strip
+    is placed on the lowest track, replacing the holds that each strip had when it was alone on its own track.
+    A strip stops being evaluated once the next strip of the same track starts, so the rest action holds its end value afterwards.
+    Drivers that refer to strips by track and strip names are updated.
+    Return the numbers of tracks before and after compaction
+    """
+    if not subject.animation_data:
+        return 0, 0
+    anim_data = subject.animation_data
+    num_tracks_before = len(anim_data.nla_tracks)
+
+    # Collect clips from tracks that only contain strips of this add-on, in the order of their start frames
+    clips, tracks_to_remove = [], []
+    for track in anim_data.nla_tracks:
+        track_clips = []
+        for strip in track.strips:
+            if strip.action and strip.action.get("tfxPlaybackRest"):
+                continue
+            suffix = get_strip_playhead_suffix(strip)
+            if suffix is None:
+                break
+            clip = {attr: getattr(strip, attr) for attr in strip_copy_attributes}
+            fc = get_action_fcurves(strip.action).find(f'["tfxPlayhead_{suffix}"]')
+            clip.update({
+                "suffix": suffix, "name": strip.name, "action": strip.action,
+                "frame_start": strip.frame_start, "frame_end": strip.frame_end,
+                "mute": strip.mute or track.mute,
+                "path": f'nla_tracks["{track.name}"].strips["{strip.name}"]',
+                "rest_value": fc.evaluate(strip.action_frame_end if strip.use_reverse else strip.action_frame_start),
+                "end_value": fc.evaluate(get_strip_end_action_frame(strip)),
+            })
+            track_clips.append(clip)
+        else:
+            clips += track_clips
+            tracks_to_remove.append(track)
+    clips.sort(key=lambda clip: clip["frame_start"])
+
+    # Greedy interval partitioning: reuse the track that becomes free the earliest
+    free_heap, assignment, num_new_tracks = [], [], 0
+    for clip in clips:
+        if free_heap and free_heap[0][0] < clip["frame_start"]:
+            _, track_idx = heapq.heappop(free_heap)
+        else:
+            track_idx = num_new_tracks
+            num_new_tracks += 1
+        assignment.append(track_idx)
+        heapq.heappush(free_heap, (clip["frame_end"], track_idx))
+
+    for track in tracks_to_remove:
+        rest_actions = [strip.action for strip in track.strips if strip.action and strip.action.get("tfxPlaybackRest")]
+        anim_data.nla_tracks.remove(track)
+        for action in rest_actions:
+            if action.users == 0:
+                bpy.data.actions.remove(action)
+    if len(clips) == 0:
+        subject["tfxStripIndex"] = {}
+        return num_tracks_before, len(anim_data.nla_tracks)
+
+    # Rest action on the lowest new track
+    active_action = anim_data.action
+    anim_data.action = None
+    for clip in clips:
+        keys = [(scene.frame_start, clip["rest_value"])]
+        if not clip["mute"] and clip["frame_end"] > scene.frame_start:
+            keys.append((clip["frame_end"], clip["end_value"]))
+        set_keyframes(subject, f'["tfxPlayhead_{clip["suffix"]}"]', keys)
+    rest_action = anim_data.action
+    rest_action.name = "TfxPlaybackRest"
+    rest_action["tfxPlaybackRest"] = 1
+    anim_data.action = None
+    rest_track = anim_data.nla_tracks.new()
+    rest_track.name = "TfxPlaybackRest"
+    rest_strip = rest_track.strips.new("TfxPlaybackRest", scene.frame_start, rest_action)
+    rest_strip.extrapolation = 'HOLD'
+    rest_track.lock = True
+    anim_data.action = active_action
+
+    # Packed tracks
+    new_tracks = []
+    for i in range(num_new_tracks):
+        track = anim_data.nla_tracks.new(prev=new_tracks[-1] if new_tracks else rest_track)
+        track.name = f"TfxPlayback {i + 1}"
+        new_tracks.append(track)
+    path_map = {}
+    index = {}
+    for clip, track_idx in zip(clips, assignment):
+        track = new_tracks[track_idx]
+        strip = track.strips.new(clip["name"], int(clip["frame_start"]), clip["action"])
+        for attr in strip_copy_attributes:
+            setattr(strip, attr, clip[attr])
+        strip.frame_start_ui = clip["frame_start"]
+        strip.extrapolation = 'HOLD_FORWARD'
+        path_map[clip["path"]] = f'nla_tracks["{track.name}"].strips["{strip.name}"]'
+        index[clip["suffix"]] = [track.name, strip.name]
+    subject["tfxStripIndex"] = index
+
+    # Update drivers bound to strips
+    for id_data in list(bpy.data.node_groups) + list(bpy.data.materials):
+        if not id_data.animation_data:
+            continue
+        for fc in id_data.animation_data.drivers:
+            for var in fc.driver.variables:
+                for target in var.targets:
+                    if target.id != subject or not target.data_path.startswith('animation_data.nla_tracks['):
+                        continue
+                    strip_path, _, attr = target.data_path[len('animation_data.'):].rpartition('.')
+                    if strip_path in path_map:
+                        target.data_path = f'animation_data.{path_map[strip_path]}.{attr}'
+    return num_tracks_before, len(anim_data.nla_tracks)
+
+@bpy.app.handlers.persistent
+def strip_index_load_handler(dummy):
+    for scene in bpy.data.scenes:
+        subject = scene.get("tfxPlaybackManager")
+        if subject is not None:
+            rebuild_playhead_strip_index(subject)
+
+def evaluate_frame_offsets(scene, media_items):
+    """
+    Evaluate the playback drivers of all media over the scene frame range with a single pass of frame changes.
+    Return a map from the media node group name to (frame, offset) pairs, keeping only the frames where the offset changes
+    """
+    frame_current = scene.frame_current
+    res = {media_tree.name: [] for _, media_tree, _ in media_items}
+    for frame in range(scene.frame_start, scene.frame_end + 1):
+        scene.frame_set(frame)
+        for _, media_tree, image_node in media_items:
+            keys = res[media_tree.name]
+            value = image_node.image_user.frame_offset
+            if not keys or keys[-1][1] != value:
+                keys.append((frame, value))
+    scene.frame_set(frame_current)
+    return res
+
+interpolation_enum = {'CONSTANT': 0, 'LINEAR': 1, 'BEZIER': 2}
+
+def set_keyframes(id_data, data_path, keys, interpolation='CONSTANT'):
+    """
+    Replace the F-curve of a property with keyframes given as (frame, value) pairs, without changing the current frame.
+    The interpolation can be a single mode or a list with one mode per keyframe
+    """
+    if isinstance(interpolation, str):
+        interpolation = [interpolation] * len(keys)
+    id_data.keyframe_insert(data_path, frame=keys[0][0])
+    fc = get_action_fcurves(id_data.animation_data.action).find(data_path)
+    fc.keyframe_points.clear()
+    fc.keyframe_points.add(len(keys))
+    fc.keyframe_points.foreach_set('co', [v for key in keys for v in key])
+    fc.keyframe_points.foreach_set('interpolation', [interpolation_enum[mode] for mode in interpolation])
+    fc.update()
+    return fc
+
+def get_playhead_schedule(start_frame, frame_duration, playback_rate, num_loops, playback_reversed, playback_pingpong):
+    """
+    Return the playhead keyframes of a playback pattern as (frame, value) pairs.
+    Each loop moves the playhead from one end to the other, followed by a one-frame gap before the next loop
+    """
+    keys = []
+    loop_length = max(1, round((frame_duration - 1.0) / playback_rate))
+    frame = start_frame
+    for i in range(num_loops):
+        value = float(playback_reversed ^ (playback_pingpong and i % 2 == 1))
+        keys.append((frame, value))
+        frame += loop_length
+        keys.append((frame, 1.0 - value))
+        frame += 1
+    return keys
+
+def get_playhead_cycle(start_frame, frame_duration, playback_rate, playback_reversed):
+    """
+    Return the keyframes and interpolation modes of a single loop to be repeated by a Cycles modifier.
+    A constant key one frame before the start stands for the one-frame gap between loops,
+    so that the cycle period matches the keyframe pattern and the playhead stays at its end value after the last cycle
+    """
+    loop_length = max(1, round((frame_duration - 1.0) / playback_rate))
+    value = float(playback_reversed)
+    keys = [(start_frame - 1, value), (start_frame, value), (start_frame + loop_length, 1.0 - value)]
+    return keys, ['CONSTANT', 'LINEAR', 'LINEAR']
+
+def set_playhead_cycles(fc, num_loops, playback_pingpong, infinite=False):
+    """
+    Repeat the keyframes of a playhead F-curve with a Cycles modifier. Ping-pong is realized by mirrored cycles.
+    A single finite loop needs no modifier, since a Cycles modifier with no repeat count cycles forever.
+    Return the modifier or None
+    """
+    for mod in list(fc.modifiers):
+        if mod.type == 'CYCLES':
+            fc.modifiers.remove(mod)
+    if not infinite and num_loops <= 1:
+        return None
+    mod = fc.modifiers.new('CYCLES')
+    mod.mode_before = 'NONE'
+    mod.mode_after = 'MIRROR' if playback_pingpong else 'REPEAT'
+    mod.cycles_after = 0 if infinite else num_loops - 1
+    return mod
+
+def get_playhead_cycles_modifier(subject, datapath_playhead):
+    if not subject.animation_data or not subject.animation_data.action:
+        return None
+    fc = get_action_fcurves(subject.animation_data.action).find(f'["{datapath_playhead}"]')
+    if fc is None:
+        return None
+    for mod in fc.modifiers:
+        if mod.type == 'CYCLES':
+            return mod
+    return None
+
+def bake_playback(scene, media_items):
+    """
+    Replace the playback drivers of media by frame offset keyframes, and detach the playhead animation that is no longer needed
+    """
+    media_items = [item for item in media_items if item[0].get("tfxPlaybackControl") in (1, 2) and not item[0].get("tfxPlaybackBaked")]
+    offsets = evaluate_frame_offsets(scene, media_items)
+
+    for top_tree, media_tree, image_node in media_items:
+        image_node.image_user.driver_remove('frame_offset')
+        set_keyframes(media_tree, f'nodes["{image_node.name}"].image_user.frame_offset', offsets[media_tree.name])
+        top_tree["tfxPlaybackBaked"] = 1
+
+        subject, _, _, datapath_playhead, _ = get_playback_datapaths(top_tree, media_tree)
+        if has_driver_dependency(subject, f'["{datapath_playhead}"]'):
+            continue
+        if top_tree["tfxPlaybackControl"] == 1:
+            action = subject.animation_data.action if subject.animation_data else None
+            fcurves = get_action_fcurves(action)
+            if fcurves and all(fc.data_path == f'["{datapath_playhead}"]' for fc in fcurves):
+                action.use_fake_user = True
+                top_tree["tfxPlaybackBakedAction"] = action.name
+                subject.animation_data.action = None
+        else:
+            _, strip = find_playhead_strip(subject, media_tree.name[len("tfx_texture_"):])
+            if strip:
+                strip.mute = True
+    return len(media_items)
+
+def unbake_playback(top_tree, media_tree, image_node):
+    """
+    Remove the baked frame offset keyframes of a media and restore its playback driver and playhead animation
+    """
+    if not top_tree.get("tfxPlaybackBaked"):
+        return
+    data_path = f'nodes["{image_node.name}"].image_user.frame_offset'
+    action = media_tree.animation_data.action if media_tree.animation_data else None
+    fcurves = get_action_fcurves(action)
+    if fcurves:
+        fc = fcurves.find(data_path)
+        if fc:
+            fcurves.remove(fc)
+        if len(fcurves) == 0:
+            media_tree.animation_data.action = None
+            if action.users == 0:
+                bpy.data.actions.remove(action)
+
+    subject, id_type, datapath_start, datapath_playhead, datapath_duration = get_playback_datapaths(top_tree, media_tree)
+    if top_tree["tfxPlaybackControl"] == 1:
+        action_name = top_tree.get("tfxPlaybackBakedAction")
+        if action_name and action_name in bpy.data.actions:
+            action = bpy.data.actions[action_name]
+            subject.animation_data_create().action = action
+            action.use_fake_user = False
+    else:
+        _, strip = find_playhead_strip(subject, media_tree.name[len("tfx_texture_"):])
+        if strip:
+            strip.mute = False
+    set_playback_offset_driver(image_node.image_user, subject, id_type, datapath_start, datapath_playhead, datapath_duration)
+
+    for key in ["tfxPlaybackBaked", "tfxPlaybackBakedAction"]:
+        if key in top_tree:
+            del top_tree[key]
+
+def register():
+    if strip_index_load_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(strip_index_load_handler)
+
+def unregister():
+    if strip_index_load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(strip_index_load_handler)
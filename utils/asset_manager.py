@@ -1,6 +1,7 @@
 import bpy
 import uuid
 import os
+from . import profiling
 
 default_preset_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../resources/presets')
 basic_template_filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../resources/templates/basic.blend')
@@ -61,22 +62,92 @@ for cat in template_fx_list:
     for item in cat["effects"]:
         template_fx_lookup_map[item["name"]] = {"file": item["file"], "node_name": item["node_name"]}
 
-def create_node_group_instance(template_filepath=None, group_name=''):
+# Pristine copies of template node groups, keyed by (template file, group name).
+# Each value is the name of a hidden datablock, since references to ID blocks become invalid after undo or file loading
+template_cache = {}
+template_cache_mtime = {}
+template_cache_prefix = ".tfx_template_"
+
+def get_template_mtime(template_filepath):
+    try:
+        return os.path.getmtime(template_filepath)
+    except OSError:
+        return None
+
+def clear_template_cache(template_filepath=None):
     """
-    Create a new node group by appending from a template blend file
+    Remove cached template datablocks, either of a single template file or of all files
+    """
+    for key in list(template_cache.keys()):
+        if template_filepath is not None and key[0] != template_filepath:
+            continue
+        cached_name = template_cache.pop(key)
+        if cached_name in bpy.data.node_groups:
+            bpy.data.node_groups.remove(bpy.data.node_groups[cached_name])
+    if template_filepath is None:
+        template_cache_mtime.clear()
+    elif template_filepath in template_cache_mtime:
+        del template_cache_mtime[template_filepath]
+
+def load_node_group_templates(template_filepath=None, group_names=()):
+    """
+    Make sure all given node groups of a template file are available in the cache,
+    reading the file at most once
     """
     if template_filepath is None:
         template_filepath = basic_template_filepath
     
-    # Append the node group from the template blend file
-    with bpy.data.libraries.load(template_filepath, link=False) as (data_from, data_to):
-        if group_name in data_from.node_groups:
-            data_to.node_groups.append(group_name)
-        else:
-            raise ValueError(f"Node group '{group_name}' not found in {template_filepath}")
+    # Invalidate the cache if the template file has been modified
+    mtime = get_template_mtime(template_filepath)
+    if template_cache_mtime.get(template_filepath, mtime) != mtime:
+        clear_template_cache(template_filepath)
+    template_cache_mtime[template_filepath] = mtime
+    
+    missing_names = []
+    for group_name in group_names:
+        cached_name = template_cache.get((template_filepath, group_name))
+        if cached_name is None or cached_name not in bpy.data.node_groups:
+            if group_name not in missing_names:
+                missing_names.append(group_name)
+    if len(missing_names) < 1:
+        return
+    
+    # Append all missing node groups from the template blend file in one pass
+    with profiling.section("template:append"), bpy.data.libraries.load(template_filepath, link=False) as (data_from, data_to):
+        for group_name in missing_names:
+            if group_name not in data_from.node_groups:
+                raise ValueError(f"Node group '{group_name}' not found in {template_filepath}")
+        data_to.node_groups = list(missing_names)
+    
+    # A leading dot hides the pristine copies from most lists in Blender UI
+    for group_name, new_group in zip(missing_names, data_to.node_groups):
+        new_group.name = f"{template_cache_prefix}{group_name}"
+        template_cache[(template_filepath, group_name)] = new_group.name
+
+def create_node_group_instance(template_filepath=None, group_name=''):
+    """
+    Create a new node group by copying a cached template, which is appended from a template blend file on first use
+    """
+    if template_filepath is None or template_filepath == '':
+        template_filepath = basic_template_filepath
+    load_node_group_templates(template_filepath, (group_name,))
     
     # Randomly generate a suffix to the node group name
-    new_group = data_to.node_groups[0]
+    new_group = bpy.data.node_groups[template_cache[(template_filepath, group_name)]].copy()
     new_group.name = f"{group_name}_{str(uuid.uuid4())[:8]}"
 
-    return new_group
\ No newline at end of file
+    return new_group
+
+@bpy.app.handlers.persistent
+def template_cache_load_handler(dummy):
+    # Datablocks of the previous file no longer exist
+    template_cache.clear()
+    template_cache_mtime.clear()
+
+def register():
+    if template_cache_load_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(template_cache_load_handler)
+
+def unregister():
+    if template_cache_load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(template_cache_load_handler)
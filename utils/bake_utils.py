@@ -0,0 +1,143 @@
+import bpy
+import numpy as np
+from . import asset_manager, node_utils
+
+"""
+Render a part of an effects chain to images with Cycles baking.
+The chain is placed on a temporary UV plane through a temporary Top (Interface) node group, so the result matches the chain output in UV space.
+"""
+
+def get_media_resolution(root_tree):
+    ratio = root_tree.nodes['TfxRatio'].inputs
+    return max(1, int(ratio[0].default_value)), max(1, int(ratio[1].default_value))
+
+def create_bake_plane(scene, next_tree, root_tree):
+    # Top node group
+    top_tree = asset_manager.create_node_group_instance(None, 'tfx_interface')
+    top_tree.nodes['TfxRoot'].node_tree = root_tree
+    node_utils.set_next_depth(top_tree, next_tree)
+    
+    # Material
+    material = bpy.data.materials.new(".tfx_bake_material")
+    material.use_nodes = True
+    nodes, links = material.node_tree.nodes, material.node_tree.links
+    nodes.clear()
+    uv_node = nodes.new('ShaderNodeUVMap')
+    group_node = nodes.new('ShaderNodeGroup')
+    group_node.node_tree = top_tree
+    emission_node = nodes.new('ShaderNodeEmission')
+    output_node = nodes.new('ShaderNodeOutputMaterial')
+    target_node = nodes.new('ShaderNodeTexImage')
+    links.new(uv_node.outputs['UV'], group_node.inputs['UV'])
+    links.new(emission_node.outputs['Emission'], output_node.inputs['Surface'])
+    nodes.active = target_node
+    
+    # UV plane
+    mesh = bpy.data.meshes.new(".tfx_bake_plane")
+    mesh.from_pydata([(-1,-1,0), (1,-1,0), (1,1,0), (-1,1,0)], [], [(0,1,2,3)])
+    uv_layer = mesh.uv_layers.new(name="UVMap")
+    for loop, uv in zip(mesh.loops, [(0,0), (1,0), (1,1), (0,1)]):
+        uv_layer.data[loop.index].uv = uv
+    mesh.materials.append(material)
+    obj = bpy.data.objects.new(".tfx_bake_plane", mesh)
+    scene.collection.objects.link(obj)
+    
+    return obj, group_node, emission_node, target_node
+
+def remove_bake_plane(obj):
+    mesh = obj.data
+    material = mesh.materials[0]
+    top_tree = None
+    for node in material.node_tree.nodes:
+        if node.type == 'GROUP':
+            top_tree = node.node_tree
+    bpy.data.objects.remove(obj)
+    bpy.data.meshes.remove(mesh)
+    bpy.data.materials.remove(material)
+    if top_tree is not None:
+        bpy.data.node_groups.remove(top_tree)
+
+def bake_emission(obj):
+    with bpy.context.temp_override(object=obj, active_object=obj, selected_objects=[obj], selected_editable_objects=[obj]):
+        bpy.ops.object.bake(type='EMIT', margin=0, use_clear=True, target='IMAGE_TEXTURES')
+
+def bake_chain_frames(next_tree, root_tree, frames, filepath_pattern, samples=16, progress_callback=None):
+    """
+    Bake the output of a chain starting from next_tree at each given frame into OpenEXR files.
+    filepath_pattern should contain a "{frame}" field, e.g. "/path/cache_{frame:04d}.exr".
+    Return the list of written file paths
+    """
+    scene = bpy.context.scene
+    width, height = get_media_resolution(root_tree)
+    
+    # Change render settings temporarily
+    engine, cycles_samples, frame_current = scene.render.engine, scene.cycles.samples, scene.frame_current
+    scene.render.engine = 'CYCLES'
+    scene.cycles.samples = samples
+    
+    obj, group_node, emission_node, target_node = create_bake_plane(scene, next_tree, root_tree)
+    links = obj.data.materials[0].node_tree.links
+    color_image = bpy.data.images.new(".tfx_bake_color", width, height, alpha=True, float_buffer=True)
+    alpha_image = bpy.data.images.new(".tfx_bake_alpha", width, height, alpha=True, float_buffer=True)
+    color_buffer = np.empty(width * height * 4, dtype=np.float32)
+    alpha_buffer = np.empty(width * height * 4, dtype=np.float32)
+    
+    written_files = []
+    try:
+        for frame in frames:
+            scene.frame_set(frame)
+            # Color and alpha have to be baked separately, since the emission pass has no alpha
+            links.new(group_node.outputs['Color'], emission_node.inputs['Color'])
+            target_node.image = color_image
+            bake_emission(obj)
+            links.new(group_node.outputs['Alpha'], emission_node.inputs['Color'])
+            target_node.image = alpha_image
+            bake_emission(obj)
+            
+            color_image.pixels.foreach_get(color_buffer)
+            alpha_image.pixels.foreach_get(alpha_buffer)
+            color_buffer[3::4] = alpha_buffer[0::4]
+            color_image.pixels.foreach_set(color_buffer)
+            
+            filepath = filepath_pattern.format(frame=frame)
+            color_image.filepath_raw = filepath
+            color_image.file_format = 'OPEN_EXR'
+            color_image.save()
+            written_files.append(filepath)
+            if progress_callback:
+                progress_callback(frame)
+    finally:
+        bpy.data.images.remove(color_image)
+        bpy.data.images.remove(alpha_image)
+        remove_bake_plane(obj)
+        scene.render.engine = engine
+        scene.cycles.samples = cycles_samples
+        scene.frame_set(frame_current)
+    
+    return written_files
+
+def run_bake_worker(argument):
+    """
+    Entry point of background processes started by the Bake Effects Chain operator
+    """
+    import json
+    from . import worker_utils
+    args = json.loads(argument)
+    
+    scene = bpy.context.scene
+    scene.cycles.device = 'CPU'
+    if args.get("threads", 0) > 0:
+        scene.render.threads_mode = 'FIXED'
+        scene.render.threads = args["threads"]
+    
+    try:
+        top_tree = bpy.data.node_groups[args["top_tree"]]
+        bake_chain_frames(
+            top_tree.nodes['TfxNext'].node_tree, node_utils.get_chain_root(top_tree),
+            list(range(args["frame_start"], args["frame_end"] + 1)),
+            args["filepath_pattern"], samples=args["samples"],
+            progress_callback=worker_utils.report_progress
+        )
+    except Exception as e:
+        worker_utils.report_error(str(e))
+        raise
@@ -0,0 +1,128 @@
+import bpy
+from . import node_utils
+
+"""
+Effects that sample the downstream chain several times contain nodes named TfxNext, TfxNext.001, TfxNext.002, ...
+All of them are linked to the same downstream node group, so each one duplicates the whole subtree in the compiled shader.
+"""
+
+def count_next_samples(node_tree):
+    """
+    Return the number of times a node group samples its downstream chain
+    """
+    if "TfxNext" not in node_tree.nodes:
+        return 0
+    i = 1
+    while f'TfxNext.{i:03}' in node_tree.nodes:
+        i += 1
+    return i
+
+def get_chain_multiplicity(chain):
+    """
+    For each depth of a chain, compute how many times its node group is evaluated for each shaded pixel.
+    The result list has one more item than the chain, the last one being the root (media) node group
+    """
+    res = []
+    multiplicity = 1
+    for tree, fx_name in chain:
+        samples = count_next_samples(tree)
+        res.append({"tree": tree, "name": fx_name, "samples": samples, "multiplicity": multiplicity})
+        multiplicity *= samples
+    if len(chain) > 0:
+        root = node_utils.get_chain_root(chain[-1][0])
+        res.append({"tree": root, "name": "Media", "samples": 0, "multiplicity": multiplicity})
+    return res
+
+"""
+Cost analysis:
+Group nodes are dissolved when a shader is compiled, so the cost of a chain is measured on its fully expanded node graph.
+"""
+
+# Node types that do not produce any shader node after compilation
+ignored_node_types = {'FRAME', 'REROUTE', 'GROUP_INPUT', 'GROUP_OUTPUT'}
+texture_node_types = {'TEX_IMAGE', 'TEX_ENVIRONMENT'}
+
+analysis_cache = {}
+analysis_cache_max_size = 256
+
+def get_expanded_cost(node_tree, memo):
+    """
+    Return (number of nodes, number of texture samples) of a node group after expanding all nested groups
+    """
+    if node_tree.name in memo:
+        return memo[node_tree.name]
+    memo[node_tree.name] = (0, 0)   # Guard against recursive groups
+    num_nodes, num_samples = 0, 0
+    for node in node_tree.nodes:
+        if node.mute or node.type in ignored_node_types:
+            continue
+        if node.type == 'GROUP':
+            if node.node_tree is not None:
+                sub_nodes, sub_samples = get_expanded_cost(node.node_tree, memo)
+                num_nodes += sub_nodes
+                num_samples += sub_samples
+            continue
+        num_nodes += 1
+        if node.type in texture_node_types:
+            num_samples += 1
+    memo[node_tree.name] = (num_nodes, num_samples)
+    return memo[node_tree.name]
+
+def count_drivers(node_tree, visited):
+    if node_tree.name in visited:
+        return 0
+    visited.add(node_tree.name)
+    res = len(node_tree.animation_data.drivers) if node_tree.animation_data else 0
+    for node in node_tree.nodes:
+        if node.type == 'GROUP' and node.node_tree is not None:
+            res += count_drivers(node.node_tree, visited)
+    return res
+
+def get_tree_signature(tree):
+    """
+    Number of nodes, links and drivers of a node group and its parameter group, and names of its muted nodes
+    """
+    num_drivers = 0
+    for id_data in (tree, tree.nodes["TfxParam"].node_tree if "TfxParam" in tree.nodes else None):
+        if id_data is not None and id_data.animation_data:
+            num_drivers += len(id_data.animation_data.drivers)
+    muted = tuple(node.name for node in tree.nodes if node.mute)
+    return (tree.name, len(tree.nodes), len(tree.links), num_drivers, muted)
+
+def get_chain_signature(top_tree):
+    """
+    A cheap key describing the structure of a chain, which changes whenever effects are added, removed, reordered or cached,
+    and whenever drivers are added or removed or nodes are muted
+    """
+    signature = []
+    tree = top_tree
+    while tree is not None and "TfxNext" in tree.nodes:
+        linked_tree = tree.nodes["TfxNext"].node_tree
+        signature.append(get_tree_signature(tree) + (linked_tree.name if linked_tree else '',))
+        tree = linked_tree
+    if tree is not None:
+        signature.append(get_tree_signature(tree) + ('',))
+    return tuple(signature)
+
+def analyze_chain(top_tree):
+    """
+    Estimate the cost of an effects chain in the compiled shader. Return a dict containing:
+    - nodes: number of shader nodes after expanding nested groups and TfxNext duplicates
+    - texture_samples: number of image texture lookups per shaded pixel
+    - drivers: number of drivers in all node groups of the chain
+    """
+    key = get_chain_signature(top_tree)
+    if key in analysis_cache:
+        return analysis_cache[key]
+    
+    memo = {}
+    num_nodes, num_samples = get_expanded_cost(top_tree, memo)
+    res = {
+        "nodes": num_nodes,
+        "texture_samples": num_samples,
+        "drivers": count_drivers(top_tree, set()),
+    }
+    if len(analysis_cache) >= analysis_cache_max_size:
+        analysis_cache.clear()
+    analysis_cache[key] = res
+    return res
@@ -0,0 +1,249 @@
+import bpy
+from . import node_utils
+
+"""
+Compiled chains:
+A bypassed effect still expands to all its nodes in the compiled shader, including the copies of the downstream chain sampled by TfxNext.001, ...
+When compiled chains are enabled, the node group above such an effect is linked directly to the node group below it,
+and the name of the effect node group is stored in the "tfxLogicalNext" property of the node group above,
+so that the chain shown to the user and read by node_utils.get_next_tree stays the same.
+Effects that are left out of the shader are kept with a fake user and marked with the "tfxCompiledOut" property.
+Only effects whose parameters are not animated are left out, so that the shader does not change between frames.
+Structural edits restore the chain first, and it is compiled again by a depsgraph handler.
+"""
+
+# Effect name -> parameter name -> value at which the effect returns its input unchanged.
+# An effect node group can declare its own values in a "tfxIdentity" property, which takes precedence.
+# A rule only applies if the effect has all the listed parameters
+identity_rules = {
+    "HSV": {"Hue": 0.5, "Saturation": 1.0, "Value": 1.0},
+    "Brightness / Contrast": {"Brightness": 0.0, "Contrast": 0.0},
+    "Fade": {"In": 1.0, "Out": 0.0},
+    "Wave": {"Amplitude": 0.0},
+}
+tolerance = 1e-6
+
+compiler_state = {"busy": False}
+# Name of a node group of a compiled chain (effect or parameters) -> names of top node groups of chains containing it
+chain_membership = {}
+
+def iter_strip_actions(strips):
+    for strip in strips:
+        if strip.action is not None:
+            yield strip.action
+        # Meta strips
+        yield from iter_strip_actions(strip.strips)
+
+def get_animated_paths(id_data):
+    """
+    Return the data paths animated by drivers, the active action or the actions of NLA strips
+    """
+    paths = set()
+    anim_data = id_data.animation_data
+    if anim_data is None:
+        return paths
+    for fc in anim_data.drivers:
+        paths.add(fc.data_path)
+    actions = [anim_data.action] if anim_data.action is not None else []
+    for track in anim_data.nla_tracks:
+        actions += iter_strip_actions(track.strips)
+    for action in actions:
+        for fc in action.fcurves:
+            paths.add(fc.data_path)
+    return paths
+
+def is_value_equal(value, expected):
+    if hasattr(value, "__len__"):
+        if not hasattr(expected, "__len__") or len(value) != len(expected):
+            return False
+        return all(abs(a - b) <= tolerance for a, b in zip(value, expected))
+    return abs(value - expected) <= tolerance
+
+def is_effect_inactive(tree):
+    """
+    Determine if an effect node group returns its input unchanged at any frame, either bypassed or at identity parameters
+    """
+    if "TfxParam" not in tree.nodes or tree.nodes["TfxParam"].node_tree is None:
+        return False
+    param_tree = tree.nodes["TfxParam"].node_tree
+    params = param_tree.nodes["Group Output"].inputs
+    animated_paths = get_animated_paths(param_tree)
+    def get_static_value(name):
+        for i, param in enumerate(params):
+            if param.name == name:
+                if f'nodes["Group Output"].inputs[{i}].default_value' in animated_paths:
+                    return None
+                return param.default_value
+        return None
+
+    bypass = get_static_value("Bypass")
+    if bypass is not None and bypass >= 1.0 - tolerance:
+        return True
+    rule = tree["tfxIdentity"].to_dict() if "tfxIdentity" in tree else identity_rules.get(tree.get("tfxName"))
+    if not rule:
+        return False
+    for name, expected in rule.items():
+        value = get_static_value(name)
+        if value is None or not is_value_equal(value, expected):
+            return False
+    return True
+
+def get_compiled_links(top_tree):
+    """
+    Walk the chain from the top down to the root or a cache point.
+    Return the node groups of the chain with their states, and the node group each of them should be linked to
+    """
+    chain = []
+    tree = top_tree
+    while True:
+        chain.append((tree, tree is not top_tree and is_effect_inactive(tree)))
+        if "tfxCacheSource" in tree:
+            break
+        next_tree = node_utils.get_next_tree(tree)
+        if next_tree is None or "TfxNext" not in next_tree.nodes or "tfxName" not in next_tree:
+            break
+        tree = next_tree
+    # The last node group is never relinked, so its current link is the end of the chain
+    target = chain[-1][0].nodes["TfxNext"].node_tree
+    links = []
+    for tree, inactive in reversed(chain):
+        links.append((tree, inactive, target))
+        if not inactive:
+            target = tree
+    links.reverse()
+    return links
+
+def is_chain_compiled(top_tree):
+    for tree, inactive, target in get_compiled_links(top_tree):
+        if inactive != ("tfxCompiledOut" in tree):
+            return False
+        if not inactive and tree.nodes["TfxNext"].node_tree != target:
+            return False
+    return True
+
+def get_skipped_tree_names():
+    """
+    Return the names of all node groups left out of compiled chains, starting from the links stored in "tfxLogicalNext"
+    """
+    res = set()
+    for tree in bpy.data.node_groups:
+        if "tfxLogicalNext" not in tree:
+            continue
+        skipped_tree = bpy.data.node_groups.get(tree["tfxLogicalNext"])
+        while skipped_tree is not None and "tfxCompiledOut" in skipped_tree and skipped_tree.name not in res:
+            res.add(skipped_tree.name)
+            skipped_tree = skipped_tree.nodes["TfxNext"].node_tree
+    return res
+
+def restore_chain(top_tree):
+    """
+    Link all effects of a chain again, so that the node group links are the same as the chain shown to the user.
+    Effects shared with other chains stay marked as left out as long as another compiled chain skips them
+    """
+    compiled_out = []
+    tree = top_tree
+    while tree is not None and "TfxNext" in tree.nodes and "tfxName" in tree:
+        if "tfxLogicalNext" in tree:
+            next_tree = bpy.data.node_groups.get(tree["tfxLogicalNext"])
+            del tree["tfxLogicalNext"]
+            if next_tree is not None:
+                node_utils.set_next_depth(tree, next_tree)
+        if "tfxCompiledOut" in tree:
+            compiled_out.append(tree)
+        if "tfxCacheSource" in tree:
+            break
+        tree = tree.nodes["TfxNext"].node_tree
+    if not compiled_out:
+        return
+    skipped_names = get_skipped_tree_names()
+    for tree in compiled_out:
+        if tree.name not in skipped_names:
+            del tree["tfxCompiledOut"]
+            tree.use_fake_user = False
+
+def add_chain_membership(top_tree, links):
+    for tree, _, _ in links:
+        # Parameter changes are reported as updates of the parameter node groups
+        chain_membership.setdefault(tree.name, set()).add(top_tree.name)
+        if "TfxParam" in tree.nodes and tree.nodes["TfxParam"].node_tree is not None:
+            chain_membership.setdefault(tree.nodes["TfxParam"].node_tree.name, set()).add(top_tree.name)
+
+def compile_chain(top_tree):
+    """
+    Link each active node group of a chain to the next active one, leaving out bypassed effects and effects at identity
+    """
+    restore_chain(top_tree)
+    links = get_compiled_links(top_tree)
+    add_chain_membership(top_tree, links)
+    for tree, inactive, target in links:
+        if inactive:
+            tree["tfxCompiledOut"] = True
+            tree.use_fake_user = True
+        elif tree.nodes["TfxNext"].node_tree != target:
+            tree["tfxLogicalNext"] = tree.nodes["TfxNext"].node_tree.name
+            node_utils.set_next_depth(tree, target)
+
+def update_chains(top_trees, compiled):
+    compiler_state["busy"] = True
+    try:
+        for top_tree in top_trees:
+            if not compiled:
+                restore_chain(top_tree)
+            elif not is_chain_compiled(top_tree):
+                compile_chain(top_tree)
+    finally:
+        compiler_state["busy"] = False
+
+def update_scene_chains(scene):
+    """
+    Compile or restore all chains of a scene according to its setting
+    """
+    top_trees = [top_tree for top_tree, _, _ in node_utils.iter_scene_media(scene)]
+    update_chains(top_trees, scene.tfx_compile_chains)
+
+def iter_material_top_trees(material):
+    if material.node_tree is None:
+        return
+    for node in material.node_tree.nodes:
+        if node.type == 'GROUP' and node.node_tree is not None and "tfxName" in node.node_tree and "TfxNext" in node.node_tree.nodes:
+            yield node.node_tree
+
+@bpy.app.handlers.persistent
+def chain_compiler_depsgraph_handler(scene, depsgraph):
+    if compiler_state["busy"] or not getattr(scene, "tfx_compile_chains", False):
+        return
+    top_trees = {}
+    for update in depsgraph.updates:
+        id_data = update.id.original
+        if isinstance(id_data, bpy.types.Material):
+            for top_tree in iter_material_top_trees(id_data):
+                top_trees[top_tree.name] = top_tree
+        elif isinstance(id_data, bpy.types.NodeTree):
+            for name in chain_membership.get(id_data.name, ()):
+                top_tree = bpy.data.node_groups.get(name)
+                if top_tree is not None:
+                    top_trees[name] = top_tree
+    if top_trees:
+        update_chains(top_trees.values(), True)
+
+@bpy.app.handlers.persistent
+def chain_compiler_load_handler(dummy):
+    # Chains compiled in the loaded file are only recompiled on parameter changes if their node groups are known
+    chain_membership.clear()
+    for scene in bpy.data.scenes:
+        if scene.tfx_compile_chains:
+            for top_tree, _, _ in node_utils.iter_scene_media(scene):
+                add_chain_membership(top_tree, get_compiled_links(top_tree))
+
+def register():
+    if chain_compiler_depsgraph_handler not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(chain_compiler_depsgraph_handler)
+    if chain_compiler_load_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(chain_compiler_load_handler)
+
+def unregister():
+    if chain_compiler_depsgraph_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(chain_compiler_depsgraph_handler)
+    if chain_compiler_load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(chain_compiler_load_handler)
+    chain_membership.clear()
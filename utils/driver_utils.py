@@ -0,0 +1,305 @@
+import re
+import ast
+import time
+from decimal import Decimal
+import bpy
+from . import profiling
+
+"""
+Blender evaluates a scripted driver without the Python interpreter if its expression only uses the constructs below.
+Such "simple expressions" are much faster, and keep working when auto-run of Python scripts is disabled.
+"""
+
+# Function name -> allowed numbers of arguments (None for any number)
+simple_functions = {
+    "radians": (1,), "degrees": (1,),
+    "abs": (1,), "fabs": (1,), "floor": (1,), "ceil": (1,), "trunc": (1,), "round": (1,), "int": (1,),
+    "sin": (1,), "cos": (1,), "tan": (1,), "asin": (1,), "acos": (1,), "atan": (1,), "atan2": (2,),
+    "exp": (1,), "log": (1, 2), "sqrt": (1,), "pow": (2,), "fmod": (2,),
+    "min": None, "max": None,
+    "lerp": (3,), "clamp": (1, 3), "smoothstep": (3,),
+}
+simple_constants = {"pi", "True", "False", "frame"}
+simple_binary_ops = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+simple_unary_ops = (ast.UAdd, ast.USub, ast.Not)
+simple_compare_ops = (ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+exponent_pattern = re.compile(r"(?<![A-Za-z_])\d+\.?\d*[eE][+-]?\d")
+
+def format_number(value):
+    """
+    Format a number without exponent notation, with all the digits needed to read back the same value
+    """
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return format(Decimal(repr(float(value))), 'f')
+
+def check_simple_node(node, variables):
+    """
+    Return None if an AST node can be evaluated as a simple expression, otherwise a description of the problem
+    """
+    if isinstance(node, ast.Expression):
+        return check_simple_node(node.body, variables)
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, (int, float)):
+            return None
+        return f"unsupported constant {node.value!r}"
+    if isinstance(node, ast.Name):
+        if node.id in variables or node.id in simple_constants:
+            return None
+        return f"unknown name '{node.id}'"
+    if isinstance(node, ast.BinOp):
+        if not isinstance(node.op, simple_binary_ops):
+            return f"unsupported operator {type(node.op).__name__}"
+        return check_simple_node(node.left, variables) or check_simple_node(node.right, variables)
+    if isinstance(node, ast.UnaryOp):
+        if not isinstance(node.op, simple_unary_ops):
+            return f"unsupported operator {type(node.op).__name__}"
+        return check_simple_node(node.operand, variables)
+    if isinstance(node, ast.BoolOp):
+        for value in node.values:
+            problem = check_simple_node(value, variables)
+            if problem:
+                return problem
+        return None
+    if isinstance(node, ast.Compare):
+        if len(node.ops) != 1 or not isinstance(node.ops[0], simple_compare_ops):
+            return "unsupported comparison"
+        return check_simple_node(node.left, variables) or check_simple_node(node.comparators[0], variables)
+    if isinstance(node, ast.IfExp):
+        return (check_simple_node(node.test, variables) or check_simple_node(node.body, variables)
+                or check_simple_node(node.orelse, variables))
+    if isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in simple_functions:
+            return "unsupported function call"
+        if node.keywords:
+            return "keyword arguments are not supported"
+        arities = simple_functions[node.func.id]
+        if arities is not None and len(node.args) not in arities:
+            return f"wrong number of arguments for '{node.func.id}'"
+        if arities is None and len(node.args) < 1:
+            return f"'{node.func.id}' needs arguments"
+        for arg in node.args:
+            problem = check_simple_node(arg, variables)
+            if problem:
+                return problem
+        return None
+    return f"unsupported syntax {type(node).__name__}"
+
+def validate_expression(expr, variables):
+    """
+    Return None if the expression can be evaluated by the simple expression evaluator, otherwise a description of the problem
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode='eval')
+    except SyntaxError as e:
+        return f"syntax error: {e.msg}"
+    if exponent_pattern.search(expr):
+        return "exponent notation in numbers"
+    return check_simple_node(tree, set(variables))
+
+class SimpleExpressionTransformer(ast.NodeTransformer):
+    """
+    Replace constructs that have an equivalent in simple expressions
+    """
+    math_functions = {"floor", "ceil", "trunc", "sin", "cos", "tan", "asin", "acos", "atan", "atan2",
+                      "exp", "log", "sqrt", "pow", "fmod", "radians", "degrees", "fabs"}
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            return ast.Call(func=ast.Name(id="pow", ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+        if isinstance(node.op, ast.Mod):
+            # a % b -> a - floor(a/b)*b, which has the sign of b like the Python operator, unlike fmod
+            floor_call = ast.Call(func=ast.Name(id="floor", ctx=ast.Load()), args=[ast.BinOp(left=node.left, op=ast.Div(), right=node.right)], keywords=[])
+            return ast.BinOp(left=node.left, op=ast.Sub(), right=ast.BinOp(left=floor_call, op=ast.Mult(), right=node.right))
+        return node
+
+    def visit_Attribute(self, node):
+        # math.floor(x) -> floor(x)
+        self.generic_visit(node)
+        if isinstance(node.value, ast.Name) and node.value.id == "math":
+            if node.attr in self.math_functions:
+                return ast.Name(id=node.attr, ctx=ast.Load())
+            if node.attr == "pi":
+                return ast.Name(id="pi", ctx=ast.Load())
+        return node
+
+    def visit_Call(self, node):
+        # float(x) -> x
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id == "float" and len(node.args) == 1 and not node.keywords:
+            return node.args[0]
+        return node
+
+    def visit_Compare(self, node):
+        # a < b < c -> a < b and b < c
+        self.generic_visit(node)
+        if len(node.ops) < 2:
+            return node
+        operands = [node.left] + node.comparators
+        return ast.BoolOp(op=ast.And(), values=[
+            ast.Compare(left=operands[i], ops=[op], comparators=[operands[i+1]]) for i, op in enumerate(node.ops)
+        ])
+
+def unparse_simple(node):
+    """
+    Convert an AST to text, with numbers formatted without exponent notation
+    """
+    if isinstance(node, ast.Expression):
+        return unparse_simple(node.body)
+    if isinstance(node, ast.Constant):
+        return format_number(node.value)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.BinOp):
+        op = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/'}[type(node.op)]
+        return f"({unparse_simple(node.left)}{op}{unparse_simple(node.right)})"
+    if isinstance(node, ast.UnaryOp):
+        op = {ast.UAdd: '+', ast.USub: '-', ast.Not: 'not '}[type(node.op)]
+        return f"({op}{unparse_simple(node.operand)})"
+    if isinstance(node, ast.BoolOp):
+        op = ' and ' if isinstance(node.op, ast.And) else ' or '
+        return f"({op.join(unparse_simple(v) for v in node.values)})"
+    if isinstance(node, ast.Compare):
+        op = {ast.Eq: '==', ast.NotEq: '!=', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>='}[type(node.ops[0])]
+        return f"({unparse_simple(node.left)}{op}{unparse_simple(node.comparators[0])})"
+    if isinstance(node, ast.IfExp):
+        return f"({unparse_simple(node.body)} if {unparse_simple(node.test)} else {unparse_simple(node.orelse)})"
+    if isinstance(node, ast.Call):
+        return f"{node.func.id}({', '.join(unparse_simple(arg) for arg in node.args)})"
+    raise ValueError(f"Cannot convert {type(node).__name__} to a simple expression")
+
+def rewrite_expression(expr, variables):
+    """
+    Rewrite an expression into an equivalent simple expression.
+    Return the original text if it is already simple, or None if it cannot be rewritten
+    """
+    if validate_expression(expr, variables) is None:
+        return expr
+    try:
+        tree = SimpleExpressionTransformer().visit(ast.parse(expr.strip(), mode='eval'))
+        ast.fix_missing_locations(tree)
+        if check_simple_node(tree, set(variables)) is not None:
+            return None
+        return unparse_simple(tree)
+    except (SyntaxError, ValueError, KeyError):
+        return None
+
+@profiling.profiled("driver:expression")
+def set_driver_expression(driver, expr):
+    """
+    Set the expression of a scripted driver, making sure it stays on the simple expression path
+    """
+    variables = [var.name for var in driver.variables]
+    simple_expr = rewrite_expression(expr, variables)
+    if simple_expr is None:
+        raise ValueError(f"Driver expression '{expr}' cannot be evaluated as a simple expression: {validate_expression(expr, variables)}")
+    driver.expression = simple_expr
+
+# Scene-wide audit
+#################################################
+
+def iter_animated_ids():
+    for collection in (bpy.data.node_groups, bpy.data.materials, bpy.data.objects, bpy.data.scenes,
+                       bpy.data.meshes, bpy.data.worlds, bpy.data.cameras, bpy.data.lights):
+        for id_data in collection:
+            yield id_data
+            # Node trees of materials and worlds are embedded IDs with their own animation data
+            if getattr(id_data, "node_tree", None) is not None:
+                yield id_data.node_tree
+
+def audit_drivers(fix=False):
+    """
+    Find all scripted drivers that fall back to Python evaluation according to Blender. Return a list of dict, one for each of them.
+    The validator above is stricter than Blender and only explains why an expression is rejected
+    """
+    res = []
+    for id_data in iter_animated_ids():
+        if id_data.animation_data is None:
+            continue
+        for fc in id_data.animation_data.drivers:
+            driver = fc.driver
+            if driver.type != 'SCRIPTED':
+                continue
+            variables = [var.name for var in driver.variables]
+            problem = validate_expression(driver.expression, variables)
+            if driver.is_simple_expression:
+                continue
+            item = {
+                "id": id_data.name, "data_path": fc.data_path, "expression": driver.expression,
+                "problem": problem or "rejected by Blender", "fixed": False,
+            }
+            if fix and problem is not None:
+                simple_expr = rewrite_expression(driver.expression, variables)
+                if simple_expr is not None:
+                    driver.expression = simple_expr
+                    item["fixed"] = True
+            res.append(item)
+    return res
+
+# Benchmark
+#################################################
+
+def measure_frame_evaluation(scene, frames):
+    """
+    Return the average time in milliseconds to evaluate the scene at each given frame
+    """
+    frame_current = scene.frame_current
+    start_time = time.perf_counter()
+    for frame in frames:
+        scene.frame_set(frame)
+    elapsed = time.perf_counter() - start_time
+    scene.frame_set(frame_current)
+    return elapsed * 1000.0 / max(1, len(frames))
+
+def benchmark_driver_evaluation(num_media=500, num_frames=50):
+    """
+    Compare the per-frame cost of playback drivers evaluated as simple expressions and by Python.
+    Temporary drivers are created on custom properties of a hidden object, which is removed afterwards
+    """
+    scene = bpy.context.scene
+    frames = [scene.frame_start + i for i in range(num_frames)]
+    expr = "int(min(max(floor(p*d)+s-t, s-t), s+d-t-1))"
+
+    obj = bpy.data.objects.new(".tfx_driver_benchmark", None)
+    scene.collection.objects.link(obj)
+    res = {"num_media": num_media, "num_frames": num_frames}
+    try:
+        res["baseline_ms"] = measure_frame_evaluation(scene, frames)
+        drivers = []
+        for i in range(num_media):
+            obj[f"tfxFirstFrame_{i}"] = 1
+            obj[f"tfxFrameDuration_{i}"] = 100
+            obj[f"tfxPlayhead_{i}"] = 0.5
+            obj[f"tfxOffset_{i}"] = 0
+            fc = obj.driver_add(f'["tfxOffset_{i}"]')
+            fc.driver.type = 'SCRIPTED'
+            for name, key in (('s', 'tfxFirstFrame'), ('p', 'tfxPlayhead'), ('d', 'tfxFrameDuration')):
+                var = fc.driver.variables.new()
+                var.name = name
+                var.type = 'SINGLE_PROP'
+                var.targets[0].id_type = 'OBJECT'
+                var.targets[0].id = obj
+                var.targets[0].data_path = f'["{key}_{i}"]'
+            var = fc.driver.variables.new()
+            var.name = 't'
+            var.type = 'SINGLE_PROP'
+            var.targets[0].id_type = 'SCENE'
+            var.targets[0].id = scene
+            var.targets[0].data_path = 'frame_current'
+            drivers.append(fc.driver)
+
+        for driver in drivers:
+            set_driver_expression(driver, expr)
+        res["simple_ms"] = measure_frame_evaluation(scene, frames)
+        res["simple_valid"] = all(driver.is_simple_expression for driver in drivers)
+
+        # String literals are never supported by the simple expression evaluator
+        for driver in drivers:
+            driver.expression = f"{expr}+0*len('')"
+        res["python_ms"] = measure_frame_evaluation(scene, frames)
+    finally:
+        bpy.data.objects.remove(obj)
+    return res
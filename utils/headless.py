@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import types
+import fnmatch
+import argparse
+import bpy
+from . import node_utils, media_utils, worker_utils
+
+"""
+Apply effect presets and playback settings to a blend file without user interface.
+Usage in a single file:
+    blender -b shot.blend --python-expr "import texture_vfx_control.utils.headless as h; h.main()" -- --preset preset.json --save
+Many files are processed in parallel by scripts/batch_apply.py, which calls process_file in each background Blender process.
+"""
+
+def get_playback_options(overrides):
+    """
+    Build an object with the same attributes as the options of the Add Playback Controller operator,
+    using the defaults of the operator properties for values not given
+    """
+    from ..operators.playback_control import PlaybackOptions
+    values = {}
+    for name, prop in PlaybackOptions.__annotations__.items():
+        values[name] = prop.keywords.get("default")
+    for name, value in overrides.items():
+        if name not in values:
+            raise ValueError(f"Unknown playback option: {name}")
+        values[name] = value
+    return types.SimpleNamespace(**values)
+
+def match_any(name, patterns):
+    return not patterns or any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
+
+def select_media(material_patterns=(), media_patterns=()):
+    """
+    Return (top node group, media node group, image node) of wrapped media in all materials, filtered by glob patterns of names
+    """
+    res = []
+    visited = set()
+    for material in bpy.data.materials:
+        if material.node_tree is None or not match_any(material.name, material_patterns):
+            continue
+        for node in material.node_tree.nodes:
+            if node.type != 'GROUP' or node.node_tree is None or "tfxName" not in node.node_tree:
+                continue
+            if node.node_tree.name in visited:
+                continue
+            visited.add(node.node_tree.name)
+            media_tree = node_utils.get_chain_root(node.node_tree)
+            if media_tree is None or "TfxMedia" not in media_tree.nodes:
+                continue
+            image_node = media_tree.nodes["TfxMedia"]
+            if image_node.image is None or not match_any(image_node.image.name, media_patterns):
+                continue
+            res.append((node.node_tree, media_tree, image_node))
+    return res
+
+def apply_to_current_file(preset=None, materials=(), media=(), playback=None, start_frame=None, instanced=False):
+    """
+    Apply an effects chain configuration and/or playback settings to the selected media of the current file.
+    Return a summary of the changes
+    """
+    from ..operators import effects_chain, playback_control
+    context = bpy.context
+    items = select_media(materials, media)
+    summary = {"media": len(items), "effects": 0, "playback": 0}
+
+    if preset is not None:
+        for top_tree, _, _ in items:
+            summary["effects"] += len(effects_chain.apply_json_config(preset, top_tree, instanced=instanced))
+
+    if playback is not None:
+        options = get_playback_options(playback)
+        playback_items = [item for item in items if item[2].image.source in ('MOVIE', 'SEQUENCE')]
+        media_utils.prefetch_media_metadata([image_node.image for _, _, image_node in playback_items])
+        for top_tree, media_tree, image_node in playback_items:
+            if top_tree.get("tfxPlaybackControl") in (1, 2):
+                playback_control.remove_playback_controller(top_tree, media_tree, image_node)
+            playback_control.add_playback_controller(
+                context, options, top_tree, media_tree, image_node,
+                context.scene.frame_current if start_frame is None else start_frame
+            )
+            summary["playback"] += 1
+    return summary
+
+def load_preset(preset):
+    if preset is None or isinstance(preset, dict):
+        return preset
+    with open(preset, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_file(output):
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        bpy.ops.wm.save_as_mainfile(filepath=output, copy=True)
+    else:
+        bpy.ops.wm.save_mainfile()
+
+def process_file(argument):
+    """
+    Entry point of background processes started by scripts/batch_apply.py, with a JSON argument of:
+    preset (file path or configuration), materials, media (lists of glob patterns), playback (dict of options),
+    start_frame, instanced, save (bool) and output (file path)
+    """
+    args = json.loads(argument)
+    start_time = time.perf_counter()
+    try:
+        summary = apply_to_current_file(
+            preset=load_preset(args.get("preset")),
+            materials=args.get("materials", []), media=args.get("media", []),
+            playback=args.get("playback"), start_frame=args.get("start_frame"),
+            instanced=args.get("instanced", False),
+        )
+        if args.get("save") or args.get("output"):
+            save_file(args.get("output"))
+    except Exception as e:
+        worker_utils.report_error(f"{type(e).__name__}: {e}")
+        raise
+    summary["file"] = bpy.data.filepath
+    summary["seconds"] = time.perf_counter() - start_time
+    worker_utils.report_result(summary)
+
+def main(argv=None):
+    """
+    Command line entry point for the file opened by Blender. Arguments are read after "--"
+    """
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="texture_vfx_control.utils.headless")
+    parser.add_argument("--preset", help="Effects chain configuration saved by the add-on")
+    parser.add_argument("--material", action="append", default=[], help="Glob pattern of material names, can be repeated")
+    parser.add_argument("--media", action="append", default=[], help="Glob pattern of image names, can be repeated")
+    parser.add_argument("--playback", help="Playback controller options as JSON, e.g. '{\"controller\": \"GLOBAL\", \"playback_loops\": 2}'")
+    parser.add_argument("--start-frame", type=int, default=None)
+    parser.add_argument("--instanced", action="store_true", help="Share identical effects chains between materials")
+    parser.add_argument("--save", action="store_true", help="Save the file in place")
+    parser.add_argument("--output", help="Save a copy of the file to this path instead")
+    args = parser.parse_args(argv)
+
+    process_file(json.dumps({
+        "preset": args.preset, "materials": args.material, "media": args.media,
+        "playback": json.loads(args.playback) if args.playback else None,
+        "start_frame": args.start_frame, "instanced": args.instanced,
+        "save": args.save, "output": args.output,
+    }))
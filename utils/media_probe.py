@@ -0,0 +1,347 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from . import profiling
+
+"""
+Read media metadata from file headers only, without decoding any pixel data.
+Supported formats: MP4/MOV, MKV/WebM, AVI, PNG, JPEG, OpenEXR and TIFF.
+Each probe function returns a dict with some of the keys: width, height, fps, frame_count, channels, depth (bits per pixel),
+or None if the file cannot be parsed.
+This module does not depend on bpy, so that it can be used in worker threads.
+"""
+
+def probe_png(f):
+    data = f.read(33)
+    if len(data) < 33 or data[12:16] != b'IHDR':
+        return None
+    width, height, bit_depth, color_type = struct.unpack('>IIBB', data[16:26])
+    channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}.get(color_type, 4)
+    return {"width": width, "height": height, "channels": channels, "depth": bit_depth * channels, "frame_count": 1}
+
+def probe_jpeg(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        # Markers without payload
+        if marker in (0x01, 0xd8) or 0xd0 <= marker <= 0xd7:
+            continue
+        length_data = f.read(2)
+        if len(length_data) < 2:
+            return None
+        length = struct.unpack('>H', length_data)[0]
+        # Start of frame, except DHT, JPG and DAC markers
+        if 0xc0 <= marker <= 0xcf and marker not in (0xc4, 0xc8, 0xcc):
+            data = f.read(6)
+            if len(data) < 6:
+                return None
+            precision, height, width, channels = struct.unpack('>BHHB', data)
+            return {"width": width, "height": height, "channels": channels, "depth": precision * channels, "frame_count": 1}
+        f.seek(length - 2, os.SEEK_CUR)
+
+def read_null_terminated(f):
+    res = bytearray()
+    while True:
+        c = f.read(1)
+        if not c or c == b'\x00':
+            return bytes(res)
+        res += c
+
+def probe_exr(f):
+    f.seek(8)
+    res = {"frame_count": 1}
+    while True:
+        name = read_null_terminated(f)
+        if not name:
+            break
+        attr_type = read_null_terminated(f)
+        size_data = f.read(4)
+        if len(size_data) < 4:
+            return None
+        size = struct.unpack('<i', size_data)[0]
+        value = f.read(size)
+        if name == b'dataWindow' and attr_type == b'box2i' and len(value) >= 16:
+            xmin, ymin, xmax, ymax = struct.unpack('<iiii', value[:16])
+            res["width"], res["height"] = xmax - xmin + 1, ymax - ymin + 1
+        elif name == b'channels' and attr_type == b'chlist':
+            channels, depth, pos = 0, 0, 0
+            while pos < len(value) and value[pos] != 0:
+                pos = value.index(b'\x00', pos) + 1
+                pixel_type = struct.unpack('<i', value[pos:pos+4])[0]
+                channels += 1
+                depth += 16 if pixel_type == 1 else 32
+                pos += 16
+            res["channels"], res["depth"] = channels, depth
+    return res if "width" in res else None
+
+def probe_tiff(f):
+    header = f.read(8)
+    endian = '<' if header[:2] == b'II' else '>'
+    magic, ifd_offset = struct.unpack(endian + 'HI', header[2:8])
+    if magic != 42:
+        return None
+    f.seek(ifd_offset)
+    num_entries = struct.unpack(endian + 'H', f.read(2))[0]
+    entries = f.read(12 * num_entries)
+    tags = {}
+    for i in range(num_entries):
+        tag, field_type, count = struct.unpack(endian + 'HHI', entries[12*i:12*i+8])
+        value_data = entries[12*i+8:12*i+12]
+        # Only the first value of SHORT/LONG fields is needed
+        if field_type == 3:
+            tags[tag] = (struct.unpack(endian + 'H', value_data[:2])[0], count)
+        elif field_type == 4:
+            tags[tag] = (struct.unpack(endian + 'I', value_data)[0], count)
+    if 256 not in tags or 257 not in tags:
+        return None
+    channels = tags.get(277, (1, 1))[0]
+    bits_per_sample = tags.get(258, (8, 1))
+    # When there are more than two samples, the field stores an offset to the values
+    bits = bits_per_sample[0] if bits_per_sample[1] <= 2 else 8
+    return {"width": tags[256][0], "height": tags[257][0], "channels": channels, "depth": bits * channels, "frame_count": 1}
+
+def iter_atoms(data, start, end):
+    """
+    Iterate (type, payload start, payload end) of ISO base media (MP4/MOV) atoms in a buffer
+    """
+    pos = start
+    while pos + 8 <= end:
+        size, atom_type = struct.unpack('>I4s', data[pos:pos+8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[pos+8:pos+16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            return
+        yield atom_type, pos + header_size, min(pos + size, end)
+        pos += size
+
+def find_atom(data, start, end, atom_type):
+    for t, s, e in iter_atoms(data, start, end):
+        if t == atom_type:
+            return s, e
+    return None
+
+def probe_mp4(f):
+    # Find the moov atom at the top level without reading other atoms, which contain the media data
+    file_size = f.seek(0, os.SEEK_END)
+    pos = 0
+    moov = None
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, atom_type = struct.unpack('>I4s', header[:8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+            header_size = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_size:
+            return None
+        if atom_type == b'moov':
+            f.seek(pos + header_size)
+            moov = f.read(size - header_size)
+            break
+        pos += size
+    if moov is None:
+        return None
+
+    for atom_type, trak_start, trak_end in iter_atoms(moov, 0, len(moov)):
+        if atom_type != b'trak':
+            continue
+        mdia = find_atom(moov, trak_start, trak_end, b'mdia')
+        if mdia is None:
+            continue
+        hdlr = find_atom(moov, mdia[0], mdia[1], b'hdlr')
+        if hdlr is None or moov[hdlr[0]+8:hdlr[0]+12] != b'vide':
+            continue
+        res = {"channels": 3, "depth": 24}
+
+        tkhd = find_atom(moov, trak_start, trak_end, b'tkhd')
+        if tkhd is not None:
+            offset = tkhd[0] + (76 if moov[tkhd[0]] == 0 else 88)
+            width, height = struct.unpack('>II', moov[offset:offset+8])
+            res["width"], res["height"] = width >> 16, height >> 16
+
+        mdhd = find_atom(moov, mdia[0], mdia[1], b'mdhd')
+        timescale, duration = 0, 0
+        if mdhd is not None:
+            if moov[mdhd[0]] == 0:
+                timescale, duration = struct.unpack('>II', moov[mdhd[0]+12:mdhd[0]+20])
+            else:
+                timescale, duration = struct.unpack('>IQ', moov[mdhd[0]+20:mdhd[0]+32])
+
+        minf = find_atom(moov, mdia[0], mdia[1], b'minf')
+        stbl = find_atom(moov, minf[0], minf[1], b'stbl') if minf else None
+        stts = find_atom(moov, stbl[0], stbl[1], b'stts') if stbl else None
+        if stts is not None:
+            num_entries = struct.unpack('>I', moov[stts[0]+4:stts[0]+8])[0]
+            frame_count = 0
+            for i in range(num_entries):
+                frame_count += struct.unpack('>I', moov[stts[0]+8+8*i:stts[0]+12+8*i])[0]
+            res["frame_count"] = frame_count
+            if timescale > 0 and duration > 0:
+                res["fps"] = frame_count * timescale / duration
+        return res if "width" in res else None
+    return None
+
+def read_vint(data, pos, keep_marker=False):
+    """
+    Read a variable-size integer of EBML. Return (value, new position, whether all value bits are set)
+    """
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (first & mask):
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("Invalid EBML variable-size integer")
+    value = first if keep_marker else first & (mask - 1)
+    for b in data[pos+1:pos+length]:
+        value = (value << 8) | b
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, pos + length, unknown
+
+def iter_ebml(data, start, end):
+    pos = start
+    while pos < end:
+        element_id, pos, _ = read_vint(data, pos, keep_marker=True)
+        size, pos, unknown = read_vint(data, pos)
+        if unknown:
+            size = end - pos
+        yield element_id, pos, min(pos + size, end)
+        pos += size
+
+def read_ebml_uint(data, start, end):
+    return int.from_bytes(data[start:end], 'big')
+
+def read_ebml_float(data, start, end):
+    return struct.unpack('>f' if end - start == 4 else '>d', data[start:end])[0]
+
+def probe_mkv(f, max_header_size=16 * 1024 * 1024):
+    # Info and Tracks elements are located before the first cluster in practice
+    data = f.read(max_header_size)
+    segment = None
+    for element_id, s, e in iter_ebml(data, 0, len(data)):
+        if element_id == 0x18538067:
+            segment = (s, e)
+            break
+    if segment is None:
+        return None
+
+    res = {"channels": 3, "depth": 24}
+    timecode_scale, duration = 1000000, None
+    for element_id, s, e in iter_ebml(data, segment[0], segment[1]):
+        if element_id == 0x1549A966:    # Info
+            for child_id, cs, ce in iter_ebml(data, s, e):
+                if child_id == 0x2AD7B1:
+                    timecode_scale = read_ebml_uint(data, cs, ce)
+                elif child_id == 0x4489:
+                    duration = read_ebml_float(data, cs, ce)
+        elif element_id == 0x1654AE6B:  # Tracks
+            for track_id, ts, te in iter_ebml(data, s, e):
+                if track_id != 0xAE or "width" in res:
+                    continue
+                track = {}
+                for child_id, cs, ce in iter_ebml(data, ts, te):
+                    if child_id == 0x83:
+                        track["type"] = read_ebml_uint(data, cs, ce)
+                    elif child_id == 0x23E383:
+                        track["default_duration"] = read_ebml_uint(data, cs, ce)
+                    elif child_id == 0xE0:
+                        for video_id, vs, ve in iter_ebml(data, cs, ce):
+                            if video_id == 0xB0:
+                                track["width"] = read_ebml_uint(data, vs, ve)
+                            elif video_id == 0xBA:
+                                track["height"] = read_ebml_uint(data, vs, ve)
+                if track.get("type") == 1 and "width" in track:
+                    res["width"], res["height"] = track["width"], track.get("height", 0)
+                    if track.get("default_duration"):
+                        res["fps"] = 1e9 / track["default_duration"]
+        elif element_id == 0x1F43B675:  # Cluster
+            break
+
+    if "fps" in res and duration is not None:
+        res["frame_count"] = int(round(duration * timecode_scale / 1e9 * res["fps"]))
+    return res if "width" in res else None
+
+def probe_avi(f, max_header_size=1024 * 1024):
+    data = f.read(max_header_size)
+    res = {"channels": 3, "depth": 24}
+
+    def parse_list(start, end):
+        pos = start
+        while pos + 8 <= end:
+            chunk_id, size = struct.unpack('<4sI', data[pos:pos+8])
+            payload = pos + 8
+            if chunk_id == b'LIST':
+                list_type = data[payload:payload+4]
+                if list_type == b'movi':
+                    return
+                parse_list(payload + 4, min(payload + size, end))
+            elif chunk_id == b'avih' and size >= 40:
+                usec_per_frame, _, _, _, total_frames, _, _, _, width, height = struct.unpack('<10I', data[payload:payload+40])
+                res["width"], res["height"] = width, height
+                res.setdefault("frame_count", total_frames)
+                if usec_per_frame > 0:
+                    res.setdefault("fps", 1e6 / usec_per_frame)
+            elif chunk_id == b'strh' and size >= 36 and data[payload:payload+4] == b'vids':
+                scale, rate, _, length = struct.unpack('<4I', data[payload+20:payload+36])
+                if scale > 0:
+                    res["fps"] = rate / scale
+                res["frame_count"] = length
+            pos = payload + size + (size & 1)
+
+    parse_list(12, len(data))
+    return res if "width" in res else None
+
+@profiling.profiled("media:probe_file")
+def probe_file(filepath):
+    """
+    Detect the format of a file from its magic number and parse its header
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            magic = f.read(16)
+            f.seek(0)
+            if magic[:8] == b'\x89PNG\r\n\x1a\n':
+                return probe_png(f)
+            if magic[:2] == b'\xff\xd8':
+                return probe_jpeg(f)
+            if magic[:4] == b'\x76\x2f\x31\x01':
+                return probe_exr(f)
+            if magic[:4] in (b'II*\x00', b'MM\x00*'):
+                return probe_tiff(f)
+            if magic[:4] == b'RIFF' and magic[8:12] == b'AVI ':
+                return probe_avi(f)
+            if magic[:4] == b'\x1a\x45\xdf\xa3':
+                return probe_mkv(f)
+            if magic[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free', b'skip', b'pnot'):
+                return probe_mp4(f)
+    except (OSError, struct.error, ValueError, IndexError):
+        pass
+    return None
+
+def probe_files(filepaths, max_workers=8):
+    """
+    Probe many files concurrently. Return a map from file path to the result of probe_file
+    """
+    filepaths = list(dict.fromkeys(filepaths))
+    if len(filepaths) < 2:
+        return {path: probe_file(path) for path in filepaths}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(filepaths, executor.map(probe_file, filepaths)))
@@ -0,0 +1,138 @@
+import bpy
+from . import node_utils
+
+# Cached lookups used by panels, so that a redraw does not scan material nodes or walk effects chains.
+# Only names are stored, since references to ID blocks and nodes become invalid after undo or file loading.
+# material name -> {"media": image name -> [group node names], "nodes": group node name -> image name, "num_nodes": int}
+material_entries = {}
+# top node group name -> {"chain": [(node group name, effect name)], "root": media node group name}
+chain_entries = {}
+msgbus_owner = object()
+
+def invalidate():
+    material_entries.clear()
+    chain_entries.clear()
+
+def build_material_entry(material):
+    tex_groups_map, _ = node_utils.list_tfx_node_groups(material)
+    entry = {"media": {}, "nodes": {}, "num_nodes": len(material.node_tree.nodes)}
+    for image_name, group_nodes in tex_groups_map.items():
+        entry["media"][image_name] = [node.name for node in group_nodes]
+        for node in group_nodes:
+            entry["nodes"][node.name] = image_name
+    material_entries[material.name] = entry
+    return entry
+
+def list_tfx_node_groups(material):
+    """
+    Cached version of node_utils.list_tfx_node_groups
+    """
+    node_tree = material.node_tree
+    if node_tree is None:
+        return {}, ''
+    entry = material_entries.get(material.name)
+    if entry is None:
+        entry = build_material_entry(material)
+
+    tex_groups_map = {}
+    for image_name, node_names in entry["media"].items():
+        nodes = [node_tree.nodes.get(name) for name in node_names]
+        if None in nodes:
+            # Nodes have been removed or renamed since the entry was built
+            build_material_entry(material)
+            return node_utils.list_tfx_node_groups(material)
+        tex_groups_map[image_name] = nodes
+    active_node = node_tree.nodes.active
+    active_tex_name = entry["nodes"].get(active_node.name, '') if active_node else ''
+    return tex_groups_map, active_tex_name
+
+def get_chain_entry(top_tree, rebuild=False):
+    entry = chain_entries.get(top_tree.name)
+    if entry is None or rebuild:
+        root = node_utils.get_chain_root(top_tree)
+        entry = {
+            "chain": [(tree.name, fx_name) for tree, fx_name in node_utils.get_chain_from_tree(top_tree)],
+            "root": root.name if root else '',
+        }
+        chain_entries[top_tree.name] = entry
+    return entry
+
+def get_effect_chain_nodes(check=False):
+    """
+    Cached version of node_utils.get_effect_chain_nodes
+    """
+    if check and not node_utils.is_active_node_tfx():
+        return []
+    top_tree = bpy.context.object.active_material.node_tree.nodes.active.node_tree
+    chain = [(bpy.data.node_groups.get(name), fx_name) for name, fx_name in get_chain_entry(top_tree)["chain"]]
+    if any(tree is None for tree, _ in chain):
+        # Node groups have been removed or renamed since the entry was built
+        chain = [(bpy.data.node_groups[name], fx_name) for name, fx_name in get_chain_entry(top_tree, rebuild=True)["chain"]]
+    return chain
+
+def get_active_image_node(check=False):
+    """
+    Cached version of node_utils.get_active_image_node
+    """
+    if check and not node_utils.is_active_node_tfx():
+        return None, None
+    top_tree = bpy.context.object.active_material.node_tree.nodes.active.node_tree
+    media_tree = bpy.data.node_groups.get(get_chain_entry(top_tree)["root"])
+    if media_tree is None:
+        media_tree = bpy.data.node_groups.get(get_chain_entry(top_tree, rebuild=True)["root"])
+        if media_tree is None:
+            return None, None
+    return media_tree.nodes.get("TfxMedia"), media_tree
+
+@bpy.app.handlers.persistent
+def media_registry_depsgraph_handler(scene, depsgraph):
+    # Materials are also updated on every frame when their effects chains are animated,
+    # so an entry is only dropped when the number of nodes has changed.
+    # Structural changes of effects chains always reassign node groups of group nodes, which is reported through the message bus
+    for update in depsgraph.updates:
+        if not isinstance(update.id, bpy.types.Material):
+            continue
+        material = update.id.original
+        entry = material_entries.get(material.name)
+        if entry is not None and (material.node_tree is None or len(material.node_tree.nodes) != entry["num_nodes"]):
+            del material_entries[material.name]
+
+@bpy.app.handlers.persistent
+def media_registry_reset_handler(*args):
+    # Undo and redo replace all data blocks
+    invalidate()
+
+@bpy.app.handlers.persistent
+def media_registry_load_handler(dummy):
+    invalidate()
+    subscribe_msgbus()
+
+def subscribe_msgbus():
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    for key in [(bpy.types.ShaderNodeGroup, "node_tree"), (bpy.types.ShaderNodeTexImage, "image")]:
+        bpy.msgbus.subscribe_rna(key=key, owner=msgbus_owner, args=(), notify=invalidate)
+
+handler_lists = ('undo_post', 'redo_post')
+
+def register():
+    subscribe_msgbus()
+    if media_registry_depsgraph_handler not in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.append(media_registry_depsgraph_handler)
+    if media_registry_load_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(media_registry_load_handler)
+    for name in handler_lists:
+        handlers = getattr(bpy.app.handlers, name)
+        if media_registry_reset_handler not in handlers:
+            handlers.append(media_registry_reset_handler)
+
+def unregister():
+    bpy.msgbus.clear_by_owner(msgbus_owner)
+    if media_registry_depsgraph_handler in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(media_registry_depsgraph_handler)
+    if media_registry_load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(media_registry_load_handler)
+    for name in handler_lists:
+        handlers = getattr(bpy.app.handlers, name)
+        if media_registry_reset_handler in handlers:
+            handlers.remove(media_registry_reset_handler)
+    invalidate()
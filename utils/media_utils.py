@@ -1,46 +1,177 @@
 import os
 import re
 import bpy
+from . import metadata_store, media_probe, profiling
+
+# Index of image sequences in each directory, keyed by directory path with the directory mtime used for validation
+sequence_index_cache = {}
+sequence_pattern = re.compile(r"^(.*?)(\d+)(\.[^.]*)?$")
+
+@profiling.profiled("media:sequence_scan")
+def build_sequence_index(dirname):
+    """
+    Group all files of a directory into sequences in one pass.
+    Return a map from (prefix, number of digits, extension) to (first frame, last frame)
+    """
+    index = {}
+    with os.scandir(dirname) as it:
+        for entry in it:
+            m = sequence_pattern.match(entry.name)
+            if not m:
+                continue
+            base, digits, ext = m.groups()
+            key = (base, len(digits), ext or '')
+            frame = int(digits)
+            if key in index:
+                first, last = index[key]
+                index[key] = (min(first, frame), max(last, frame))
+            else:
+                index[key] = (frame, frame)
+    return index
+
+def get_sequence_index(dirname):
+    dirname = os.path.abspath(dirname)
+    try:
+        mtime = os.stat(dirname).st_mtime_ns
+    except OSError:
+        return {}
+    cached = sequence_index_cache.get(dirname)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, build_sequence_index(dirname))
+        sequence_index_cache[dirname] = cached
+    return cached[1]
+
+def get_sequence_range(filepath):
+    """
+    Return the first and last frame numbers of the sequence containing a file, or None if the file name has no frame number
+    """
+    dirname, basename = os.path.dirname(filepath), os.path.basename(filepath)
+    prefix, ext = os.path.splitext(basename)
+    m = re.match(r"(.*?)(\d+)$", prefix)
+    if not m:
+        return None
+    base, digits = m.groups()
+    return get_sequence_index(dirname).get((base, len(digits), ext))
 
 def get_media_duration(image):
     if image.source == 'SEQUENCE':
         # Decompose the filepath according to the naming convention
-        dirname, basename = os.path.dirname(image.filepath), os.path.basename(image.filepath)
-        prefix, ext = os.path.splitext(basename)
-        m = re.match(r"(.*?)(\d+)$", prefix)
-        if not m:
-            return 1
-        base, digits = m.groups()
-        num_len = len(digits)
-    
-        # Find all files belonging to the same sequence
-        pattern = re.compile(rf"^{re.escape(base)}(\d{{{num_len}}}){re.escape(ext)}$")
-        frames = []
-        for f in os.listdir(dirname):
-            if pattern.match(f):
-                frames.append(int(pattern.match(f).group(1)))
-        if frames:
-            return max(frames) - min(frames) + 1
+        frame_range = get_sequence_range(bpy.path.abspath(image.filepath))
+        if frame_range:
+            return frame_range[1] - frame_range[0] + 1
         else:
             return 1
         
     elif image.source == 'MOVIE':
-        return image.frame_duration
+        return get_media_metadata(image)["frame_count"] or 1
     return 1
 
-def get_media_fps(image):
-    scene_fps = bpy.context.scene.render.fps
-    scene_fps /= bpy.context.scene.render.fps_base
+def get_scene_fps():
+    return bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
+
+@profiling.profiled("media:probe_blender")
+def probe_with_blender(image, filepath):
+    """
+    Get media metadata by loading it in Blender, which decodes the media
+    """
+    metadata = {
+        "fps": None,
+        "frame_count": 1,
+        "width": image.size[0],
+        "height": image.size[1],
+        "channels": image.channels,
+        "depth": image.depth,
+    }
+    if image.source == 'MOVIE':
+        metadata["frame_count"] = image.frame_duration
+        try:
+            clip = bpy.data.movieclips.load(filepath=filepath)
+            metadata["fps"] = clip.fps
+            bpy.data.movieclips.remove(clip)
+        except:
+            pass
+    elif image.source == 'SEQUENCE':
+        frame_range = get_sequence_range(filepath)
+        if frame_range:
+            metadata["frame_count"] = frame_range[1] - frame_range[0] + 1
+    return metadata
+
+@profiling.profiled("media:probe")
+def probe_media(image, filepath, header=None):
+    """
+    Get media metadata from the file header, and load the media in Blender only for values missing in the header
+    """
+    if header is None:
+        header = media_probe.probe_file(filepath)
+    if header is None:
+        return probe_with_blender(image, filepath)
     
-    if image.source != 'MOVIE':
-        return scene_fps
+    metadata = {field: header.get(field) for field in metadata_store.metadata_fields}
+    required_fields = ["width", "height"]
+    if image.source == 'MOVIE':
+        required_fields += ["fps", "frame_count"]
+    else:
+        metadata["fps"] = None
+        metadata["frame_count"] = 1
+        if image.source == 'SEQUENCE':
+            frame_range = get_sequence_range(filepath)
+            if frame_range:
+                metadata["frame_count"] = frame_range[1] - frame_range[0] + 1
     
-    try:
-        clip = bpy.data.movieclips.load(filepath=image.filepath)
-        res = clip.fps
-        bpy.data.movieclips.remove(clip)
-        return res
-    except:
-        return scene_fps
+    if any(metadata[field] is None for field in required_fields):
+        fallback = probe_with_blender(image, filepath)
+        for field in metadata_store.metadata_fields:
+            if metadata[field] is None:
+                metadata[field] = fallback[field]
+    return metadata
+
+def get_image_filepath(image):
+    """
+    Return the normalized absolute path of an image if its metadata can be stored, otherwise an empty string
+    """
+    if not image.filepath or image.packed_file is not None or image.source not in ('FILE', 'MOVIE', 'SEQUENCE'):
+        return ''
+    return os.path.normpath(bpy.path.abspath(image.filepath))
+
+@profiling.profiled("media:prefetch")
+def prefetch_media_metadata(images, max_workers=8):
+    """
+    Read headers of all media unknown to the metadata store concurrently, so that later queries do not touch the files
+    """
+    pending = {}
+    for image in images:
+        filepath = get_image_filepath(image)
+        if filepath and metadata_store.lookup(filepath) is None:
+            pending.setdefault(filepath, image)
+    headers = media_probe.probe_files(pending.keys(), max_workers=max_workers)
+    for filepath, image in pending.items():
+        metadata_store.record(filepath, probe_media(image, filepath, headers.get(filepath)))
+
+def get_media_metadata(image):
+    """
+    Return fps, frame count, resolution, channels and bit depth of the media, probing the file only if it is not in the metadata store
+    """
+    filepath = get_image_filepath(image)
+    if not filepath:
+        return probe_with_blender(image, bpy.path.abspath(image.filepath))
     
-        
\ No newline at end of file
+    entry = metadata_store.lookup_image(image, filepath)
+    if entry is not None:
+        return entry
+    entry = metadata_store.lookup(filepath)
+    if entry is None:
+        entry = metadata_store.record(filepath, probe_media(image, filepath))
+        if entry is None:
+            return probe_with_blender(image, filepath)
+    metadata_store.record_image(image, entry)
+    return entry
+
+def get_media_resolution(image):
+    metadata = get_media_metadata(image)
+    return metadata["width"], metadata["height"]
+
+def get_media_fps(image):
+    scene_fps = get_scene_fps()
+    if image.source != 'MOVIE':
+        return scene_fps
+    return get_media_metadata(image)["fps"] or scene_fps
@@ -0,0 +1,125 @@
+import os
+import json
+import bpy
+
+"""
+Persistent metadata of media files, so that they do not need to be decoded again to get their properties.
+Entries are keyed by absolute file path and validated by file size and modification time.
+They are saved in a JSON sidecar next to the blend file, and in a custom property of each image.
+"""
+
+sidecar_filename = ".tfx_media_metadata.json"
+image_prop_key = "tfxMetadata"
+metadata_fields = ("fps", "frame_count", "width", "height", "channels", "depth")
+
+store = {}
+store_state = {"sidecar": None, "dirty": False}
+
+def get_sidecar_filepath():
+    if not bpy.data.filepath:
+        return None
+    return os.path.join(os.path.dirname(bpy.data.filepath), sidecar_filename)
+
+def load_store():
+    """
+    Read the sidecar of the current blend file if it has not been read yet
+    """
+    sidecar = get_sidecar_filepath()
+    if sidecar == store_state["sidecar"]:
+        return
+    store_state["sidecar"] = sidecar
+    if sidecar is None or not os.path.isfile(sidecar):
+        return
+    try:
+        with open(sidecar, 'r') as f:
+            entries = json.load(f)
+        for path, entry in entries.items():
+            store.setdefault(path, entry)
+    except (OSError, ValueError):
+        pass
+
+def save_store():
+    sidecar = get_sidecar_filepath()
+    if sidecar is None or not store_state["dirty"]:
+        return
+    try:
+        with open(sidecar, 'w') as f:
+            json.dump(store, f, indent=1)
+        store_state["dirty"] = False
+    except OSError:
+        pass
+
+def get_file_signature(filepath):
+    try:
+        stat = os.stat(filepath)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+def is_entry_valid(entry, filepath, signature):
+    return (entry is not None and entry.get("path") == filepath
+            and entry.get("size") == signature["size"] and entry.get("mtime") == signature["mtime"])
+
+def lookup(filepath):
+    """
+    Return the stored metadata of a file, or None if the file is unknown or has been modified
+    """
+    load_store()
+    signature = get_file_signature(filepath)
+    if signature is None:
+        return None
+    entry = store.get(filepath)
+    return entry if is_entry_valid(entry, filepath, signature) else None
+
+def record(filepath, metadata):
+    load_store()
+    signature = get_file_signature(filepath)
+    if signature is None:
+        return None
+    entry = {"path": filepath, **signature}
+    for field in metadata_fields:
+        entry[field] = metadata.get(field)
+    store[filepath] = entry
+    store_state["dirty"] = True
+    return entry
+
+def lookup_image(image, filepath):
+    """
+    Return metadata stored in the image itself if it is still valid
+    """
+    signature = get_file_signature(filepath)
+    if signature is None or image_prop_key not in image:
+        return None
+    try:
+        entry = json.loads(image[image_prop_key])
+    except (TypeError, ValueError):
+        return None
+    return entry if is_entry_valid(entry, filepath, signature) else None
+
+def record_image(image, entry):
+    # Stored as a JSON string, since ID properties cannot hold None or 64-bit integers
+    try:
+        image[image_prop_key] = json.dumps(entry)
+    except AttributeError:
+        # ID properties cannot be written when drawing the UI
+        pass
+
+@bpy.app.handlers.persistent
+def metadata_store_save_handler(dummy):
+    save_store()
+
+@bpy.app.handlers.persistent
+def metadata_store_load_handler(dummy):
+    store_state["sidecar"] = None
+
+def register():
+    if metadata_store_save_handler not in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.append(metadata_store_save_handler)
+    if metadata_store_load_handler not in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.append(metadata_store_load_handler)
+
+def unregister():
+    if metadata_store_save_handler in bpy.app.handlers.save_post:
+        bpy.app.handlers.save_post.remove(metadata_store_save_handler)
+    if metadata_store_load_handler in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(metadata_store_load_handler)
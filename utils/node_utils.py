@@ -53,14 +53,112 @@ def get_active_image_node(check=False):
         return inner_node_tree.nodes["TfxMedia"], inner_node_tree
     return None, None
 
-def get_effect_chain_nodes(check=False):
-    if check and not is_active_node_tfx():
-        return []
+def set_next_depth(current_tree, next_tree):
+    current_tree.nodes['TfxNext'].node_tree = next_tree
+    i = 1
+    while f'TfxNext.{i:03}' in current_tree.nodes:
+        current_tree.nodes[f'TfxNext.{i:03}'].node_tree = next_tree
+        i += 1
+
+def get_next_tree(node_tree):
+    """
+    Return the next node group of the chain, which is not the linked one if the downstream chain is replaced by a cache
+    or if the next effects are left out of a compiled chain
+    """
+    if "tfxCacheSource" in node_tree and node_tree["tfxCacheSource"] in bpy.data.node_groups:
+        return bpy.data.node_groups[node_tree["tfxCacheSource"]]
+    # Effects left out of a compiled chain, see utils/chain_compiler.py
+    if "tfxLogicalNext" in node_tree and node_tree["tfxLogicalNext"] in bpy.data.node_groups:
+        return bpy.data.node_groups[node_tree["tfxLogicalNext"]]
+    return node_tree.nodes["TfxNext"].node_tree
+
+def get_chain_from_tree(node_tree):
+    """
+    Walk an effects chain from a given node group, return (node group, effect name) of each depth except the root
+    """
     res = []
-    node_tree = bpy.context.object.active_material.node_tree.nodes.active.node_tree
     while "TfxNext" in node_tree.nodes and "tfxName" in node_tree:
         res.append((node_tree, node_tree["tfxName"]))
-        node_tree = node_tree.nodes["TfxNext"].node_tree
+        node_tree = get_next_tree(node_tree)
     return res
-    
-    
\ No newline at end of file
+
+def get_effect_chain_nodes(check=False):
+    if check and not is_active_node_tfx():
+        return []
+    return get_chain_from_tree(bpy.context.object.active_material.node_tree.nodes.active.node_tree)
+
+def get_chain_root(node_tree):
+    """
+    Return the media node group of a chain given any node group of it
+    """
+    if "TfxMedia" in node_tree.nodes:
+        return node_tree
+    if "TfxRoot" in node_tree.nodes:
+        return node_tree.nodes["TfxRoot"].node_tree
+    return None
+
+def iter_objects_media(objects):
+    """
+    Yield (top node group, media node group, image node) of each media wrapped by this add-on in the materials of given objects
+    """
+    visited_materials, visited_trees = set(), set()
+    for obj in objects:
+        for slot in obj.material_slots:
+            material = slot.material
+            if material is None or material.node_tree is None or material.name in visited_materials:
+                continue
+            visited_materials.add(material.name)
+            for node in material.node_tree.nodes:
+                if node.type != 'GROUP' or node.node_tree is None or "tfxName" not in node.node_tree:
+                    continue
+                if node.node_tree.name in visited_trees:
+                    continue
+                visited_trees.add(node.node_tree.name)
+                media_tree = get_chain_root(node.node_tree)
+                if media_tree is None or "TfxMedia" not in media_tree.nodes:
+                    continue
+                yield node.node_tree, media_tree, media_tree.nodes["TfxMedia"]
+
+def iter_scene_media(scene):
+    return iter_objects_media(scene.objects)
+
+def collect_chain_node_groups(node_tree):
+    """
+    Return all node groups of an effects chain given its top node group, including parameter groups and cached parts of the chain
+    """
+    res, stack = {}, [node_tree]
+    while stack:
+        tree = stack.pop()
+        if tree is None or tree.name in res:
+            continue
+        res[tree.name] = tree
+        for node in tree.nodes:
+            if node.type == 'GROUP' and (node.name.startswith('TfxNext') or node.name in ('TfxRoot', 'TfxParam')):
+                stack.append(node.node_tree)
+        for key in ("tfxCacheSource", "tfxLogicalNext"):
+            if key in tree and tree[key] in bpy.data.node_groups:
+                stack.append(bpy.data.node_groups[tree[key]])
+    return list(res.values())
+
+def purge_node_groups(node_groups):
+    """
+    Remove the given node groups once they have no users, which may happen in cascade
+    """
+    names = {tree.name for tree in node_groups}
+    changed = True
+    while changed:
+        changed = False
+        for name in list(names):
+            tree = bpy.data.node_groups.get(name)
+            if tree is None:
+                names.discard(name)
+                continue
+            if tree.users > 0:
+                continue
+            # A cache point keeps the original downstream chain alive with a fake user, and so does a compiled chain for effects left out
+            for key in ("tfxCacheSource", "tfxLogicalNext"):
+                if key in tree and tree[key] in bpy.data.node_groups:
+                    bpy.data.node_groups[tree[key]].use_fake_user = False
+            bpy.data.node_groups.remove(tree)
+            names.discard(name)
+            changed = True
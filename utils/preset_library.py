@@ -0,0 +1,225 @@
+import os
+import json
+import hashlib
+import threading
+import bpy
+import bpy.utils.previews
+from . import asset_manager
+
+"""
+Library of effects chain presets stored as JSON files in a directory, which may be on a slow network drive.
+A manifest file in the directory records the name, effects, parameter hash and thumbnail of each preset,
+so that only new or modified files need to be parsed. Scanning runs in a background thread,
+and preset files are only fully read when they are applied.
+"""
+
+manifest_filename = ".tfx_preset_index.json"
+manifest_version = 1
+thumbnail_extensions = ('.png', '.jpg', '.jpeg')
+
+# In-memory state of the library. "presets" maps relative paths to index entries; "version" increases on every change
+# "rescan" is set when the library changes during a scan, whose result would then miss the change
+library_state = {"directory": None, "presets": {}, "version": 0, "scanning": False, "rescan": False, "error": None}
+library_lock = threading.Lock()
+preview_collection = None
+
+def get_library_dir():
+    addon = bpy.context.preferences.addons.get(__package__.rpartition('.')[0])
+    directory = addon.preferences.preset_library_dir if addon and addon.preferences else ''
+    return bpy.path.abspath(directory) if directory else os.path.abspath(asset_manager.default_preset_dir)
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, manifest_filename), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") == manifest_version:
+            return data.get("presets", {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def write_manifest(directory, presets):
+    # The library may be read-only for some users, who still benefit from the in-memory index
+    try:
+        tmp_path = os.path.join(directory, manifest_filename + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": manifest_version, "presets": presets}, f, indent=1)
+        os.replace(tmp_path, os.path.join(directory, manifest_filename))
+    except OSError:
+        pass
+
+def get_param_hash(effects):
+    return hashlib.sha1(json.dumps(effects, sort_keys=True).encode()).hexdigest()
+
+def parse_preset(filepath):
+    """
+    Read a preset file and return its index entry, without the file stat fields
+    """
+    with open(filepath, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    effects = config.get("effects", [])
+    return {
+        "name": config.get("name", os.path.splitext(os.path.basename(filepath))[0]),
+        "effects": [effect.get("name", '') for effect in effects],
+        "param_hash": get_param_hash(effects),
+    }
+
+def iter_preset_files(directory, relpath=''):
+    """
+    Yield (relative path, os.DirEntry) of all JSON files in the directory and its subdirectories
+    """
+    with os.scandir(os.path.join(directory, relpath)) as it:
+        for entry in it:
+            if entry.name.startswith('.'):
+                continue
+            entry_relpath = os.path.join(relpath, entry.name) if relpath else entry.name
+            if entry.is_dir():
+                yield from iter_preset_files(directory, entry_relpath)
+            elif entry.name.lower().endswith('.json'):
+                yield entry_relpath, entry
+
+def scan_library(directory, presets):
+    """
+    Update index entries of a library directory. Only files whose modification time or size changed are parsed.
+    Return the new entries and whether anything changed
+    """
+    new_presets = {}
+    changed = False
+    for relpath, entry in iter_preset_files(directory):
+        stat = entry.stat()
+        old = presets.get(relpath)
+        if old is not None and old.get("mtime") == stat.st_mtime_ns and old.get("size") == stat.st_size:
+            new_presets[relpath] = old
+            continue
+        try:
+            item = parse_preset(entry.path)
+        except (OSError, ValueError, AttributeError):
+            continue
+        stem = os.path.splitext(entry.path)[0]
+        item["thumbnail"] = ''
+        for ext in thumbnail_extensions:
+            if os.path.isfile(stem + ext):
+                item["thumbnail"] = os.path.splitext(relpath)[0] + ext
+                break
+        item["mtime"] = stat.st_mtime_ns
+        item["size"] = stat.st_size
+        new_presets[relpath] = item
+        changed = True
+    changed = changed or len(new_presets) != len(presets)
+    return new_presets, changed
+
+def refresh_worker(directory):
+    presets = read_manifest(directory)
+    with library_lock:
+        if library_state["directory"] == directory and not library_state["presets"]:
+            library_state["presets"] = presets
+            library_state["version"] += 1
+    rescanned = False
+    while True:
+        try:
+            presets, changed = scan_library(directory, presets)
+            error = None
+        except OSError as e:
+            changed, error = False, str(e)
+        with library_lock:
+            if library_state["directory"] == directory and library_state["rescan"]:
+                # Scan again from the current index, which contains the entries added in the meantime
+                library_state["rescan"] = False
+                presets = library_state["presets"]
+                rescanned = True
+                continue
+            if library_state["directory"] == directory:
+                if changed:
+                    library_state["presets"] = presets
+                    library_state["version"] += 1
+                library_state["error"] = error
+            library_state["rescan"] = False
+            library_state["scanning"] = False
+        break
+    # Entries saved during the scan are not in the manifest yet
+    if changed or rescanned:
+        write_manifest(directory, presets)
+
+def refresh_library(directory=None):
+    """
+    Load the manifest and scan the library in a background thread
+    """
+    if directory is None:
+        directory = get_library_dir()
+    with library_lock:
+        if library_state["scanning"]:
+            return
+        if library_state["directory"] != directory:
+            library_state["directory"] = directory
+            library_state["presets"] = {}
+            library_state["version"] += 1
+        library_state["scanning"] = True
+        library_state["rescan"] = False
+    threading.Thread(target=refresh_worker, args=(directory,), daemon=True).start()
+
+def get_presets():
+    """
+    Return the current index without touching the file system. The first call starts loading the library
+    """
+    if library_state["directory"] is None:
+        refresh_library()
+    return library_state["presets"]
+
+def get_preset_filepath(relpath):
+    return os.path.join(library_state["directory"] or get_library_dir(), relpath)
+
+def load_preset(relpath):
+    with open(get_preset_filepath(relpath), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_preset(name, config):
+    """
+    Write a preset file into the library and add it to the index.
+    Raise FileExistsError if a preset file with the same name exists
+    """
+    directory = get_library_dir()
+    filename = bpy.path.clean_name(name) + '.json'
+    filepath = os.path.join(directory, filename)
+    config = dict(config, name=name)
+    with open(filepath, 'x', encoding='utf-8') as f:
+        json.dump(config, f, indent=4)
+    stat = os.stat(filepath)
+    item = {
+        "name": name,
+        "effects": [effect.get("name", '') for effect in config.get("effects", [])],
+        "param_hash": get_param_hash(config.get("effects", [])),
+        "thumbnail": '', "mtime": stat.st_mtime_ns, "size": stat.st_size,
+    }
+    with library_lock:
+        if library_state["directory"] == directory:
+            library_state["presets"] = dict(library_state["presets"], **{filename: item})
+            library_state["version"] += 1
+            # A running scan writes the manifest when it finishes
+            library_state["rescan"] = library_state["scanning"]
+            presets = library_state["presets"] if not library_state["scanning"] else None
+        else:
+            presets = None
+    if presets is not None:
+        write_manifest(directory, presets)
+    return filename
+
+def get_thumbnail_icon(relpath):
+    """
+    Return the icon ID of a preset thumbnail, loading the image only when it is first drawn
+    """
+    global preview_collection
+    item = library_state["presets"].get(relpath)
+    if not item or not item.get("thumbnail"):
+        return 0
+    if preview_collection is None:
+        preview_collection = bpy.utils.previews.new()
+    key = item["thumbnail"]
+    if key not in preview_collection:
+        preview_collection.load(key, get_preset_filepath(key), 'IMAGE')
+    return preview_collection[key].icon_id
+
+def unregister():
+    global preview_collection
+    if preview_collection is not None:
+        bpy.utils.previews.remove(preview_collection)
+        preview_collection = None
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import heapq
+import threading
+import functools
+from collections import deque
+
+"""
+Opt-in instrumentation of hot paths such as template appends, sequence scans, metadata probes, driver creation and panel draws.
+When enabled, every call is recorded as an event in a ring buffer and aggregated into per-name counters with the slowest calls.
+Events can be exported as JSON or in the Chrome trace format, which can be opened in chrome://tracing or Perfetto.
+When disabled, an instrumented function only costs one dictionary lookup.
+"""
+
+default_capacity = 10000
+num_slowest = 5
+draw_prefix = "draw:"
+
+# "version" increases when a call other than a panel draw is recorded,
+# so that a panel showing the counters can be refreshed without triggering itself
+profiling_state = {"enabled": False, "version": 0, "start_ns": time.perf_counter_ns()}
+# Each event is (name, start time in ns, duration in ns, thread id)
+events = deque(maxlen=default_capacity)
+# name -> {"calls": int, "total_ns": int, "max_ns": int, "slowest": min-heap of (duration in ns, start time in ns)}
+counters = {}
+lock = threading.Lock()
+
+def set_enabled(enabled, capacity=None):
+    global events
+    with lock:
+        if capacity is not None and capacity != events.maxlen:
+            events = deque(events, maxlen=capacity)
+        profiling_state["enabled"] = enabled
+
+def is_enabled():
+    return profiling_state["enabled"]
+
+def reset():
+    with lock:
+        events.clear()
+        counters.clear()
+        profiling_state["start_ns"] = time.perf_counter_ns()
+        profiling_state["version"] += 1
+
+def record(name, start_ns, duration_ns):
+    with lock:
+        events.append((name, start_ns, duration_ns, threading.get_ident()))
+        counter = counters.get(name)
+        if counter is None:
+            counter = {"calls": 0, "total_ns": 0, "max_ns": 0, "slowest": []}
+            counters[name] = counter
+        counter["calls"] += 1
+        counter["total_ns"] += duration_ns
+        counter["max_ns"] = max(counter["max_ns"], duration_ns)
+        if len(counter["slowest"]) < num_slowest:
+            heapq.heappush(counter["slowest"], (duration_ns, start_ns))
+        elif duration_ns > counter["slowest"][0][0]:
+            heapq.heapreplace(counter["slowest"], (duration_ns, start_ns))
+        if not name.startswith(draw_prefix):
+            profiling_state["version"] += 1
+
+class section:
+    """
+    Context manager recording the time spent in a block of code
+    """
+    __slots__ = ("name", "start_ns")
+
+    def __init__(self, name):
+        self.name = name
+        self.start_ns = None
+
+    def __enter__(self):
+        if profiling_state["enabled"]:
+            self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *args):
+        if self.start_ns is not None:
+            record(self.name, self.start_ns, time.perf_counter_ns() - self.start_ns)
+        return False
+
+def profiled(name):
+    """
+    Decorator recording every call of a function
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not profiling_state["enabled"]:
+                return func(*args, **kwargs)
+            start_ns = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, start_ns, time.perf_counter_ns() - start_ns)
+        return wrapper
+    return decorator
+
+def profiled_callback(name):
+    """
+    Same as profiled, for methods called by Blender with a context such as Panel.draw and Operator.execute.
+    Blender checks the number of arguments of these methods when a class is registered
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, context):
+            if not profiling_state["enabled"]:
+                return func(self, context)
+            start_ns = time.perf_counter_ns()
+            try:
+                return func(self, context)
+            finally:
+                record(name, start_ns, time.perf_counter_ns() - start_ns)
+        return wrapper
+    return decorator
+
+def get_counters(sort_key="total_ns"):
+    """
+    Return a list of counters with times in milliseconds, sorted in descending order
+    """
+    with lock:
+        items = [(name, dict(counter, slowest=sorted(counter["slowest"], reverse=True))) for name, counter in counters.items()]
+    items.sort(key=lambda item: item[1][sort_key], reverse=True)
+    res = []
+    for name, counter in items:
+        res.append({
+            "name": name,
+            "calls": counter["calls"],
+            "total_ms": counter["total_ns"] / 1e6,
+            "mean_ms": counter["total_ns"] / 1e6 / counter["calls"],
+            "max_ms": counter["max_ns"] / 1e6,
+            "slowest": [{"ms": duration / 1e6, "time_ms": (start - profiling_state["start_ns"]) / 1e6}
+                        for duration, start in counter["slowest"]],
+        })
+    return res
+
+def get_events():
+    with lock:
+        return list(events)
+
+def export_json(filepath):
+    data = {
+        "counters": get_counters(),
+        "events": [{"name": name, "start_ms": (start - profiling_state["start_ns"]) / 1e6, "ms": duration / 1e6, "thread": tid}
+                   for name, start, duration, tid in get_events()],
+    }
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+
+def export_chrome_trace(filepath):
+    pid = os.getpid()
+    trace_events = [{
+        "name": name, "cat": name.partition(":")[0] if ":" in name else "tfx", "ph": "X",
+        "ts": (start - profiling_state["start_ns"]) / 1e3, "dur": duration / 1e3, "pid": pid, "tid": tid,
+    } for name, start, duration, tid in get_events()]
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
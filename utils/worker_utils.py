@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import queue
+import threading
+import subprocess
+import bpy
+
+"""
+Run functions of this add-on in background Blender processes.
+Workers report to the parent process by printing lines starting with the prefixes below.
+"""
+
+PROGRESS_PREFIX = "TFX_PROGRESS "
+RESULT_PREFIX = "TFX_RESULT "
+ERROR_PREFIX = "TFX_ERROR "
+
+addon_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def get_worker_expression(module_name, function_name, argument):
+    """
+    Python code to be executed by a worker: import this add-on as a package and call a function with a JSON argument
+    """
+    return (
+        f"import sys, importlib; sys.path.insert(0, {os.path.dirname(addon_root)!r}); "
+        f"m = importlib.import_module({os.path.basename(addon_root) + '.' + module_name!r}); "
+        f"m.{function_name}({json.dumps(argument)!r})"
+    )
+
+def get_worker_command(blend_filepath, module_name, function_name, argument):
+    return [
+        bpy.app.binary_path, "-b", blend_filepath,
+        "--factory-startup", "-noaudio",
+        "--python-exit-code", "1",
+        "--python-expr", get_worker_expression(module_name, function_name, argument),
+    ]
+
+def report_progress(value):
+    print(f"{PROGRESS_PREFIX}{value}", flush=True)
+
+def report_result(value):
+    print(f"{RESULT_PREFIX}{json.dumps(value)}", flush=True)
+
+def report_error(message):
+    print(f"{ERROR_PREFIX}{message}", flush=True)
+
+class WorkerProcess:
+    """
+    A background Blender process whose output is collected by a thread, so that it can be polled without blocking the UI
+    """
+    def __init__(self, command):
+        self.process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL, text=True, errors='replace'
+        )
+        self.lines = queue.Queue()
+        self.progress = []
+        self.results = []
+        self.errors = []
+        self.log_tail = []
+        self.thread = threading.Thread(target=self._read_output, daemon=True)
+        self.thread.start()
+
+    def _read_output(self):
+        for line in self.process.stdout:
+            self.lines.put(line.rstrip('\n'))
+        self.process.stdout.close()
+
+    def poll(self):
+        """
+        Parse new output lines. Return True if the process has finished and all its output has been read
+        """
+        while True:
+            try:
+                line = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            if line.startswith(PROGRESS_PREFIX):
+                self.progress.append(line[len(PROGRESS_PREFIX):])
+            elif line.startswith(RESULT_PREFIX):
+                self.results.append(json.loads(line[len(RESULT_PREFIX):]))
+            elif line.startswith(ERROR_PREFIX):
+                self.errors.append(line[len(ERROR_PREFIX):])
+            else:
+                self.log_tail = (self.log_tail + [line])[-20:]
+        return self.process.poll() is not None and not self.thread.is_alive() and self.lines.empty()
+
+    @property
+    def failed(self):
+        return self.process.returncode not in (0, None) or len(self.errors) > 0
+
+    def terminate(self):
+        if self.process.poll() is None:
+            self.process.terminate()